@@ -2,7 +2,12 @@ import math
 import time
 import random
 import os
-import ast
+import threading
+import argparse
+import shutil
+import subprocess
+import multiprocessing
+from collections import deque
 import winsound
 from pathlib import Path
 
@@ -16,6 +21,14 @@ except ImportError:
     # and the program will instead use default window size
     USER32 = False
 
+try:
+    import numpy as np
+
+except ImportError:
+    # NumPy is only needed for the surfarray renderer - without it, particles
+    # will always be drawn one at a time
+    np = None
+
 import pygame as pg
 import pygame.math as pgmath
 from pygame.locals import *
@@ -23,6 +36,12 @@ from pygame.locals import *
 # An external library that I made - adds tkinter features in pygame
 import pgkinter as pgk
 
+# Reads and writes saved scenarios
+import scenarioFile
+import scenarioLibrary
+import setupJournal
+import materialRegistry
+
 pgkRoot = pgk.Pgk()
 
 
@@ -42,75 +61,597 @@ class Graph(object):
 
         self.__rect.topleft = (int(topleft[0]), int(topleft[1]))
 
-        self.__xLabels = []
-        x = width
-        while x > 0:
-            self.__xLabels.append(width - x)
-            x -= xLabelGap
+        # Where the world's walls are on screen - grid lines start from the
+        # left wall and the floor, and anything outside the walls is shaded
+        self.__worldRect = (self.__rect.left, self.__rect.top, width, height)
 
-        self.__yLabels = []
-        y = height
-        while y > 0:
-            self.__yLabels.append(height - y)
-            y -= yLabelGap
+        self.__font = pgkRoot.getFont("Helvetica", 18)
 
-        self.__font = pg.font.SysFont("Helvetica", 18)
+        self.__xLabelGap = xLabelGap
+        self.__yLabelGap = yLabelGap
 
-        self.lines = []
+        # The grid only changes when the scale does, so it is drawn once
+        # onto its own surface and then blitted every frame, rather than
+        # redrawing every line every frame
+        self.__gridSurface = None
+        self.__gridChanged = True
 
-    def draw(self):
+        # Particle trails are drawn onto their own layer a segment at a time
+        # as they are plotted. The whole layer is only redrawn from each
+        # line's points when the old segments become wrong (zoom or rewind)
+        self.__trailSurface = pg.Surface(self.__rect.size).convert()
+        self.__trailSurface.set_colorkey(TRAIL_KEY)
+        self.__trailSurface.fill(TRAIL_KEY)
+        self.__trailsChanged = False
+        self.__showTrails = True
 
-        pg.draw.rect(self.__screen, self.__bgColour, self.__rect)
+        self.lines = []
 
-        for i in self.__xLabels:
-            pg.draw.line(self.__screen, (170, 170, 170),
-                         (i, self.__rect.top), (i, self.__rect.bottom), 1)
+    def config(self, width=None, height=None, bgColour=None, surface=None):
+        # Only the things that affect the grid need to be changeable after
+        # instantiation (and the surface, for when the render scale changes)
+        if surface is not None:
+            self.__screen = surface
+
+        if width is not None and width != self.__width:
+            self.__width = width
+            self.__gridChanged = True
+
+        if height is not None and height != self.__height:
+            self.__height = height
+            self.__gridChanged = True
+
+        if bgColour is not None and bgColour != self.__bgColour:
+            self.__bgColour = bgColour
+            self.__gridChanged = True
+
+        if self.__gridChanged:
+            self.__rect.size = (self.__width, self.__height)
+            self.__trailSurface = pg.Surface(self.__rect.size).convert()
+            self.__trailSurface.set_colorkey(TRAIL_KEY)
+            self.__trailsChanged = True
+
+    def draw(self, trailChanges=None):
+        # trailChanges can be collected beforehand with takeTrailChanges, so
+        # that the graph can be drawn by the render thread while the lines
+        # are being plotted
+        if self.__gridChanged:
+            self.renderGrid()
+
+        self.__screen.blit(self.__gridSurface, self.__rect)
+
+        if trailChanges is None:
+            trailChanges = self.takeTrailChanges()
+
+        if self.__showTrails:
+            self.drawTrails(trailChanges)
+            self.__screen.blit(self.__trailSurface, self.__rect)
+
+    def showTrails(self, show):
+        # Hidden trails are still plotted, and are redrawn in full when they
+        # are shown again
+        if show and not self.__showTrails:
+            self.__trailsChanged = True
+        self.__showTrails = show
+
+    def takeTrailChanges(self):
+        # Returns everything that needs drawing onto the trail layer, copied
+        # out of the lines. If the whole layer needs redrawing, this is every
+        # point of every line, otherwise just the segments added since last
+        # time.
+        if not self.__showTrails:
+            for i in self.lines:
+                i.takeNewSegments()
+            return False, []
+
+        if self.__trailsChanged:
+            self.__trailsChanged = False
+            for i in self.lines:
+                i.takeNewSegments()
+            return True, [i.getPoints() for i in self.lines]
+
+        return False, [i.takeNewSegments() for i in self.lines]
+
+    def drawTrails(self, trailChanges):
+        redraw, lines = trailChanges
+
+        if redraw:
+            self.__trailSurface.fill(TRAIL_KEY)
+
+        for colour, points in lines:
+            if redraw:
+                if len(points) > 1:
+                    pg.draw.lines(self.__trailSurface, colour, False,
+                                  [self.toLayer(i) for i in points], 2)
+            else:
+                for start, end in points:
+                    pg.draw.line(self.__trailSurface, colour,
+                                 self.toLayer(start), self.toLayer(end), 2)
+
+    def toLayer(self, pos):
+        # Converts a position in the world to a position on the trail layer
+        x, y = worldToRender(pos)
+        return x - self.__rect.left, y - self.__rect.top
+
+    def trailsChanged(self):
+        self.__trailsChanged = True
+
+    def renderGrid(self):
+        # World coordinates are relative to the screen, so they need to be
+        # offset by the graph's topleft corner when drawn onto the grid surface
+        if self.__gridSurface is None or \
+                self.__gridSurface.get_size() != self.__rect.size:
+            self.__gridSurface = pg.Surface(self.__rect.size).convert()
+
+        left, top = self.__rect.left, self.__rect.top
+        worldLeft, worldTop, worldWidth, worldHeight = self.__worldRect
+        worldLeft -= left
+        worldTop -= top
+
+        # Shade everything outside the walls slightly darker
+        self.__gridSurface.fill([int(i * 0.92) for i in self.__bgColour])
+        world = pg.Rect(int(worldLeft), int(worldTop),
+                        math.ceil(worldWidth), math.ceil(worldHeight))
+        self.__gridSurface.fill(self.__bgColour, world)
+
+        self.__gridSurface.set_clip(world)
+
+        # When zoomed a long way out, only every 10th (or 100th...) line is
+        # drawn - otherwise there could be millions of them
+        xGap, yGap = self.__xLabelGap, self.__yLabelGap
+        while xGap < 5:
+            xGap *= 10
+        while yGap < 5:
+            yGap *= 10
+
+        x = worldLeft % xGap
+        while x < self.__rect.w:
+            pg.draw.line(self.__gridSurface, (170, 170, 170),
+                         (x, 0), (x, self.__rect.h), 1)
+            x += xGap
+
+        y = (worldTop + worldHeight) % yGap
+        while y < self.__rect.h:
+            pg.draw.line(self.__gridSurface, (170, 170, 170),
+                         (0, y), (self.__rect.w, y), 1)
+            y += yGap
+
+        self.__gridSurface.set_clip(None)
+
+        self.__gridChanged = False
 
-        for i in self.__yLabels:
-            pg.draw.line(self.__screen, (170, 170, 170),
-                         (self.__rect.left, i), (self.__rect.right, i), 1)
+    def changeLabelGap(self, xLabelGap, yLabelGap):
+        # Called every frame in setup, but the grid only needs to be redrawn
+        # if the scale has changed
+        if xLabelGap == self.__xLabelGap and yLabelGap == self.__yLabelGap:
+            return
 
-        for i in self.lines:
-            i.draw()
+        self.__xLabelGap = xLabelGap
+        self.__yLabelGap = yLabelGap
+        self.__gridChanged = True
 
-    def changeLabelGap(self, xLabelGap, yLabelGap):
-        self.__xLabels = []
-        x = self.__width
-        while x > 0:
-            self.__xLabels.append(self.__width - x)
-            x -= xLabelGap
-
-        self.__yLabels = []
-        y = 0
-        while y < self.__height:
-            self.__yLabels.append(self.__height - y)
-            y += yLabelGap
+    def scaleLabelGap(self, ratio):
+        # Keeps the grid the same size relative to the world when zooming
+        self.changeLabelGap(self.__xLabelGap * ratio, self.__yLabelGap * ratio)
+
+    def setWorld(self, worldRect):
+        # worldRect is (left, top, width, height) of the world's walls on
+        # screen - changes whenever the camera moves
+        worldRect = tuple(worldRect)
+        if worldRect != self.__worldRect:
+            self.__worldRect = worldRect
+            self.__gridChanged = True
 
     def clearLines(self):
         for i in self.lines:
             del i
 
         self.lines = []
+        self.__trailsChanged = True
 
 
 class Line(object):
-    def __init__(self, surface, graph, colour):
-        self.__screen = surface
+    # Once a line has this many points, older points get simplified, and if
+    # that isn't enough the oldest ones are dropped - stops long simulations
+    # from using more and more memory
+    MAX_PLOTS = 2000
+
+    # Maximum distance (in pixels, at the scale when the line is simplified)
+    # that a simplified line can stray from the original line
+    TOLERANCE = 1
+
+    def __init__(self, graph, colour):
+        self.__graph = graph
 
         graph.lines.append(self)
 
+        # A trail the same colour as the trail layer's colour key would be
+        # transparent
+        if tuple(colour[:3]) == TRAIL_KEY:
+            colour = (TRAIL_KEY[0], TRAIL_KEY[1], TRAIL_KEY[2] + 1)
         self.__colour = colour
 
+        # Each plot is stored as (frameNumber, x, y), so that the line can be
+        # cut back to the right place when time is rewound
         self.__plotCoords = []
 
-    def draw(self):
-        plots = self.__plotCoords
+        # Segments that haven't been drawn onto the trail layer yet
+        self.__newSegments = []
+
+    def addPlot(self, plot, frame):
+        # Frames that have already been plotted are not plotted again (e.g.
+        # when replaying frames after rewinding)
+        if self.__plotCoords and frame <= self.__plotCoords[-1][0]:
+            return
+
+        # Plots are in metres, so that they don't change when the camera moves
+        newPlot = (frame, plot[0], plot[1])
+
+        if self.__plotCoords:
+            lastPlot = self.__plotCoords[-1]
+            if abs(newPlot[1] - lastPlot[1]) * scale < 1 and \
+                    abs(newPlot[2] - lastPlot[2]) * scale < 1:
+                # Particle hasn't moved a whole pixel - just move the last
+                # plot forward in time rather than adding another one
+                self.__plotCoords[-1] = newPlot
+                return
+
+            # Only the newest segment needs drawing - everything before it
+            # is already on the graph's trail layer. Segments that are off
+            # screen are still stored, just not drawn.
+            if self.segmentOnScreen(lastPlot[1:], newPlot[1:]):
+                self.__newSegments.append((lastPlot[1:], newPlot[1:]))
+
+        self.__plotCoords.append(newPlot)
+
+        if len(self.__plotCoords) > self.MAX_PLOTS:
+            self.__plotCoords = simplifyPath(self.__plotCoords,
+                                             self.TOLERANCE / scale)
+
+            # If the line is too complex to simplify, drop the oldest half
+            if len(self.__plotCoords) > self.MAX_PLOTS * 0.75:
+                self.__plotCoords = \
+                    self.__plotCoords[-int(self.MAX_PLOTS / 2):]
+
+            # The trail layer still has the old points drawn on it
+            self.__graph.trailsChanged()
+
+    @staticmethod
+    def segmentOnScreen(start, end):
+        # True if the box around the segment overlaps the render surface, so
+        # the segment where a particle goes off screen is still drawn
+        x1, y1 = worldToRender(start)
+        x2, y2 = worldToRender(end)
+        width, height = renderSurface.get_size()
+        return max(x1, x2) >= 0 and min(x1, x2) <= width and \
+            max(y1, y2) >= 0 and min(y1, y2) <= height
+
+    def takeNewSegments(self):
+        # Segments plotted since this was last called, ready to be drawn
+        segments = self.__newSegments
+        self.__newSegments = []
+        return self.__colour, segments
+
+    def getPoints(self):
+        # Copy of the whole line - only used when the trail layer is redrawn
+        return self.__colour, [i[1:] for i in self.__plotCoords]
+
+    def rewindTo(self, frame):
+        # Removes all plots from after the given frame
+        removed = False
+        while self.__plotCoords and self.__plotCoords[-1][0] > frame:
+            self.__plotCoords.pop()
+            removed = True
+
+        if removed:
+            self.__graph.trailsChanged()
+
+
+# Decides how much detail each particle is drawn with. Small particles are
+# drawn without their arrows, and tiny ones as a single point, as the detail
+# can't be seen anyway.
+class LevelOfDetail(object):
+    FULL = 0  # Circle and direction arrow
+    CIRCLE = 1  # Circle only
+    POINT = 2  # Single point
+
+    def __init__(self, arrowRadius, pointRadius, denseCount, auto=True,
+                 targetFrameTime=1 / 60):
+        # Particles with an on-screen radius (in pixels) smaller than
+        # arrowRadius are drawn without an arrow, and ones smaller than
+        # pointRadius are drawn as a point
+        self.__arrowRadius = arrowRadius
+        self.__pointRadius = pointRadius
+
+        # Once there are more particles than this on screen, the radii above
+        # start to increase
+        self.__denseCount = denseCount
+
+        # In auto mode, the radii are also increased whenever frames are
+        # taking longer than targetFrameTime, and decreased again when there
+        # is time to spare
+        self.__auto = auto
+        self.__targetFrameTime = targetFrameTime
+        self.__bias = 1
+
+        self.__multiplier = 1
+
+        # If False, no particles are drawn with arrows, whatever their size
+        self.__arrows = True
+
+    def config(self, arrowRadius=None, pointRadius=None, denseCount=None,
+               auto=None, targetFrameTime=None, arrows=None):
+        if arrowRadius is not None:
+            self.__arrowRadius = arrowRadius
+
+        if pointRadius is not None:
+            self.__pointRadius = pointRadius
+
+        if denseCount is not None:
+            self.__denseCount = denseCount
+
+        if auto is not None:
+            self.__auto = auto
+            if not auto:
+                self.__bias = 1
+
+        if targetFrameTime is not None:
+            self.__targetFrameTime = targetFrameTime
+
+        if arrows is not None:
+            self.__arrows = arrows
+
+    def newFrame(self, particleCount, frameTime):
+        # Called once a frame, before any particles are drawn
+        if self.__auto and frameTime > 0:
+            if frameTime > self.__targetFrameTime * 1.1:
+                self.__bias = min(self.__bias * 1.1, 8)
+            elif frameTime < self.__targetFrameTime * 0.8:
+                self.__bias = max(self.__bias / 1.05, 1)
+
+        # Square root so that the radii grow slowly as particle count goes up
+        density = max(1, math.sqrt(particleCount / self.__denseCount))
+        self.__multiplier = self.__bias * density
+
+    def getThresholds(self):
+        # Returns the on-screen radii below which particles are drawn as
+        # points, and without arrows
+        if not self.__arrows:
+            return self.__pointRadius * self.__multiplier, math.inf
+
+        return self.__pointRadius * self.__multiplier, \
+            self.__arrowRadius * self.__multiplier
+
+    def getTier(self, screenRadius):
+        if screenRadius < self.__pointRadius * self.__multiplier:
+            return LevelOfDetail.POINT
+        elif screenRadius < self.__arrowRadius * self.__multiplier or \
+                not self.__arrows:
+            return LevelOfDetail.CIRCLE
+        else:
+            return LevelOfDetail.FULL
+
+
+class QualityGovernor(object):
+    """Turns off expensive extras one at a time when frames are taking longer
+    than they should, and turns them back on again (in reverse order) once
+    there is time to spare. Only changes anything after a run of slow or fast
+    frames, so that one slow frame doesn't flip the quality back and forth.
+
+    """
+    # Extras, in the order that they are turned off
+    STEPS = ["arrows", "trails", "antialiasing", "full resolution"]
+
+    def __init__(self, targetFrameTime, slowFrames=30, fastFrames=120):
+        self.__targetFrameTime = targetFrameTime
 
-        if len(plots) > 1:
-            pg.draw.lines(self.__screen, self.__colour, False, plots, 2)
+        # How many slow frames in a row before something is turned off, and
+        # how many fast frames in a row before it is turned back on
+        self.__slowFramesNeeded = slowFrames
+        self.__fastFramesNeeded = fastFrames
 
-    def addPlot(self, plot):
-        self.__plotCoords.append((int(plot[0]), int(plot[1])))
+        self.__slowFrames = 0
+        self.__fastFrames = 0
+
+        self.__steps = list(self.STEPS)
+
+        # Number of steps that are currently turned off
+        self.__level = 0
+
+    def config(self, targetFrameTime=None, slowFrames=None, fastFrames=None):
+        if targetFrameTime is not None:
+            self.__targetFrameTime = targetFrameTime
+
+        if slowFrames is not None:
+            self.__slowFramesNeeded = slowFrames
+
+        if fastFrames is not None:
+            self.__fastFramesNeeded = fastFrames
+
+    def newFrame(self, frameTime):
+        # frameTime should only include the time spent working on the frame,
+        # not time spent waiting for the next one
+        if frameTime > self.__targetFrameTime * 1.1:
+            self.__slowFrames += 1
+            self.__fastFrames = 0
+        elif frameTime < self.__targetFrameTime * 0.7:
+            self.__fastFrames += 1
+            self.__slowFrames = 0
+        else:
+            self.__slowFrames = 0
+            self.__fastFrames = 0
+
+        if self.__slowFrames >= self.__slowFramesNeeded and \
+                self.__level < len(self.__steps):
+            self.__level += 1
+            self.__slowFrames = 0
+
+        elif self.__fastFrames >= self.__fastFramesNeeded and \
+                self.__level > 0:
+            self.__level -= 1
+            self.__fastFrames = 0
+
+    def getTurnedOff(self):
+        return self.__steps[:self.__level]
+
+    def isOn(self, step):
+        return step not in self.__steps[:self.__level]
+
+
+# Renderers draw particles. Each one has a drawParticle method, which is
+# called for every particle in a frame, and a finish method, called once all of
+# them have been passed to drawParticle.
+class SpriteRenderer(object):
+    # Draws each particle as it is passed to it
+    def drawParticle(self, particle):
+        # Culling - particles that can't be seen aren't drawn, and their
+        # arrows aren't rotated.
+        global culledParticles
+
+        if particle.onScreen():
+            tier = levelOfDetail.getTier(particle.radius * scale * renderScale)
+            if tier == LevelOfDetail.POINT:
+                particle.drawPoint()
+            else:
+                particle.draw()
+                if tier == LevelOfDetail.FULL:
+                    particle.drawDirectionArrow()
+            return True
+
+        culledParticles += 1
+        return False
+
+    def finish(self):
+        pass
+
+
+class SurfarrayRenderer(object):
+    """Collects all of the particles in a frame, then draws them straight into
+    the surface's pixels with NumPy, all in one go. Much faster than drawing
+    them one at a time once there are thousands of small particles.
+
+    """
+    # Particles bigger than this are drawn with pg.draw.circle instead - there
+    # won't be many of them, and their stamps would be very large
+    MAX_STAMP_RADIUS = 32
+
+    def __init__(self, surface):
+        self.__surface = surface
+
+        # Stamps are the offsets of every pixel in a disc of a certain
+        # radius, from the centre of the disc
+        self.__stamps = {}
+
+        self.__particles = []
+
+    def getStamp(self, radius):
+        if radius not in self.__stamps:
+            yOffsets, xOffsets = np.mgrid[-radius:radius + 1,
+                                          -radius:radius + 1]
+            inDisc = xOffsets ** 2 + yOffsets ** 2 <= radius ** 2 + radius
+            self.__stamps[radius] = (xOffsets[inDisc], yOffsets[inDisc])
+
+        return self.__stamps[radius]
+
+    def drawParticle(self, particle):
+        # Nothing is drawn until finish is called, and the culled count is
+        # worked out all at once there too - but whether the particle is on
+        # screen is still returned, like SpriteRenderer does
+        self.__particles.append(particle)
+        return particle.onScreen()
+
+    def mapColours(self, colours):
+        # Same as surface.map_rgb, but for a whole array of colours at once
+        shifts = self.__surface.get_shifts()
+        losses = self.__surface.get_losses()
+        mapped = self.__surface.get_masks()[3]
+        for i in range(0, 3):
+            mapped = mapped | ((colours[:, i] >> losses[i]) << shifts[i])
+
+        return mapped
+
+    def finish(self):
+        global culledParticles
+
+        if self.__particles:
+            data = np.array([(p.rect.x, p.rect.y, p.radius) + p.colour[:3]
+                             for p in self.__particles], dtype=np.float64)
+            xs, ys = data[:, 0].astype(np.int64), data[:, 1].astype(np.int64)
+            screenRadii = data[:, 2] * scale * renderScale
+            colours = self.mapColours(data[:, 3:6].astype(np.int64))
+
+            width, height = self.__surface.get_size()
+
+            # Culling, the same as Particle.onScreen
+            onScreen = (xs + screenRadii >= 0) & (xs - screenRadii <= width) \
+                & (ys + screenRadii >= 0) & (ys - screenRadii <= height)
+            culledParticles += int(np.count_nonzero(~onScreen))
+
+            # Level of detail - points are drawn with a radius 0 stamp, which
+            # is a single pixel
+            pointRadius, arrowRadius = levelOfDetail.getThresholds()
+            radii = np.where(screenRadii < pointRadius, 0,
+                             screenRadii.astype(np.int64))
+            arrows = np.nonzero(onScreen & (screenRadii >= arrowRadius))[0]
+
+            xs, ys = xs[onScreen], ys[onScreen]
+            radii, colours = radii[onScreen], colours[onScreen]
+
+            for i in np.nonzero(radii > self.MAX_STAMP_RADIUS)[0]:
+                pg.draw.circle(self.__surface,
+                               self.__surface.unmap_rgb(int(colours[i])),
+                               (int(xs[i]), int(ys[i])), int(radii[i]))
+
+            # Locks the surface until pixels is deleted
+            pixels = pg.surfarray.pixels2d(self.__surface)
+
+            # All particles with the same radius share a stamp, so can be
+            # drawn together
+            for radius in np.unique(radii[radii <= self.MAX_STAMP_RADIUS]):
+                group = radii == radius
+                xOffsets, yOffsets = self.getStamp(int(radius))
+
+                stampXs = xs[group, None] + xOffsets[None, :]
+                stampYs = ys[group, None] + yOffsets[None, :]
+                stampColours = np.broadcast_to(colours[group, None],
+                                               stampXs.shape)
+
+                # Only particles touching the edges of the surface need each
+                # of their pixels checking
+                inside = (xs[group] >= radius) & \
+                    (xs[group] < width - radius) & \
+                    (ys[group] >= radius) & (ys[group] < height - radius)
+                pixels[stampXs[inside].ravel(), stampYs[inside].ravel()] = \
+                    stampColours[inside].ravel()
+
+                stampXs = stampXs[~inside].ravel()
+                stampYs = stampYs[~inside].ravel()
+                stampColours = stampColours[~inside].ravel()
+                onSurface = (stampXs >= 0) & (stampXs < width) & \
+                    (stampYs >= 0) & (stampYs < height)
+                pixels[stampXs[onSurface], stampYs[onSurface]] = \
+                    stampColours[onSurface]
+
+            del pixels
+
+            # Arrows need drawing on top of the circles
+            for i in arrows:
+                self.__particles[i].drawDirectionArrow()
+
+        self.__particles = []
+
+
+def switchRenderer():
+    # Swaps between drawing particles one at a time, and all at once with
+    # NumPy (if it is installed)
+    global particleRenderer
+
+    # pixels2d needs a 32 bit surface
+    if isinstance(particleRenderer, SpriteRenderer) and np is not None and \
+            renderSurface.get_bytesize() == 4:
+        particleRenderer = SurfarrayRenderer(renderSurface)
+    else:
+        particleRenderer = SpriteRenderer()
 
 
 class Particle(pg.sprite.Sprite):
@@ -122,7 +663,6 @@ class Particle(pg.sprite.Sprite):
         self.hasRandomVelocity = False
         self.line = False
         self.restCoefficient = coefficient
-        self.material = material
         self.radius = rad
         self.density = density
         self.mass = 0
@@ -130,11 +670,16 @@ class Particle(pg.sprite.Sprite):
         self.updateDimension(rad=self.radius)
         self.velocity = pgmath.Vector2(v)
         self.colour = colour
-        self.rect = pg.draw.circle(screen, self.colour, centre,
-                                   int(self.radius * scale))
-        self.rect.x += int(self.radius * scale)
-        self.rect.y += int(self.radius * scale)
-        self.pos = pgmath.Vector2(self.rect.x, self.rect.y)
+        # Only the material's id in the registry is kept - see material
+        self.materialId = registry.getId(material, density, colour)
+
+        # pos is in metres in the world. rect is where the centre of the
+        # particle is on the render surface, and is worked out from pos every
+        # frame. Anything that needs the particle's position in the window
+        # should use worldToScreen(pos) instead, as they can be different.
+        self.pos = screenToWorld(centre)
+        self.rect = pg.Rect(0, 0, 0, 0)
+        self.updateRect()
         if not xA:  # Assigns 0 as default x acceleration, if no value is passed
             self.acceleration = pgmath.Vector2(0, yA)
         else:
@@ -145,10 +690,19 @@ class Particle(pg.sprite.Sprite):
 
         # Dictionary storing data on each frame
         self.posDict = {
-            0: (pgmath.Vector2(centre), pgmath.Vector2(v), tNow)
+            0: (pgmath.Vector2(self.pos), pgmath.Vector2(v), tNow)
         }
         self.recentCollisions = []
 
+    @property
+    def material(self):
+        # The material's name, for anything that shows or saves it
+        return registry.names[self.materialId]
+
+    @material.setter
+    def material(self, name):
+        self.materialId = registry.getId(name, self.density, self.colour)
+
     def angleTo(self, p2):
         xDistance = self.pos.x - p2.pos.x
         yDistance = self.pos.y - p2.pos.y
@@ -180,43 +734,65 @@ class Particle(pg.sprite.Sprite):
         del self
 
     def draw(self):
-        pg.draw.circle(screen, self.colour, (self.rect.x, self.rect.y),
-                       int(self.radius * scale))
+        pg.draw.circle(renderSurface, self.colour, (self.rect.x, self.rect.y),
+                       int(self.radius * scale * renderScale))
+
+    def drawPoint(self):
+        # Much quicker than drawing a circle - used for tiny particles
+        size = max(1, int(self.radius * scale * renderScale * 2))
+        renderSurface.fill(self.colour, (self.rect.x - size // 2,
+                                         self.rect.y - size // 2, size, size))
+
+    def drawIfOnScreen(self, draw=True):
+        # Drawing is handled by whichever renderer is currently in use.
+        # Returns whether or not the particle was on screen. If draw is False
+        # (the render thread is drawing a snapshot instead) the particle is
+        # only checked, not drawn.
+        if not draw:
+            return self.onScreen()
+        return particleRenderer.drawParticle(self)
 
     def drawDirectionArrow(self):
         arrow = ARROW_IMAGE  # Prevents having to load image every time
-        arrowscale = (self.radius * scale / arrow.get_width()) * 1.5
-        # Rotate and scale arrow image to fit particle
-        arrow = pg.transform.rotozoom(arrow, math.degrees(self.direction),
-                                      arrowscale)
+        arrowscale = (self.radius * scale * renderScale /
+                      arrow.get_width()) * 1.5
+        # Rotate and scale arrow image to fit particle. rotozoom smooths the
+        # edges, but is slower than scaling and rotating separately.
+        if antialias:
+            arrow = pg.transform.rotozoom(arrow, math.degrees(self.direction),
+                                          arrowscale)
+        else:
+            size = (int(arrow.get_width() * arrowscale),
+                    int(arrow.get_height() * arrowscale))
+            arrow = pg.transform.rotate(pg.transform.scale(arrow, size),
+                                        math.degrees(self.direction))
         arrowRect = arrow.get_rect(center=(self.rect.x, self.rect.y))
-        screen.blit(arrow, arrowRect)
+        renderSurface.blit(arrow, arrowRect)
 
     def hasCollided(self, group):
         collisionList = []
         # Checks each sprite in the group and if the sum of their radii is less
         # than the absolute distance between their centres, they have collided.
         for sprite in group.sprites():
-            totalRad = self.radius * scale + sprite.radius * scale
+            totalRad = self.radius + sprite.radius
             if absoluteDistance(self.pos, sprite.pos) <= totalRad \
                     and sprite != self:
                 collisionList.append(sprite)
 
         return collisionList
 
-    def scalePosition(self):
-        # If the scale has changed since last frame, then the particle will
-        # get resized and relocated, so that it will be in the same place
-        # relative to the window and other particles.
-        if previousScale != scale:
-            mouseX = pg.mouse.get_pos()[0]
-            fromMouseX = mouseX - self.pos.x
-            self.pos.x = mouseX - (fromMouseX * (scale / previousScale))
-            fromFloor = SH - self.pos.y
-            self.pos.y = SH - (fromFloor * (scale / previousScale))
-            self.rect.x, self.rect.y = int(self.pos.x), int(self.pos.y)
-        else:
-            pass
+    def onScreen(self):
+        # True if any part of the particle is inside the window
+        rad = self.radius * scale * renderScale
+        width, height = renderSurface.get_size()
+        return self.rect.x + rad >= 0 and self.rect.x - rad <= width and \
+            self.rect.y + rad >= 0 and self.rect.y - rad <= height
+
+    def updateRect(self):
+        # Moves the particle to wherever its position in the world is on
+        # the render surface, as seen by the camera
+        x, y = worldToRender(self.pos)
+        self.rect.x, self.rect.y = int(x), int(y)
 
     def updateDirection(self):
         # Gets direction of travel (in radians)
@@ -237,12 +813,10 @@ class Particle(pg.sprite.Sprite):
             rad = ((3 * self.vol) / (4 * math.pi)) ** (1 / 3)
             self.radius = roundToSigFig(rad, 3)
 
-    def update(self):
+    def update(self, draw=True):
         global frameNumber
         global tNow
 
-        self.scalePosition()
-
         # If time is moving backwards
         if TIME_SCALES[currentTimescale] < 0:
             try:
@@ -257,9 +831,11 @@ class Particle(pg.sprite.Sprite):
 
             self.updateDirection()
 
-            self.rect.x, self.rect.y = int(self.pos.x), int(self.pos.y)
-            self.draw()
-            self.drawDirectionArrow()
+            if self.line:
+                self.line.rewindTo(frameNumber)
+
+            self.updateRect()
+            self.drawIfOnScreen(draw)
 
         # If time is moving forward
         elif TIME_SCALES[currentTimescale] > 0:
@@ -272,32 +848,32 @@ class Particle(pg.sprite.Sprite):
                 # that particle's velocity would take it towards the floor
                 # in order to make sure that the particle hasn't collided and
                 # was turned around in the previous frame.
-                if self.pos.y + self.radius * scale >= SH and \
+                if self.pos.y + self.radius >= worldBounds[3] and \
                         self.velocity.y * timeMultiplier > 0:
                     self.velocity.y = roundToSigFig(
                         self.velocity.y * self.restCoefficient * -1, 4)
-                    self.pos.y = SH - self.radius * scale
+                    self.pos.y = worldBounds[3] - self.radius
 
                 # Has collided with ceiling
-                elif self.pos.y - self.radius * scale <= 0 and \
+                elif self.pos.y - self.radius <= worldBounds[1] and \
                         self.velocity.y * timeMultiplier < 0:
                     self.velocity.y = roundToSigFig(
                         self.velocity.y * self.restCoefficient * -1, 4)
-                    self.pos.y = 0 + self.radius * scale
+                    self.pos.y = worldBounds[1] + self.radius
 
                 # Has collided with right wall
-                if self.pos.x + self.radius * scale >= SW and \
+                if self.pos.x + self.radius >= worldBounds[2] and \
                         self.velocity.x * timeMultiplier > 0:
                     self.velocity.x = roundToSigFig(
                         self.velocity.x * self.restCoefficient * -1, 4)
-                    self.pos.x = SW - self.radius * scale
+                    self.pos.x = worldBounds[2] - self.radius
 
                 # Has collided with left wall
-                elif self.pos.x - self.radius * scale <= 0 and \
+                elif self.pos.x - self.radius <= worldBounds[0] and \
                         self.velocity.x * timeMultiplier < 0:
                     self.velocity.x = roundToSigFig(
                         self.velocity.x * self.restCoefficient * -1, 4)
-                    self.pos.x = 0 + self.radius * scale
+                    self.pos.x = worldBounds[0] + self.radius
                 #
                 # Multiply by timeMultiplier in order to increase velocity by
                 # the correct amount per second.
@@ -305,14 +881,12 @@ class Particle(pg.sprite.Sprite):
 
                 self.updateDirection()
 
-                # Multiply by scale as velocity is ms^-1, multiply by
+                # Both position and velocity are in metres, multiply by
                 # timeMultiplier for the same reasons as before
-                self.pos += self.velocity * scale * timeMultiplier
+                self.pos += self.velocity * timeMultiplier
 
-                # Rect coordinates need to be integers
-                self.rect.x, self.rect.y = int(self.pos.x), int(self.pos.y)
-                self.draw()
-                self.drawDirectionArrow()
+                self.updateRect()
+                self.drawIfOnScreen(draw)
                 collisionList = self.hasCollided(particles)
                 for particle in collisionList:
                     # Self is included in collisionList, therefore != self
@@ -340,7 +914,7 @@ class Particle(pg.sprite.Sprite):
                         particle.recentCollisions.remove(self)
 
                 if self.line:
-                    self.line.addPlot((self.pos.x, self.pos.y))
+                    self.line.addPlot((self.pos.x, self.pos.y), frameNumber)
 
             elif frameNumber in self.posDict:
                 # If current frame has already been simulated, grab values
@@ -351,9 +925,13 @@ class Particle(pg.sprite.Sprite):
                 tNow = p[2]
                 self.updateDirection()
 
-                self.rect.x, self.rect.y = int(self.pos.x), int(self.pos.y)
-                self.draw()
-                self.drawDirectionArrow()
+                self.updateRect()
+                self.drawIfOnScreen(draw)
+
+                # Re-plots frames that were removed from the line when time
+                # was rewound
+                if self.line:
+                    self.line.addPlot((self.pos.x, self.pos.y), frameNumber)
 
             p = pgmath.Vector2(self.pos.x, self.pos.y)
             v = pgmath.Vector2(self.velocity.x, self.velocity.y)
@@ -364,11 +942,11 @@ class Particle(pg.sprite.Sprite):
                 # Interpolates what the position and velocity will be based
                 # on current velocity and acceleration
                 if (frameNumber - 1.5) not in self.posDict:
-                    olderPos = p - (v * scale * timeMultiplier * 1.5)
+                    olderPos = p - (v * timeMultiplier * 1.5)
                     self.posDict[frameNumber - 1.5] = (olderPos, v, tNow)
 
                 if (frameNumber - 1) not in self.posDict:
-                    oldPos = p - (v * scale * timeMultiplier)
+                    oldPos = p - (v * timeMultiplier)
                     self.posDict[frameNumber - 1] = (oldPos, v, tNow)
 
             # x1 or x2
@@ -377,8 +955,7 @@ class Particle(pg.sprite.Sprite):
                 # Interpolates what the position and velocity will be based
                 # on current velocity and acceleration
                 if (frameNumber - 0.5) not in self.posDict:
-                    oldPos = p - (
-                            v * scale * timeMultiplier * 0.5)
+                    oldPos = p - (v * timeMultiplier * 0.5)
                     self.posDict[frameNumber - 0.5] = (oldPos, v, tNow)
 
             if frameNumber not in self.posDict:
@@ -391,11 +968,612 @@ class Particle(pg.sprite.Sprite):
             # the user to rewind through at any speed.
 
 
+class ParticleSnapshot(object):
+    # Copy of everything needed to draw a particle at one moment, so the
+    # render thread can draw it while the particle itself is being updated
+    def __init__(self, particle):
+        # The particle's rect is from before the camera last moved, so is
+        # worked out again here
+        x, y = worldToRender(particle.pos)
+        self.rect = pg.Rect(int(x), int(y), 0, 0)
+        self.radius = particle.radius
+        self.colour = particle.colour
+        self.direction = particle.direction
+
+    # Drawn in exactly the same way as a particle
+    onScreen = Particle.onScreen
+    draw = Particle.draw
+    drawPoint = Particle.drawPoint
+    drawDirectionArrow = Particle.drawDirectionArrow
+
+
+class RenderThread(threading.Thread):
+    """Draws the graph and particles from snapshots of one frame, while the
+    main thread works out the physics for the next. The main thread doesn't
+    draw anything between submit and wait, so the two never draw onto the
+    screen at the same time.
+
+    """
+    def __init__(self):
+        super().__init__(daemon=True)
+
+        self.__trailChanges = None
+        self.__snapshots = []
+
+        # Any exception is passed back to the main thread by wait, rather than
+        # leaving it waiting forever for a frame that will never be finished
+        self.__error = None
+
+        self.__submitted = threading.Event()
+        self.__finished = threading.Event()
+        self.__finished.set()
+
+    def submit(self, trailChanges, snapshots):
+        self.__trailChanges = trailChanges
+        self.__snapshots = snapshots
+        self.__finished.clear()
+        self.__submitted.set()
+
+    def wait(self):
+        self.__finished.wait()
+
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    def run(self):
+        while True:
+            self.__submitted.wait()
+            self.__submitted.clear()
+
+            try:
+                renderSurface.fill(BG_COLOUR)
+                particleGraph.draw(self.__trailChanges)
+                drawParticles(self.__snapshots)
+                presentRender()
+            except Exception as e:
+                self.__error = e
+
+            self.__snapshots = []
+            self.__finished.set()
+
+
+def makeParticles(rows):
+    # Makes a particle for each row read from a saved scenario (see
+    # scenarioFile.COLUMNS), without adding them to the group
+    newParticles = []
+    for (randomVelocity, line, coefficient, material, radius, density, mass,
+         vol, vx, vy, red, green, blue, x, y, ax, ay) in rows:
+        colour = (red, green, blue)
+        particle = Particle(coefficient, material, radius, density, (vx, vy),
+                            colour, (x, y), ay, ax)
+
+        particle.hasRandomVelocity = bool(randomVelocity)
+        if line:
+            particle.line = Line(particleGraph, colour)
+        else:
+            particle.line = None
+        particle.mass = mass
+        particle.vol = vol
+        newParticles.append(particle)
+
+    return newParticles
+
+
+def loadScenario(path):
+    # Adds the particles from a saved scenario, and sets the scale and graph
+    # to the ones they were saved with
+    global particleGraph
+
+    # Works with both binary and old text scenarios
+    scenario = scenarioFile.readScenario(path)
+
+    # Positions are saved in pixels, with the walls at the edges of the
+    # screen, so the camera needs to be put back to where it was when saving
+    particleGraph = newGraph(scenario.scale)
+    resetCamera(scenario.scale)
+
+    # The particles are all made first, and then added to the group in one
+    # go - particles.sprites() makes a new list every time, so using it to
+    # get at the particle that was just added made loading O(n^2)
+    particles.add(makeParticles(scenario.rows()))
+    scenario.close()
+
+
+def particleRow(particle):
+    # A particle's values for the setup journal - in the same order as
+    # scenarioFile.COLUMNS, but with its position in the world
+    return [int(particle.hasRandomVelocity), int(bool(particle.line)),
+            particle.restCoefficient, particle.material, particle.radius,
+            particle.density, particle.mass, particle.vol,
+            particle.velocity.x, particle.velocity.y, particle.colour[0],
+            particle.colour[1], particle.colour[2], particle.pos.x,
+            particle.pos.y, particle.acceleration.x, particle.acceleration.y]
+
+
+def recoverSetup():
+    # Puts back the particles that were left in the setup journal when the
+    # program last closed part way through setup. Returns how many there
+    # were.
+    global particleGraph
+    global cameraOffset
+
+    recovered = journal.takeRecovered()
+    if recovered is None:
+        return 0
+
+    camera, rows = recovered
+    if camera is not None:
+        particleGraph = newGraph(camera[0])
+        resetCamera(camera[0])
+        cameraOffset = pgmath.Vector2(camera[1], camera[2])
+        fitWorldToView()
+
+    # makeParticles takes positions on screen, which are put back to exactly
+    # where they were in the world afterwards
+    newParticles = makeParticles(
+        [row[:13] + list(worldToScreen(row[13:15])) + row[15:]
+         for row in rows])
+    for particle, row in zip(newParticles, rows):
+        particle.pos = pgmath.Vector2(row[13], row[14])
+        particle.posDict[0] = (pgmath.Vector2(particle.pos),
+                               pgmath.Vector2(particle.velocity), tNow)
+        particle.updateRect()
+
+    particles.add(newParticles)
+    return len(newParticles)
+
+
+class ScenarioLoad(object):
+    """Loads a saved scenario while setup keeps running. The file is read by a
+    scenarioFile.ScenarioReader on a background thread, and update (called
+    once a frame) adds whichever chunks of particles are ready, for up to
+    timeLimit seconds, so particles appear a chunk at a time and the screen
+    never freezes.
+
+    """
+    def __init__(self, path, timeLimit=0.008):
+        self.__reader = scenarioFile.ScenarioReader(path)
+        self.__reader.start()
+        self.__timeLimit = timeLimit
+        self.__scaleSet = False
+        self.__added = []
+        # The graph, scale and camera offset from before the scenario's scale
+        # was set, so they can be put back if loading is cancelled
+        self.__oldCamera = None
+
+    def cancel(self):
+        # Stops reading, and removes the particles that were already added,
+        # leaving the scenario as it was before
+        global particleGraph
+        global scale
+        global cameraOffset
+
+        self.__reader.cancel()
+        particles.remove(self.__added)
+        for particle in self.__added:
+            journal.remove(particle)
+        self.__added = []
+
+        if self.__oldCamera is not None:
+            particleGraph, scale, cameraOffset = self.__oldCamera
+            self.__oldCamera = None
+            fitWorldToView()
+
+    def finish(self, last=None):
+        # Waits for the rest of the scenario to be read, and adds it all
+        self.__reader.join()
+        self.__timeLimit = None
+        self.update(last)
+
+    def getError(self):
+        # Why the scenario couldn't be loaded, or None
+        return self.__reader.getError()
+
+    def getProgress(self):
+        # Fraction of the particles that have been added so far
+        total = self.__reader.getTotal()
+        if not total:
+            return 0
+        return len(self.__added) / total
+
+    def update(self, last=None):
+        """Adds the chunks of particles that have been read, and returns True
+        once the whole scenario has been loaded, or once it has failed to
+        (then getError says why, and the load has been cancelled). last is a
+        particle that has to stay at the end of the group (the one following
+        the mouse in setup), so the loaded particles are put in front of it.
+
+        """
+        global particleGraph
+
+        if self.__reader.getError() is not None:
+            # Nothing is kept from a scenario that couldn't be read in full
+            self.cancel()
+            return True
+
+        if self.__reader.getScale() is None:
+            return self.__reader.isFinished()
+
+        if not self.__scaleSet:
+            # Positions are saved in pixels, with the walls at the edges of
+            # the screen, so the camera needs to be put back to where it was
+            # when saving before any particles are made
+            self.__oldCamera = (particleGraph, scale, cameraOffset)
+            particleGraph = newGraph(self.__reader.getScale())
+            resetCamera(self.__reader.getScale())
+            self.__scaleSet = True
+
+        start = time.perf_counter()
+        newParticles = []
+        while self.__timeLimit is None or \
+                time.perf_counter() - start < self.__timeLimit:
+            rows = self.__reader.takeChunk()
+            if rows is None:
+                break
+
+            chunk = makeParticles(rows)
+            for particle in chunk:
+                journal.add(particle, particleRow(particle))
+            newParticles += chunk
+
+        if newParticles:
+            if last is not None:
+                particles.remove(last)
+            particles.add(newParticles)
+            if last is not None:
+                particles.add(last)
+            self.__added += newParticles
+
+        return self.__reader.isFinished()
+
+
+def drawTimeText(tDisplay):
+    # Shows the current time and time multiplier in the top left corner
+    timeFont = pgkRoot.getFont(MID_FONT[0], MID_FONT[1])
+    timeText = pgkRoot.renderText(timeFont, "Time: T+" + str(tDisplay),
+                                  antialias, (0, 0, 0))
+    tRect = timeText.get_rect(topleft=(10, 10))
+
+    timescaleFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+    tscaleText = pgkRoot.renderText(timescaleFont,
+                                    "Time Multiplier: x" +
+                                    str(TIME_SCALES[currentTimescale]),
+                                    antialias, (0, 0, 0))
+    tscaleRect = tscaleText.get_rect(topleft=(scaler(10, "x"),
+                                              scaler(50, "y")))
+
+    screen.blit(timeText, tRect)
+    screen.blit(tscaleText, tscaleRect)
+
+
+def encodeFrame(frame):
+    # Runs in one of FrameExporter's worker processes
+    data, size, path = frame
+    pg.image.save(pg.image.frombuffer(data, size, "RGB"), path)
+
+
+class FrameExporter(object):
+    """Saves frames as a numbered sequence of PNGs. Encoding is done by a pool
+    of worker processes (one per core by default), so exporting isn't held
+    back by how long each PNG takes to compress. If ffmpeg is installed, the
+    frames are also piped into it to make a video.
+
+    """
+    def __init__(self, folder, size, fps, workers=None):
+        self.__folder = Path(folder)
+        self.__folder.mkdir(parents=True, exist_ok=True)
+
+        self.__size = size
+        self.__frameCount = 0
+
+        self.__pool = multiprocessing.Pool(workers)
+
+        # Frames that are still being encoded. Limited so that frames can't
+        # pile up in memory if they are drawn faster than they're encoded.
+        self.__pending = deque()
+        self.__maxPending = (workers or os.cpu_count() or 1) * 2
+
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            self.__ffmpeg = None
+        else:
+            # yuv420p needs even dimensions, hence the padding
+            self.__ffmpeg = subprocess.Popen(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo",
+                 "-pix_fmt", "rgb24", "-s", "{0}x{1}".format(*size),
+                 "-r", str(fps), "-i", "-",
+                 "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                 "-pix_fmt", "yuv420p", str(self.__folder / "export.mp4")],
+                stdin=subprocess.PIPE)
+
+    def addFrame(self, surface):
+        data = pg.image.tostring(surface, "RGB")
+        path = str(self.__folder / "frame{0:06d}.png".format(self.__frameCount))
+        self.__frameCount += 1
+
+        if len(self.__pending) >= self.__maxPending:
+            self.__pending.popleft().get()
+
+        self.__pending.append(
+            self.__pool.apply_async(encodeFrame, ((data, self.__size, path),)))
+
+        if self.__ffmpeg is not None:
+            self.__ffmpeg.stdin.write(data)
+
+    def close(self):
+        # Waits for every frame to finish being encoded
+        while self.__pending:
+            self.__pending.popleft().get()
+
+        self.__pool.close()
+        self.__pool.join()
+
+        if self.__ffmpeg is not None:
+            self.__ffmpeg.stdin.close()
+            self.__ffmpeg.wait()
+
+        return self.__frameCount
+
+
+def exportRun(scenario, seconds, fps, folder):
+    # Runs a saved scenario for a set amount of time, with exactly 1/fps
+    # seconds between each frame, and saves every frame
+    global tNow
+    global frameNumber
+    global timeMultiplier
+    global currentTimescale
+    global culledParticles
+
+    # Can be given either the path to a file, or just the name of one in the
+    # saved scenarios folder
+    path = Path(scenario)
+    if not path.exists():
+        path = saveLocation / scenario
+
+    loadScenario(path)
+
+    currentTimescale = TIME_SCALES.index(1)
+    timeMultiplier = 1 / fps
+    tNow = 0
+    frameNumber = 0
+
+    # Every particle is drawn in full, no matter how long frames take
+    levelOfDetail.config(auto=False)
+
+    exporter = FrameExporter(folder, screen.get_size(), fps)
+
+    for i in range(0, int(seconds * fps)):
+        frameNumber += 1
+
+        renderSurface.fill(BG_COLOUR)
+        particleGraph.draw()
+
+        culledParticles = 0
+        levelOfDetail.newFrame(len(particles), 0)
+        particles.update()
+        particleRenderer.finish()
+        presentRender()
+
+        tNow += timeMultiplier
+        drawTimeText(round(tNow, 4))
+
+        exporter.addFrame(screen)
+
+    print("Exported {0} frames to {1}".format(exporter.close(), folder))
+
+
+# The camera decides which part of the world is shown on screen. Particles
+# and trails are stored in metres, and only converted to pixels when they're
+# drawn, so zooming and panning never have to move any of them.
+def worldToScreen(pos):
+    return (pos[0] - cameraOffset.x) * scale, (pos[1] - cameraOffset.y) * scale
+
+
+def screenToWorld(pos):
+    return pgmath.Vector2(pos[0] / scale + cameraOffset.x,
+                          pos[1] / scale + cameraOffset.y)
+
+
+def worldToRender(pos):
+    # Same as worldToScreen, but for the surface the simulation is drawn on,
+    # which is smaller than the window if renderScale is below 1
+    x, y = worldToScreen(pos)
+    return x * renderScale, y * renderScale
+
+
+def zoomCamera(point, ratio):
+    # Multiplies the scale by ratio, keeping whatever is at point (on screen)
+    # in the same place
+    global scale
+    global cameraOffset
+
+    fixed = screenToWorld(point)
+    scale *= ratio
+    cameraOffset = fixed - pgmath.Vector2(point) / scale
+    particleGraph.scaleLabelGap(ratio)
+    cameraMoved()
+
+
+def panCamera(x, y):
+    # Moves everything on screen by x and y pixels
+    global cameraOffset
+    cameraOffset = cameraOffset - pgmath.Vector2(x, y) / scale
+    cameraMoved()
+
+
+def resetCamera(newScale):
+    global scale
+    global cameraOffset
+
+    scale = newScale
+    cameraOffset = pgmath.Vector2(0, 0)
+    fitWorldToView()
+
+
+def fitWorldToView():
+    # Moves the walls of the world to the edges of the screen. In setup the
+    # walls always follow the screen, so zooming out makes the world bigger.
+    global worldBounds
+
+    worldBounds = [cameraOffset.x, cameraOffset.y,
+                   cameraOffset.x + SW / scale, cameraOffset.y + SH / scale]
+    cameraMoved()
+
+
+def cameraMoved():
+    # The grid and trails are drawn in pixels, so need redrawing when the
+    # camera moves
+    left, top = worldToRender(worldBounds[:2])
+    right, bottom = worldToRender(worldBounds[2:])
+    particleGraph.setWorld((left, top, right - left, bottom - top))
+    particleGraph.trailsChanged()
+
+
+def newGraph(labelGap):
+    # The graph is drawn onto the render surface, so it is the same size as
+    # it, and labelGap (in pixels on screen) is scaled to match
+    width, height = renderSurface.get_size()
+    return Graph(renderSurface, width, height, (0, 0), BG_COLOUR,
+                 labelGap * renderScale, labelGap * renderScale)
+
+
+def setRenderScale(newScale):
+    # Changes the resolution the simulation (grid, trails and particles) is
+    # drawn at. Below 1, it is drawn onto a smaller surface which is then
+    # stretched to fill the window by presentRender - filling and drawing
+    # fewer pixels is a lot quicker on big screens. Widgets and text are
+    # still drawn straight onto the screen at full resolution.
+    global renderScale
+    global renderSurface
+    global particleRenderer
+
+    if newScale == renderScale:
+        return
+
+    ratio = newScale / renderScale
+    renderScale = newScale
+
+    if renderScale == 1:
+        renderSurface = screen
+    else:
+        renderSurface = pg.Surface((max(1, int(SW * renderScale)),
+                                    max(1, int(SH * renderScale)))).convert()
+
+    width, height = renderSurface.get_size()
+    particleGraph.config(width=width, height=height, surface=renderSurface)
+    particleGraph.scaleLabelGap(ratio)
+    cameraMoved()
+
+    # The surfarray renderer draws straight into a surface's pixels, so needs
+    # to be given the new one
+    if isinstance(particleRenderer, SurfarrayRenderer):
+        particleRenderer = SurfarrayRenderer(renderSurface)
+
+
+def presentRender():
+    # Called once the simulation has been drawn, before anything is drawn on
+    # top of it. Does nothing when it was drawn straight onto the screen.
+    if renderSurface is not screen:
+        pg.transform.scale(renderSurface, (SW, SH), screen)
+
+
 def absoluteDistance(pVector1, pVector2):
     distance = pVector1 - pVector2
     return distance.length()
 
 
+def drawParticles(sprites):
+    # Draws every particle that is on screen, and counts the ones that aren't
+    global culledParticles
+    culledParticles = 0
+
+    levelOfDetail.newFrame(len(sprites), clock.get_rawtime() / 1000)
+
+    for sprite in sprites:
+        particleRenderer.drawParticle(sprite)
+
+    particleRenderer.finish()
+
+
+def getEvents(idle):
+    # Returns the events since the last frame. If idle is True (nothing has
+    # changed since the last frame was drawn), waits for an event first, so
+    # that menus don't keep drawing the same frame over and over. Gives up
+    # waiting after IDLE_TIMEOUT, so that flashing cursors still flash.
+    if idle:
+        event = pg.event.wait(IDLE_TIMEOUT)
+        if event.type == NOEVENT:
+            return []
+        return [event] + pg.event.get()
+
+    return pg.event.get()
+
+
+def drawCulledCount(fpsRect):
+    # Shows how many particles weren't drawn this frame, under the fps text.
+    # Returns the rect of the text, so more can be shown underneath it.
+    if culledParticles > 0:
+        font = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        text = pgkRoot.renderText(font, u"Off-screen particles: {0}".format(
+            culledParticles), True, (0, 0, 0))
+        textRect = text.get_rect(midtop=fpsRect.midbottom)
+        screen.blit(text, textRect)
+        return textRect
+
+    return fpsRect
+
+
+def drawQualityText(aboveRect):
+    # Shows which extras the quality governor has turned off, if any
+    turnedOff = qualityGovernor.getTurnedOff()
+    if turnedOff:
+        font = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        text = pgkRoot.renderText(font, u"Reduced quality - no {0}".format(
+            ", ".join(turnedOff)), antialias, (0, 0, 0))
+        screen.blit(text, text.get_rect(midtop=aboveRect.midbottom))
+
+
+def simplifyPath(plots, tolerance):
+    # Douglas-Peucker algorithm - removes points that are within tolerance of
+    # the line between the points either side of them. Plots are stored as
+    # (frameNumber, x, y). Uses a stack rather than recursion, as lines can
+    # have thousands of points.
+    if len(plots) < 3:
+        return plots
+
+    keep = [False] * len(plots)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(plots) - 1)]
+    while stack:
+        start, end = stack.pop()
+        x1, y1 = plots[start][1], plots[start][2]
+        x2, y2 = plots[end][1], plots[end][2]
+        length = math.hypot(x2 - x1, y2 - y1)
+
+        furthest = None
+        maxDistance = tolerance
+        for i in range(start + 1, end):
+            x0, y0 = plots[i][1], plots[i][2]
+            if length == 0:
+                distance = math.hypot(x0 - x1, y0 - y1)
+            else:
+                # Perpendicular distance from the point to the line
+                distance = abs((x2 - x1) * (y1 - y0) -
+                               (x1 - x0) * (y2 - y1)) / length
+            if distance > maxDistance:
+                furthest = i
+                maxDistance = distance
+
+        if furthest is not None:
+            keep[furthest] = True
+            stack.append((start, furthest))
+            stack.append((furthest, end))
+
+    return [plots[i] for i in range(len(plots)) if keep[i]]
+
+
 def drawDottedLine(start, end):
     # Used when resizing particles, to create the same look as in Blender
     # (Dotted line from the centre of the object being resized to the mouse)
@@ -437,6 +1615,19 @@ def timeChange(speedUp):
         currentTimescale -= 1
 
 
+def pooledMenu(name, build):
+    # Menus that get opened again and again (the pause menu, particle stats,
+    # editing particles, saving and loading) are only built the first time
+    # they are needed. When they close, they are hidden instead of deleted,
+    # and next time the same widgets are shown again with new values
+    # written to them - so there's no loading fonts or rendering text every
+    # time. build returns the menu's widgets, with its container last.
+    if name not in menuPool:
+        menuPool[name] = build()
+
+    return menuPool[name]
+
+
 # Each procedure which contains a loop needs to have at least one argument,
 # whether it is used or not, as the loop that prevents recursion needs to
 # pass an argument (it passes *args, which cannot pass nothing). So I put a
@@ -450,7 +1641,6 @@ def mainMenu(dummyArg):
     global frameNumber
     global particleGraph
     global scale
-    global previousScale
 
     def endFunction(widgets, goTo, args):
         # Can't use buttons to set variables, so I need to use this function
@@ -503,12 +1693,12 @@ def mainMenu(dummyArg):
     frameNumber = 0
 
     scale = scaler(100, "x")
-    previousScale = scale
 
     particleGraph.clearLines()
     del particleGraph
 
-    particleGraph = Graph(screen, SW, SH, (0, 0), BG_COLOUR, scale, scale)
+    particleGraph = newGraph(scale)
+    resetCamera(scale)
 
     mainContainer = pgk.Container(pgkRoot, screen, topleft=(0, 0),
                                   width=SW, height=SH)
@@ -595,7 +1785,9 @@ def mainMenu(dummyArg):
 
         fps = str(int(clock.get_fps()))
         pg.display.set_caption('HAHA CIRCLE GO BRR | FPS: ' + fps)
-        clock.tick()
+        # The logo is always moving, so the menu can never wait for events
+        # like the other menus do - the frame rate is capped instead
+        clock.tick(MENU_FPS)
 
     # Returns the function that runs next (setup) and the args to pass to that 
     # function (*args requires a tuple to unpack)
@@ -714,8 +1906,10 @@ def instructions(mainMenuWidgets):
                                 destination=(0, 0))
 
     instructing = True
+    idle = False
     while instructing:
-        for event in pg.event.get():
+        events = getEvents(idle)
+        for event in events:
             pgkRoot.eventHandler(event)
             if event.type == QUIT:
                 instructing = False
@@ -732,15 +1926,19 @@ def instructions(mainMenuWidgets):
         pg.display.set_caption('HAHA CIRCLE GO BRR | FPS: ' + fps)
         clock.tick()
 
+        # Nothing will change until the next event, unless a widget is
+        # animating
+        idle = not events and not pgkRoot.isAnimating()
+
     return
 
 
 def setup(dummyArg):
     global scale
-    global previousScale
     global setupTime
     global setting
     global editingParticle
+    global scenarioLoad
 
     # Times the animation for setupContainer
     setupTime = None
@@ -762,9 +1960,110 @@ def setup(dummyArg):
     def endParticleEdit(editList):
         global editingParticle
         # Menu for editing a particle will disappear
-        editList[-1].startAnimation("centre", 0.25, "out", deleteAfter=True)
+        editList[-1].startAnimation("centre", 0.25, "out", hideAfter=True)
         editingParticle = None
 
+    def buildEdit():
+        # Create container for widgets first - it is moved next to the
+        # particle every time it is shown
+        eContainer = pgk.Container(pgkRoot, screen,
+                                   centre=(0, 0),
+                                   outlineThickness=3,
+                                   width=scaler(310, "x"),
+                                   height=scaler(400, "y"),
+                                   bg=True,
+                                   bgColour=(255, 255, 255),
+                                   startVisible=False)
+
+        editContWidth = scaler(310, "x")
+        offset = scaler(150, "x") / 2
+        boxWidth = scaler(125, "x") / 2
+
+        # Creating list of widgets used in editing the particle
+        inlineTexts = ["Coefficient of Restitution",
+                       "Velocity to the right (ms^-1):",
+                       "Velocity downwards (ms^-1):",
+                       "Acceleration to the right (ms^-2):",
+                       "Acceleration downwards (ms^-2):",
+                       "Radius (m):",
+                       "Mass (kg):",
+                       "Height off of ground (m):"]
+        inputList = []
+        for row, inlineText in enumerate(inlineTexts):
+            inputList.append(pgk.InputBox(pgkRoot, screen,
+                                          editContWidth - offset,
+                                          scaler(28 + 25 * row, "y"),
+                                          font=SMALLER_FONT,
+                                          bgColour=(222, 222, 222),
+                                          inlineText=inlineText,
+                                          width=boxWidth,
+                                          allowLetters=False,
+                                          allowSpecial=False,
+                                          allowSpace=False, charLimit=10,
+                                          container=eContainer))
+
+        inputList += [
+            pgk.Checkbox(pgkRoot, screen,
+                         editContWidth - scaler(50, "x"), scaler(228, "y"),
+                         font=SMALLER_FONT,
+                         bgColour=(222, 222, 222),
+                         inlineText="Lock particle to height: ",
+                         container=eContainer),
+            pgk.Checkbox(pgkRoot, screen,
+                         editContWidth - scaler(50, "x"), scaler(253, "y"),
+                         font=SMALLER_FONT,
+                         bgColour=(222, 222, 222),
+                         inlineText="Select for random velocity: ",
+                         container=eContainer),
+            pgk.Checkbox(pgkRoot, screen,
+                         editContWidth - scaler(50, "x"), scaler(278, "y"),
+                         font=SMALLER_FONT,
+                         bgColour=(222, 222, 222),
+                         inlineText="Draw line following particle's "
+                                    "motion: ",
+                         container=eContainer)
+        ]
+
+        # The buttons' actions are set every time the menu is shown, as they
+        # need this setup's particles
+        buttonHeight = inputList[0].getHeight() * 2
+        fButton = pgk.Button(pgkRoot, screen,
+                             editContWidth - scaler(225, "x"),
+                             scaler(303, "y"),
+                             font=SMALL_FONT,
+                             bgColour=(33, 33, 33),
+                             text="Finish Editing Particle",
+                             height=buttonHeight,
+                             width=scaler(213, "x"),
+                             container=eContainer,
+                             swellOnHover=True)
+
+        delButton = pgk.Button(pgkRoot, screen,
+                               editContWidth - scaler(225, "x"),
+                               scaler(353, "y"),
+                               font=SMALL_FONT,
+                               bgColour=(33, 33, 33),
+                               text="Delete Particle",
+                               height=buttonHeight,
+                               width=scaler(213, "x"),
+                               container=eContainer,
+                               swellOnHover=True)
+
+        # Create dropdown menu last as it needs to be drawn on top of the
+        # other inputs. Its options are set when the menu is shown.
+        drop = pgk.Dropdown(pgkRoot, screen,
+                            editContWidth - offset - boxWidth,
+                            scaler(5, "y"),
+                            sortedCustoms + MATERIALS_SORTED,
+                            font=SMALLER_FONT,
+                            bgColour=(222, 222, 222),
+                            inlineText="Select material (scroll to see "
+                                       "more):",
+                            width=boxWidth * 2,
+                            container=eContainer)
+
+        return inputList + [drop, fButton, delButton, eContainer]
+
     # Delete all widgets - to start with a 'clean slate'
     # for i in pgkRoot.pgkGroup.sprites():
     #    i.delete()
@@ -789,11 +2088,9 @@ def setup(dummyArg):
             randomV = inputs[9].get()
             drawGraph = inputs[10].get()
             material = inputs[11].get()
-            if material in MATERIALS:
-                density, colour = MATERIALS[material][0], MATERIALS[material][1]
-            else:
-                density, colour = customMaterials[material][0], \
-                                  customMaterials[material][1]
+            materialId = registry.getId(material)
+            density = registry.densities[materialId]
+            colour = registry.colours[materialId]
 
             pRef.colour = colour
         except ValueError:
@@ -831,7 +2128,7 @@ def setup(dummyArg):
             pRef.line = False
 
         elif drawGraph and not pRef.line:
-            pRef.line = Line(screen, particleGraph, colour)
+            pRef.line = Line(particleGraph, colour)
 
         pRef.acceleration.x = xAccel
         pRef.acceleration.y = yAccel
@@ -840,16 +2137,13 @@ def setup(dummyArg):
         # certain height
         if lockHeight:
             if editing is None:
-                pRef.pos.x = mouseX
-                pRef.rect.x = mouseX
-            pRef.pos.y = SH - int(height * scale) - pRef.radius * scale
-            pRef.rect.y = SH - int(height * scale) - pRef.radius * scale
+                pRef.pos.x = screenToWorld((mouseX, mouseY)).x
+            pRef.pos.y = worldBounds[3] - height - pRef.radius
         else:
             if editing is None:
-                pRef.pos.x = mouseX
-                pRef.pos.y = mouseY
-                pRef.rect.x = mouseX
-                pRef.rect.y = mouseY
+                pRef.pos = screenToWorld((mouseX, mouseY))
+
+        pRef.updateRect()
 
         minRad = roundToSigFig(scaler(10, "x") / scale, 3)
         maxRad = roundToSigFig((SW / 4) / scale, 3)
@@ -881,14 +2175,22 @@ def setup(dummyArg):
             radBox.write(str(pRef.radius))
             massBox.write(str(pRef.mass))
 
-        pRef.material = material
+        pRef.materialId = materialId
 
     def deleteParticle(particle):
         particle.delete()
+        journal.remove(particle)
 
     def clearParticles():
+        global scenarioLoad
+        # Stops loading a scenario, if one is being loaded
+        if scenarioLoad is not None:
+            scenarioLoad.cancel()
+            scenarioLoad = None
+
         for particle in particles.sprites():
             particle.delete()
+        journal.clear()
 
         particles.add(Particle(1, "Custom Material 1 - 1.0kgm^-3",
                                roundToSigFig((SW / 4) / scale, 3), 1, (0, 0),
@@ -1039,6 +2341,25 @@ def setup(dummyArg):
     widgetList[-1].startAnimation("horizontalslide", 0.25, "in",
                                   SW)
 
+    # Picks up where setup was left if the program closed part way through
+    # it last time - unless a scenario is about to be loaded instead
+    if scenarioLoad is None:
+        recovered = recoverSetup()
+    else:
+        journal.takeRecovered()
+        recovered = 0
+    # Shown for a few seconds, so it's clear where the particles came from
+    recoveredUntil = time.time() + 5
+    # Why the last scenario couldn't be loaded, shown for a few seconds too
+    loadError = None
+    loadErrorUntil = 0
+
+    # Everything done from here on is journaled, in case the program closes
+    # before setup is finished
+    journal.startSession((scale, cameraOffset.x, cameraOffset.y),
+                         [(particle, particleRow(particle))
+                          for particle in particles.sprites()])
+
     particles.add(Particle(1, "Custom Material 1 - 1.0kgm^-3",
                            roundToSigFig((SW / 4) / scale, 3), 1, (0, 0),
                            (144, 202, 249),
@@ -1047,13 +2368,14 @@ def setup(dummyArg):
 
     pRef = particles.sprites()[-1]
 
-    fpsFont = pg.font.SysFont(SMALL_FONT[0], SMALL_FONT[1])
+    fpsFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
 
     setting = True
     while setting:
-        previousScale = scale
         for event in pg.event.get():
             if event.type == QUIT:
+                # The journal is kept, so setup can carry on next time
+                journal.close()
                 pg.quit()
                 quit()
 
@@ -1063,13 +2385,14 @@ def setup(dummyArg):
                         # Check that looks at all possibilities to ensure
                         # that the particle will be placed on-screen and not
                         # intersecting with another particle
-                        if pRef.pos.x + pRef.radius * scale > SW \
-                                or pRef.pos.x - pRef.radius * scale < 0 \
-                                or pRef.pos.y + pRef.radius * scale > SH \
-                                or pRef.pos.y - pRef.radius * scale < 0 \
+                        if pRef.pos.x + pRef.radius > worldBounds[2] \
+                                or pRef.pos.x - pRef.radius < worldBounds[0] \
+                                or pRef.pos.y + pRef.radius > worldBounds[3] \
+                                or pRef.pos.y - pRef.radius < worldBounds[1] \
                                 or len(pRef.hasCollided(particles)) != 0:
                             pass
                         else:
+                            journal.add(pRef, particleRow(pRef))
                             rad = roundToSigFig((SW / 4) / scale, 3)
                             particles.add(Particle(1, "Wood - 800kgm^-3",
                                                    rad, 10, (0, 0),
@@ -1082,33 +2405,23 @@ def setup(dummyArg):
                         # Editing particles after they have been placed
                         mouseCoords = pg.mouse.get_pos()
                         for i in particles.sprites()[:-1]:
-                            if absoluteDistance(pgmath.Vector2(mouseCoords),
-                                                i.pos) <= i.radius * scale:
-                                if editList:
-                                    for widget in editList:
-                                        widget.delete()
-                                    del editList
+                            if absoluteDistance(screenToWorld(mouseCoords),
+                                                i.pos) <= i.radius:
+                                editList = pooledMenu("edit", buildEdit)
+                                editList[-3].config(
+                                    action=lambda: endParticleEdit(editList))
+                                editList[-2].config(
+                                    action=lambda: deleteParticle(
+                                        editingParticle))
                                 editingParticle = i
 
-                                # Create container for widgets first,
-                                # then position it so that it will always be
-                                # on screen.
-                                eContainer = pgk.Container(pgkRoot, screen,
-                                                           centre=(0, 0),
-                                                           outlineThickness=3,
-                                                           width=scaler(310,
-                                                                        "x"),
-                                                           height=scaler(400,
-                                                                         "y"),
-                                                           bg=True,
-                                                           bgColour=(255, 255,
-                                                                     255),
-                                                           startVisible=False)
-
                                 # Container will be positioned so that one of
                                 # its corners will be in the centre of the
-                                # particle
-                                pos = i.pos
+                                # particle, so that it will always be on
+                                # screen
+                                eContainer = editList[-1]
+                                x, y = worldToScreen(i.pos)
+                                pos = (int(x), int(y))
                                 if pos[1] + scaler(400, "y") <= SH:
                                     if pos[0] + scaler(310, "x") <= SW:
                                         eContainer.config(topleft=pos)
@@ -1120,196 +2433,11 @@ def setup(dummyArg):
                                     else:
                                         eContainer.config(bottomright=pos)
 
-                                editContWidth = scaler(310, "x")
-                                offset = scaler(150, "x") / 2
-                                boxWidth = scaler(125, "x") / 2
-
-                                # Creating list of widgets used in editing
-                                # the particle
-                                inputList = [
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(28, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Coefficient of "
-                                                            "Restitution",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 container=eContainer),
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(53, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Velocity to the "
-                                                            "right (ms^-1):",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 container=eContainer),
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(78, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Velocity "
-                                                            "downwards ("
-                                                            "ms^-1):",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 container=eContainer),
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(103, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Acceleration to "
-                                                            "the right ("
-                                                            "ms^-2):",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 container=eContainer),
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(128, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Acceleration "
-                                                            "downwards ("
-                                                            "ms^-2):",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 container=eContainer),
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(153, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Radius (m):",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 container=eContainer),
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(178, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Mass (kg):",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 container=eContainer),
-                                    pgk.InputBox(pgkRoot, screen,
-                                                 editContWidth - offset,
-                                                 scaler(203, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Height off of "
-                                                            "ground (m):",
-                                                 width=boxWidth,
-                                                 allowLetters=False,
-                                                 allowSpecial=False,
-                                                 allowSpace=False, charLimit=10,
-                                                 defaultEntry="0",
-                                                 container=eContainer),
-                                    pgk.Checkbox(pgkRoot, screen,
-                                                 editContWidth - scaler(50,
-                                                                        "x"),
-                                                 scaler(228, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Lock particle to "
-                                                            "height: ",
-                                                 container=eContainer),
-                                    pgk.Checkbox(pgkRoot, screen,
-                                                 editContWidth - scaler(50,
-                                                                        "x"),
-                                                 scaler(253, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Select for "
-                                                            "random velocity:"
-                                                            " ",
-                                                 container=eContainer),
-                                    pgk.Checkbox(pgkRoot, screen,
-                                                 editContWidth - scaler(50,
-                                                                        "x"),
-                                                 scaler(278, "y"),
-                                                 font=SMALLER_FONT,
-                                                 bgColour=(222, 222, 222),
-                                                 inlineText="Draw line "
-                                                            "following "
-                                                            "particle's "
-                                                            "motion: ",
-                                                 container=eContainer)
-                                ]
-
-                                buttonHeight = inputList[0].getHeight() * 2
-                                fButton = pgk.Button(pgkRoot, screen,
-                                                     editContWidth - scaler(225,
-                                                                            "x"),
-                                                     scaler(303, "y"),
-                                                     font=SMALL_FONT,
-                                                     bgColour=(33, 33, 33),
-                                                     text="Finish Editing "
-                                                          "Particle",
-                                                     height=buttonHeight,
-                                                     width=scaler(213, "x"),
-                                                     action=lambda:
-                                                     endParticleEdit(
-                                                         editList),
-                                                     container=eContainer,
-                                                     swellOnHover=True)
-
-                                delButton = pgk.Button(pgkRoot, screen,
-                                                       editContWidth - scaler(
-                                                           225, "x"),
-                                                       scaler(353, "y"),
-                                                       font=SMALL_FONT,
-                                                       bgColour=(33, 33, 33),
-                                                       text="Delete Particle",
-                                                       height=buttonHeight,
-                                                       width=scaler(213, "x"),
-                                                       action=lambda:
-                                                       deleteParticle(
-                                                           editingParticle),
-                                                       container=eContainer,
-                                                       swellOnHover=True)
-
-                                # Create dropdown menu last as it needs to be
-                                # drawn on top of the other inputs
-                                drop = (pgk.Dropdown(pgkRoot, screen,
-                                                     editContWidth - offset -
-                                                     boxWidth,
-                                                     scaler(5, "y"),
-                                                     sortedCustoms +
-                                                     MATERIALS_SORTED,
-                                                     font=SMALLER_FONT,
-                                                     bgColour=(
-                                                         222, 222,
-                                                         222),
-                                                     inlineText="Select "
-                                                                "material "
-                                                                "(scroll to see"
-                                                                " more):",
-                                                     width=boxWidth * 2,
-                                                     container=eContainer))
-
                                 # Write to the input boxes so that they so
-                                # the selected particle's properties
+                                # the selected particle's properties - every
+                                # one of them, as they still have the last
+                                # edited particle's
+                                inputList = editList[:-4]
                                 inputList[0].write(str(i.restCoefficient))
                                 inputList[1].write(str(i.velocity.x))
                                 inputList[2].write(str(i.velocity.y))
@@ -1317,23 +2445,26 @@ def setup(dummyArg):
                                 inputList[4].write(str(i.acceleration.y))
                                 inputList[5].write(str(i.radius))
                                 inputList[6].write(str(i.mass))
-
-                                if i.hasRandomVelocity:
-                                    inputList[9].click()
-                                if i.line:
-                                    inputList[10].click()
-
+                                inputList[7].write("0")
+                                inputList[8].setChecked(False)
+                                inputList[9].setChecked(i.hasRandomVelocity)
+                                inputList[10].setChecked(bool(i.line))
+
+                                # Custom materials may have been made since
+                                # the menu was last shown
+                                drop = editList[-4]
+                                drop.config(options=sortedCustoms +
+                                            MATERIALS_SORTED)
                                 drop.setSelected(i.material)
 
-                                editList = inputList + [drop, fButton,
-                                                        delButton, eContainer]
-
                                 # Delete references
                                 del inputList
                                 del drop
-                                del fButton
                                 del eContainer
 
+                                # Appears from the centre again, even if
+                                # another particle was already being edited
+                                editList[-1].show(startVisible=False)
                                 editList[-1].startAnimation("centre", 0.25,
                                                             "in")
 
@@ -1342,11 +2473,15 @@ def setup(dummyArg):
                     # Buttons 4 and 5 correspond to the scroll wheel up/down.
                     # These are used for changing the scale while still in
                     # the setup phase
+                    # Zooms around the mouse, keeping the floor at the
+                    # bottom of the screen
                     if event.button == 4:
-                        scale *= 1.02
+                        zoomCamera((pg.mouse.get_pos()[0], SH), 1.02)
+                        fitWorldToView()
 
                     elif event.button == 5:
-                        scale *= 0.98
+                        zoomCamera((pg.mouse.get_pos()[0], SH), 0.98)
+                        fitWorldToView()
 
             if event.type == KEYDOWN:
                 if event.key == K_s:
@@ -1354,18 +2489,34 @@ def setup(dummyArg):
                     # using the mouse, rather than the input boxes
                     sizeChange(pRef, widgetList[5], widgetList[6], metres)
 
+                elif event.key == K_ESCAPE and scenarioLoad is not None:
+                    # Cancels loading a scenario
+                    scenarioLoad.cancel()
+                    scenarioLoad = None
+
         pRef = particles.sprites()[-1]
 
+        # Adds any particles that have been read from the scenario being
+        # loaded - they go in front of the particle following the mouse
+        if scenarioLoad is not None and scenarioLoad.update(pRef):
+            if scenarioLoad.getError() is not None:
+                loadError = scenarioLoad.getError()
+                loadErrorUntil = time.time() + 5
+            scenarioLoad = None
+
+        journal.setCamera(scale, cameraOffset.x, cameraOffset.y)
+
         if widgetList[-1].isEmpty():
             setting = False
 
-        screen.fill(BG_COLOUR)
+        renderSurface.fill(BG_COLOUR)
         particleGraph.draw()
 
         updateParticle(pRef, widgetList)
 
         if editingParticle is not None:
             updateParticle(editingParticle, editList, True)
+            journal.edit(editingParticle, particleRow(editingParticle))
 
             # Finish editing if the particle is not in the sprite group (it
             # has been deleted), and if the finishing process has not
@@ -1373,15 +2524,15 @@ def setup(dummyArg):
             if editingParticle not in particles.sprites():
                 endParticleEdit(editList)
 
-        # Call scalePosition on all but the last sprite, as last sprite's
-        # position is determined by the location of the mouse
+        # Last sprite's rect has already been updated by updateParticle
         for sprite in particles.sprites()[:-1]:
-            sprite.scalePosition()
+            sprite.updateRect()
 
         for sprite in particles.sprites():
-            sprite.draw()
             sprite.updateDirection()
-            sprite.drawDirectionArrow()
+
+        drawParticles(particles.sprites())
+        presentRender()
         pgkRoot.update()
 
         scaleLength = metres * scale
@@ -1395,13 +2546,15 @@ def setup(dummyArg):
 
         metres = roundToSigFig(metres, 1)
 
-        particleGraph.changeLabelGap(scaleLength, scaleLength)
+        particleGraph.changeLabelGap(scaleLength * renderScale,
+                                     scaleLength * renderScale)
 
         scaleDisplay = pg.Rect(scaler(5, "x"), scaler(5, "y"), scaleLength,
                                scaler(5, "y"))
 
-        scaleDisplayText = fpsFont.render(u"{0}m".format(str(metres)), True,
-                                          (0, 0, 0))
+        scaleDisplayText = pgkRoot.renderText(fpsFont,
+                                              u"{0}m".format(str(metres)),
+                                              True, (0, 0, 0))
         scaleTextRect = scaleDisplayText.get_rect(topleft=(scaler(15, "y"),
                                                            scaler(5, "x")))
         screen.blit(scaleDisplayText, scaleTextRect)
@@ -1410,113 +2563,160 @@ def setup(dummyArg):
 
         fps = str(int(clock.get_fps()))
 
-        fpsText = fpsFont.render(u"FPS: {0}".format(fps), True, (0, 0, 0))
+        fpsText = pgkRoot.renderText(fpsFont, u"FPS: {0}".format(fps), True,
+                                     (0, 0, 0))
         fpsRect = fpsText.get_rect(midtop=(int(SW / 2), int(scaler(10, "y"))))
         screen.blit(fpsText, fpsRect)
+        culledRect = drawCulledCount(fpsRect)
+
+        statusFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        statusRect = culledRect
+        if scenarioLoad is not None:
+            loadText = pgkRoot.renderText(
+                statusFont, u"Loading scenario: {0}% (Esc to cancel)".format(
+                    int(scenarioLoad.getProgress() * 100)), True, (0, 0, 0))
+            statusRect = loadText.get_rect(midtop=statusRect.midbottom)
+            screen.blit(loadText, statusRect)
+        elif loadError is not None and time.time() < loadErrorUntil:
+            errorText = pgkRoot.renderText(
+                statusFont, u"Couldn't load scenario: {0}".format(loadError),
+                True, (0, 0, 0))
+            statusRect = errorText.get_rect(midtop=statusRect.midbottom)
+            screen.blit(errorText, statusRect)
+
+        if recovered and time.time() < recoveredUntil:
+            recoveredText = pgkRoot.renderText(
+                statusFont, u"Restored {0} particles from last time".format(
+                    recovered), True, (0, 0, 0))
+            statusRect = recoveredText.get_rect(midtop=statusRect.midbottom)
+            screen.blit(recoveredText, statusRect)
+
+        # Shown for as long as the journal can't be written to
+        if journal.getError() is not None:
+            journalText = pgkRoot.renderText(
+                statusFont, u"Couldn't autosave: {0}".format(
+                    journal.getError()), True, (0, 0, 0))
+            screen.blit(journalText,
+                        journalText.get_rect(midtop=statusRect.midbottom))
 
         pg.display.update()
 
         pg.display.set_caption('HAHA CIRCLE GO BRR | FPS: ' + fps)
         clock.tick()
 
-    try:
-        return main, (widgetList + editList,)
-    except TypeError:
-        return main, (widgetList,)
+    # Starting the simulation part way through loading a scenario waits for
+    # the rest of it
+    if scenarioLoad is not None:
+        scenarioLoad.finish(particles.sprites()[-1])
+        scenarioLoad = None
+
+    # Setup was finished, so there's nothing to pick up next time
+    journal.discard()
+
+    # The menu for editing particles is kept for next time, rather than
+    # being deleted along with the rest of setup's widgets
+    if editList:
+        editList[-1].hide()
+    editingParticle = None
+
+    return main, (widgetList,)
 
 
 def saveSetup(setupWidgets):
     def saveToFile(saveWidgets, setupWidgets):
         global saving
         saveWidgets[-1].startAnimation("horizontalslide", 0.5, "out",
-                                       SW + scaler(350, "x"), True)
+                                       SW + scaler(350, "x"),
+                                       hideAfter=True)
 
-        fileName = u"{0}.txt".format(saveWidgets[0].get())
+        fileName = saveWidgets[0].get() + scenarioFile.SCENARIO_EXTENSION
 
-        saveData = [str(scale)]
+        scenario = scenarioFile.Scenario(scale)
 
-        # Writing data from all particles to a list that will be written to
-        # the txt file
+        # Each particle's data is added to the scenario's columns, which are
+        # then written to the file all at once
         for p in particles.sprites()[:-1]:
-            if p.line:
-                line = True
-            else:
-                line = False
-            pData = [p.hasRandomVelocity, line, p.restCoefficient,
-                     p.material, p.radius, p.density, p.mass, p.vol,
-                     (p.velocity.x, p.velocity.y), p.colour,
-                     (p.rect.x, p.rect.y), (p.acceleration.x, p.acceleration.y)]
-            saveData.append(str(pData))
-
-        with open(str(saveLocation / fileName), "w") as f:
-            f.writelines('\n'.join(saveData))
+            # Positions are saved in pixels on screen, not on the render
+            # surface, so that they don't depend on the render scale
+            x, y = worldToScreen(p.pos)
+            scenario.append(p.hasRandomVelocity, p.line, p.restCoefficient,
+                            p.material, p.radius, p.density, p.mass, p.vol,
+                            p.velocity, p.colour, (x, y), p.acceleration)
+
+        scenarioFile.writeScenario(saveLocation / fileName, scenario)
+        # The scenario is still in memory, so it doesn't need to be read back
+        # to be added to the load menu
+        savedScenarios.add(fileName, scenario)
 
         setupWidgets[-1].startAnimation("horizontalslide", 0.5, "out",
                                         SW - scaler(400, "x"))
 
         saving = False
 
+    def buildSave():
+        saveContainer = pgk.Container(pgkRoot, screen,
+                                      topright=(SW + scaler(400, "x"), 0),
+                                      outlineThickness=0,
+                                      width=scaler(400, "x"),
+                                      height=scaler(205, "y"))
+
+        offset = scaler(275, "x")
+        boxWidth = scaler(250, "x")
+        nameBox = pgk.InputBox(pgkRoot, screen, contWidth - offset,
+                               scaler(5, "y"),
+                               font=SMALL_FONT, bgColour=(222, 222, 222),
+                               inlineText="Scenario Name: ",
+                               width=boxWidth, allowSpecial=False,
+                               charLimit=35, container=saveContainer)
+
+        # The save button's action is set every time the menu is shown
+        saveButton = pgk.Button(pgkRoot, screen,
+                                contWidth - scaler(350, "x"), scaler(55, "y"),
+                                font=MID_FONT,
+                                bgColour=(33, 33, 33),
+                                text="Save",
+                                height=nameBox.getHeight() * 2,
+                                width=scaler(325, "x"),
+                                container=saveContainer, swellOnHover=True)
+
+        return [nameBox, saveButton, saveContainer]
+
     global saving
 
     if len(particles) < 2:
         return
 
-    takenNumbers = []
-    for file in os.listdir(saveLocation):
-        if file.endswith(".txt") and file.lower().startswith("custom scenario"):
-            fileNum = int(file[15:-4])
-            takenNumbers.append(fileNum)
-
-    takenNumbers.sort()
-
-    lowNum = 1
-    for num in takenNumbers:
-        if num == lowNum:
-            lowNum += 1
-        else:
-            break
+    # The library knows which numbers it has already seen, but scenarios
+    # could have been copied into the folder since it was last refreshed
+    lowNum = savedScenarios.nextCustomNumber()
+    while any((saveLocation / u"Custom Scenario {0}{1}".format(
+            lowNum, extension)).exists()
+            for extension in scenarioLibrary.SCENARIO_EXTENSIONS):
+        lowNum += 1
 
     setupWidgets[-1].startAnimation("horizontalslide", 0.5, "out",
                                     SW + scaler(350, "x"))
 
-    saveContainer = pgk.Container(pgkRoot, screen,
-                                  topright=(SW + scaler(400, "x"), 0),
-                                  outlineThickness=0, width=scaler(400, "x"),
-                                  height=scaler(205, "y"))
-
     contWidth = scaler(400, "x")
-    offset = scaler(275, "x")
-    boxWidth = scaler(250, "x")
-    inputList = [
-        pgk.InputBox(pgkRoot, screen, contWidth - offset, scaler(5, "y"),
-                     font=SMALL_FONT, bgColour=(222, 222, 222),
-                     inlineText="Scenario Name: ",
-                     width=boxWidth, allowSpecial=False, charLimit=35,
-                     defaultEntry=u"Custom Scenario {0}".format(str(lowNum)),
-                     container=saveContainer),
-    ]
 
-    inputList += [
-        pgk.Button(pgkRoot, screen,
-                   contWidth - scaler(350, "x"), scaler(55, "y"),
-                   font=MID_FONT,
-                   bgColour=(33, 33, 33),
-                   text="Save",
-                   height=inputList[0].getHeight() * 2,
-                   width=scaler(325, "x"),
-                   action=lambda: saveToFile(saveWidgets, setupWidgets),
-                   container=saveContainer, swellOnHover=True),
-    ]
+    saveWidgets = pooledMenu("save", buildSave)
+    saveWidgets[0].write(u"Custom Scenario {0}".format(str(lowNum)))
+    saveWidgets[1].config(action=lambda: saveToFile(saveWidgets,
+                                                    setupWidgets))
 
-    saveWidgets = inputList + [saveContainer]
+    # Starts off screen to the right each time, ready to slide in
+    saveWidgets[-1].config(topright=(SW + scaler(400, "x"), 0))
+    saveWidgets[-1].show()
 
-    # Remove references - Collected by garbage collection
-    del saveContainer
-    del inputList
+    # Particles don't move while saving, so they are only drawn once, and
+    # that frame is reused
+    scene = None
 
     saving = True
+    idle = False
     while saving:
-        for event in pg.event.get():
+        events = getEvents(idle)
+        for event in events:
             pgkRoot.eventHandler(event)
             if event.type == QUIT:
                 saving = False
@@ -1527,14 +2727,17 @@ def saveSetup(setupWidgets):
             saveWidgets[-1].startAnimation("horizontalslide", 0.25, "out",
                                            SW - contWidth)
 
-        screen.fill(BG_COLOUR)
-        particleGraph.draw()
+        if scene is None:
+            renderSurface.fill(BG_COLOUR)
+            particleGraph.draw()
 
-        # Exclude final particle - the one that was following the mouse
-        # pointer when save button was pressed
-        for i in particles.sprites()[:-1]:
-            i.draw()
-            i.drawDirectionArrow()
+            # Exclude final particle - the one that was following the mouse
+            # pointer when save button was pressed
+            drawParticles(particles.sprites()[:-1])
+            presentRender()
+            scene = screen.copy()
+        else:
+            screen.blit(scene, (0, 0))
 
         pgkRoot.update()
 
@@ -1544,43 +2747,24 @@ def saveSetup(setupWidgets):
         pg.display.set_caption('HAHA CIRCLE GO BRR | FPS: ' + fps)
         clock.tick()
 
+        # Nothing will change until the next event, unless a widget is
+        # animating
+        idle = not events and not pgkRoot.isAnimating()
+
     return
 
 
 def loadSetup(widgets):
     def loadFromFile(loadWidgets, widgets):
-        global scale
-        global previousScale
         global loading
-        global particleGraph
-        loadWidgets[-1].startAnimation("centre", 0.25, "out", deleteAfter=True)
+        global scenarioLoad
+        loadWidgets[-1].startAnimation("centre", 0.25, "out", hideAfter=True)
 
         fileName = loadWidgets[0].get()
 
-        with open(str(saveLocation / fileName), "r") as f:
-            data = f.readlines()
-
-        # Remove newline characters from lines
-        newData = []
-        for line in data:
-            # ast.literal_eval reads the contents of the file, and evaluates the
-            # string as a python expression - in this case a list
-            newData.append(ast.literal_eval(line.rstrip("\n")))
-
-        scale = newData[0]
-        previousScale = scale
-        particleGraph = Graph(screen, SW, SH, (0, 0), BG_COLOUR, scale, scale)
-        for p in newData[1:]:
-            particles.add(Particle(p[2], p[3], p[4], p[5], p[8], p[9], p[10],
-                                   p[11][0], p[11][1]))
-
-            particles.sprites()[-1].hasRandomVelocity = p[0]
-            if p[1]:
-                particles.sprites()[-1].line = Line(screen, particleGraph, p[9])
-            else:
-                particles.sprites()[-1].line = None
-            particles.sprites()[-1].mass = p[6]
-            particles.sprites()[-1].vol = p[7]
+        # Setup's loop adds the particles as they are read, so that big
+        # scenarios don't freeze the program while they load
+        scenarioLoad = ScenarioLoad(saveLocation / fileName)
 
         if widgets:
             widgets[-1].startAnimation("horizontalslide", 0.5, "out",
@@ -1595,48 +2779,144 @@ def loadSetup(widgets):
 
         loading = False
 
+    def buildLoad():
+        loadContainer = pgk.Container(pgkRoot, screen, maskColour=BG_COLOUR,
+                                      centre=(SW / 2, SH / 2),
+                                      outlineThickness=0,
+                                      width=scaler(400, "x"),
+                                      height=scaler(205, "y"),
+                                      startVisible=False)
+
+        boxWidth = scaler(350, "x")
+        # The saved scenarios are listed, and the load button's action is
+        # set, every time the menu is shown
+        drop = pgk.Dropdown(pgkRoot, screen, scaler(25, "x"), scaler(5, "y"),
+                            savedScenarios.names(scenarioSort),
+                            font=SMALL_FONT, bgColour=(222, 222, 222),
+                            width=boxWidth)
+
+        loadButton = pgk.Button(pgkRoot, screen, scaler(25, "x"),
+                                scaler(55, "y"),
+                                font=MID_FONT, bgColour=(33, 33, 33),
+                                text="Load Scenario",
+                                height=drop.getHeight() * 2,
+                                width=scaler(350, "x"),
+                                container=loadContainer, swellOnHover=True)
+
+        sortButton = pgk.Button(pgkRoot, screen, scaler(25, "x"),
+                                scaler(125, "y"),
+                                font=SMALL_FONT, bgColour=(33, 33, 33),
+                                text=SORT_NAMES[scenarioSort],
+                                height=drop.getHeight() * 1.5,
+                                width=scaler(350, "x"),
+                                action=lambda: changeSort(drop, sortButton),
+                                container=loadContainer, swellOnHover=True)
+
+        # Add dropdown to container last as it needs to be drawn over the
+        # buttons
+        drop.config(container=loadContainer)
+
+        return [drop, loadButton, sortButton, loadContainer]
+
+    def changeSort(drop, sortButton):
+        # Goes on to the next way of ordering the scenarios, keeping the same
+        # one selected
+        global scenarioSort
+        orders = scenarioLibrary.SORT_ORDERS
+        scenarioSort = orders[(orders.index(scenarioSort) + 1) % len(orders)]
+
+        selected = drop.get()
+        drop.config(options=savedScenarios.names(scenarioSort))
+        drop.setSelected(selected)
+        sortButton.config(text=SORT_NAMES[scenarioSort])
+
+    def drawPreview(name, containerRect):
+        # Shows the selected scenario's thumbnail, and what's in it, under
+        # the menu
+        font = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        if savedScenarios.getSaveError() is not None:
+            # The index is only a cache, so everything still works without it
+            text = pgkRoot.renderText(
+                font, u"Couldn't save scenario index: {0}".format(
+                    savedScenarios.getSaveError()), True, (0, 0, 0))
+            screen.blit(text, text.get_rect(midbottom=(
+                containerRect.centerx, containerRect.top - scaler(10, "y"))))
+
+        info = savedScenarios.get(name)
+        if info is None:
+            # Still being read for the first time, or not a scenario
+            if savedScenarios.getError(name) is not None:
+                status = u"Couldn't read scenario: {0}".format(
+                    savedScenarios.getError(name))
+            else:
+                status = u"Reading scenario..."
+            text = pgkRoot.renderText(font, status, True, (0, 0, 0))
+            screen.blit(text, text.get_rect(midtop=(
+                containerRect.centerx,
+                containerRect.bottom + scaler(10, "y"))))
+            return
+
+        if name not in previews or previews[name][0] != info.modified:
+            thumbnail = pg.image.frombuffer(info.thumbnail,
+                                            scenarioLibrary.THUMBNAIL_SIZE,
+                                            "RGBA")
+            previews[name] = (info.modified, pg.transform.scale(
+                thumbnail, (int(scaler(256, "x")), int(scaler(144, "y")))))
+        image = previews[name][1]
+
+        imageRect = image.get_rect(midtop=(containerRect.centerx,
+                                           containerRect.bottom +
+                                           scaler(10, "y")))
+        pg.draw.rect(screen, (222, 222, 222), imageRect)
+        screen.blit(image, imageRect)
+        pg.draw.rect(screen, (33, 33, 33), imageRect, 2)
+
+        # Just the names of the materials, without their densities
+        materials = [material.split(" - ")[0]
+                     for material in info.materials[:3]]
+        if len(info.materials) > 3:
+            materials.append(u"{0} more".format(len(info.materials) - 3))
+
+        top = imageRect.bottom + scaler(5, "y")
+        for line in [u"{0} particles, scale {1}".format(
+                info.count, roundToSigFig(info.scale, 3)),
+                     u", ".join(materials)]:
+            text = pgkRoot.renderText(font, line, True, (0, 0, 0))
+            textRect = text.get_rect(midtop=(imageRect.centerx, top))
+            screen.blit(text, textRect)
+            top = textRect.bottom
+
     global loading
+    global scenarioLoad
+
+    # Only one scenario can be loaded at a time
+    if scenarioLoad is not None:
+        scenarioLoad.cancel()
+        scenarioLoad = None
 
     for particle in particles.sprites():
         particle.delete()
+    journal.clear()
 
     if widgets:
         widgets[-1].startAnimation("horizontalslide", 0.5, "out",
                                    SW + scaler(350, "x"))
 
-    loadContainer = pgk.Container(pgkRoot, screen, maskColour=BG_COLOUR,
-                                  centre=(SW / 2, SH / 2),
-                                  outlineThickness=0, width=scaler(400, "x"),
-                                  height=scaler(205, "y"), startVisible=False)
-
-    options = os.listdir(saveLocation)
-    boxWidth = scaler(350, "x")
-    # Define inputList as an empty list initially, as it needs to be
-    # referenced by the button, which cannot be done if inputList and the
-    # button are created at the same time.
-    inputList = [
-        pgk.Dropdown(pgkRoot, screen, scaler(25, "x"), scaler(5, "y"),
-                     options, font=SMALL_FONT, bgColour=(222, 222, 222),
-                     width=boxWidth),
-    ]
-
-    inputList += [
-        pgk.Button(pgkRoot, screen, scaler(25, "x"), scaler(55, "y"),
-                   font=MID_FONT, bgColour=(33, 33, 33), text="Load Scenario",
-                   height=inputList[0].getHeight() * 2,
-                   width=scaler(350, "x"),
-                   action=lambda: loadFromFile(loadWidgets, widgets),
-                   container=loadContainer, swellOnHover=True),
-    ]
+    # Only scenarios that have changed since the menu was last opened are
+    # read, in the background - they're listed straight away, and their
+    # previews are filled in as they're read
+    savedScenarios.refresh()
+    # Whether the dropdown needs the new list of names, which waits until
+    # it isn't expanded
+    namesChanged = False
 
-    # Add dropdown to container last as it needs to be drawn over the button
-    inputList[0].config(container=loadContainer)
+    # Thumbnails that have been scaled up to be shown
+    previews = {}
 
-    loadWidgets = inputList + [loadContainer]
-
-    # Remove references - Collected by garbage collection
-    del loadContainer
-    del inputList
+    loadWidgets = pooledMenu("load", buildLoad)
+    loadWidgets[0].config(options=savedScenarios.names(scenarioSort))
+    loadWidgets[1].config(action=lambda: loadFromFile(loadWidgets, widgets))
+    loadWidgets[-1].show(startVisible=False)
 
     if not widgets:
         loadWidgets[-1].startAnimation("centre", 0.25, "in")
@@ -1645,8 +2925,10 @@ def loadSetup(widgets):
         particle.delete()
 
     loading = True
+    idle = False
     while loading:
-        for event in pg.event.get():
+        events = getEvents(idle)
+        for event in events:
             pgkRoot.eventHandler(event)
             if event.type == QUIT:
                 loading = False
@@ -1656,8 +2938,22 @@ def loadSetup(widgets):
         if widgets and widgets[-1].animationDone():
             loadWidgets[-1].startAnimation("centre", 0.25, "in")
 
+        if savedScenarios.update():
+            namesChanged = True
+        if namesChanged and not loadWidgets[0].isExpanded():
+            selected = loadWidgets[0].get()
+            names = savedScenarios.names(scenarioSort)
+            loadWidgets[0].config(options=names)
+            if selected in names:
+                loadWidgets[0].setSelected(selected)
+            namesChanged = False
+
         screen.fill(BG_COLOUR)
 
+        # Drawn before the widgets, so the dropdown covers it when expanded
+        if loadWidgets[-1].animationDone() and not loadWidgets[-1].isMasked():
+            drawPreview(loadWidgets[0].get(), loadWidgets[-1].getRect())
+
         pgkRoot.update()
 
         pg.display.update()
@@ -1666,6 +2962,11 @@ def loadSetup(widgets):
         pg.display.set_caption('HAHA CIRCLE GO BRR | FPS: ' + fps)
         clock.tick()
 
+        # Nothing will change until the next event, unless a widget is
+        # animating or scenarios are still being read
+        idle = not events and not pgkRoot.isAnimating() and \
+            not savedScenarios.isIndexing()
+
     # If widgets is None, that means the program got to this page from the
     # main menu, and therefore needs to move onto setup. If widgets exists,
     # however, this function was called from within setup, and we just need a
@@ -1677,6 +2978,10 @@ def loadSetup(widgets):
 
 
 def sizeChange(particle, radBox, massBox, metres):
+    # Where the particle is on screen - sizes are changed by moving the mouse
+    # towards or away from this
+    centre = pgmath.Vector2(worldToScreen(particle.pos))
+
     changing = True
 
     # Need to duplicate SCALE_TOOL_IMG as it needs to be modified with the
@@ -1685,7 +2990,7 @@ def sizeChange(particle, radBox, massBox, metres):
     # order to get the original, unmodified one.
     sizeArrow = SCALE_TOOL_IMG
 
-    fpsFont = pg.font.SysFont(SMALL_FONT[0], SMALL_FONT[1])
+    fpsFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
 
     while changing:
         for event in pg.event.get():
@@ -1701,7 +3006,7 @@ def sizeChange(particle, radBox, massBox, metres):
                     # set startDistance equal to the distance between the
                     # mouse and the particle centre, and set startRad equal
                     # to the particle's current radius.
-                    startDistance = absoluteDistance(particle.pos,
+                    startDistance = absoluteDistance(centre,
                                                      pgmath.Vector2(
                                                          pg.mouse.get_pos()))
                     startRad = roundToSigFig(float(radBox.get()), 3)
@@ -1712,12 +3017,11 @@ def sizeChange(particle, radBox, massBox, metres):
                 if event.key in [K_RETURN, K_KP_ENTER]:
                     return
 
-        screen.fill(BG_COLOUR)
+        renderSurface.fill(BG_COLOUR)
         particleGraph.draw()
 
-        for sprite in particles.sprites():
-            sprite.draw()
-            sprite.drawDirectionArrow()
+        drawParticles(particles.sprites())
+        presentRender()
 
         pg.mouse.set_visible(True)
 
@@ -1726,10 +3030,10 @@ def sizeChange(particle, radBox, massBox, metres):
             pg.mouse.set_visible(False)
 
             # Draw dotted line from centre of particle to mouse pointer,
-            drawDottedLine(particle.pos, pg.mouse.get_pos())
+            drawDottedLine(centre, pg.mouse.get_pos())
 
-            xDiff = pg.mouse.get_pos()[0] - particle.pos.x
-            yDiff = pg.mouse.get_pos()[1] - particle.pos.y
+            xDiff = pg.mouse.get_pos()[0] - centre.x
+            yDiff = pg.mouse.get_pos()[1] - centre.y
 
             # Calculating angle by which to rotate the arrow
             dir = (math.atan2(yDiff, xDiff) * -1) + math.pi / 2
@@ -1742,7 +3046,7 @@ def sizeChange(particle, radBox, massBox, metres):
             screen.blit(blitArrow, arrowRect)
 
             posVector = pgmath.Vector2(pg.mouse.get_pos())
-            currentDistance = absoluteDistance(particle.pos, posVector)
+            currentDistance = absoluteDistance(centre, posVector)
             diff = currentDistance - startDistance
 
             minRad = roundToSigFig(scaler(10, "x") / scale, 3)
@@ -1769,8 +3073,9 @@ def sizeChange(particle, radBox, massBox, metres):
         scaleDisplay = pg.Rect(scaler(5, "x"), scaler(5, "y"), scaleLength,
                                scaler(5, "y"))
 
-        scaleDisplayText = fpsFont.render(u"{0}m".format(str(metres)), True,
-                                          (0, 0, 0))
+        scaleDisplayText = pgkRoot.renderText(fpsFont,
+                                              u"{0}m".format(str(metres)),
+                                              True, (0, 0, 0))
         scaleTextRect = scaleDisplayText.get_rect(topleft=(scaler(15, "y"),
                                                            scaler(5, "x")))
         screen.blit(scaleDisplayText, scaleTextRect)
@@ -1778,7 +3083,8 @@ def sizeChange(particle, radBox, massBox, metres):
         pg.draw.rect(screen, (0, 0, 0), scaleDisplay)
 
         fps = str(int(clock.get_fps()))
-        fpsText = fpsFont.render(u"FPS: {0}".format(fps), True, (0, 0, 0))
+        fpsText = pgkRoot.renderText(fpsFont, u"FPS: {0}".format(fps), True,
+                                     (0, 0, 0))
         fpsRect = fpsText.get_rect(midtop=(int(SW / 2), int(scaler(10, "y"))))
         screen.blit(fpsText, fpsRect)
 
@@ -1791,37 +3097,18 @@ def createMaterial(widgetList):
     global materialTimer
 
     def startExit(widgets, colour):
-        global customMaterials
         global sortedCustoms
         name = widgets[4].get()
         density = widgets[3].get()
-        newMaterial = u"""    "{0} - {1}kgm^-3": [{2}, {3}],""".format(name,
-                                                                       density,
-                                                                       density,
-                                                                       colour)
-
-        with open("customMaterials.txt", "r+") as file:
-            lines = file.readlines()[:-1]
-            lines += [newMaterial + "\n", "}"]
-            # file.truncate(0) clears the file, which is needed as otherwise
-            # lines will be added on to the end of the file, effectively
-            # duplicating everything and ruining the formatting of the
-            # dictionary
-            file.truncate(0)
-
-            # Seek after truncate prevents null bytes being inserted - when
-            # truncate is used, the file tries to write from the same memory
-            # location as it was before truncation, resulting in null bytes
-            # being inserted. Seek(0) moves to the start of the file
-            # preventing null bytes
-            file.seek(0)
-            file.writelines(lines)
-
-        with open("customMaterials.txt", "r") as file:
-            contents = file.read()
-
-        customMaterials = ast.literal_eval(contents)
-        sortedCustoms = sorted(customMaterials)
+
+        # Appended to the custom materials file - nothing else in it needs
+        # to be rewritten or read again
+        try:
+            registry.addCustom(u"{0} - {1}kgm^-3".format(name, density),
+                               float(density), colour)
+        except ValueError:
+            return
+        sortedCustoms = registry.sortedNames(custom=True)
 
         widgets[-1].startAnimation("horizontalslide", 0.25, "out", SW,
                                    deleteAfter=True)
@@ -1960,12 +3247,11 @@ def createMaterial(widgetList):
             if pgkRoot.eventHandler(event):
                 pass
 
-        screen.fill(BG_COLOUR)
+        renderSurface.fill(BG_COLOUR)
         particleGraph.draw()
 
-        for sprite in particles.sprites():
-            sprite.draw()
-            sprite.drawDirectionArrow()
+        drawParticles(particles.sprites())
+        presentRender()
         # If animation has finished for the creation container, length will
         # be 0 as all widgets will have been deleted
         if createWidgets[-1].isEmpty():
@@ -2040,8 +3326,9 @@ def createMaterial(widgetList):
         pgkRoot.update()
 
         fps = str(int(clock.get_fps()))
-        fpsFont = pg.font.SysFont(SMALL_FONT[0], SMALL_FONT[1])
-        fpsText = fpsFont.render(u"FPS: {0}".format(fps), True, (0, 0, 0))
+        fpsFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        fpsText = pgkRoot.renderText(fpsFont, u"FPS: {0}".format(fps), True,
+                                     (0, 0, 0))
         fpsRect = fpsText.get_rect(midtop=(int(SW / 2), int(scaler(10, "y"))))
         screen.blit(fpsText, fpsRect)
         pg.draw.rect(screen, materialColour, rgbTestRect)
@@ -2057,6 +3344,9 @@ def main(widgetList):
     global frameNumber
     global timeMultiplier
     global timeShown
+    global culledParticles
+    global antialias
+    global qualityGovernor
     timeShown = False
 
     def showTimeControls(timeContainer):
@@ -2111,14 +3401,35 @@ def main(widgetList):
         # Remove references to widgets - will get collected by Python's
         # garbage collection
 
+    # Used to stop one slow frame making the simulation jump forward
+    averageFrameTime = 1 / TARGET_FPS
+
+    # The quality governor reacts to slow frames while the simulation runs,
+    # so level of detail only goes by how many particles there are - if both
+    # reacted to frame times, they would fight each other
+    levelOfDetail.config(auto=False)
+
     mainprogram = True
 
     while mainprogram:
         for event in pg.event.get():
-            pgkRoot.eventHandler(event)
+            handled = pgkRoot.eventHandler(event)
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     pauseMenu(timeWidgets)
+                elif event.key == K_r:
+                    switchRenderer()
+
+            # The scroll wheel zooms in and out around the mouse, and
+            # dragging with the middle mouse button moves around the world
+            elif event.type == MOUSEBUTTONDOWN and not handled:
+                if event.button == 4:
+                    zoomCamera(event.pos, 1.02)
+                elif event.button == 5:
+                    zoomCamera(event.pos, 0.98)
+
+            elif event.type == MOUSEMOTION and event.buttons[1]:
+                panCamera(event.rel[0], event.rel[1])
 
             if event.type == QUIT:
                 mainprogram = False
@@ -2128,62 +3439,85 @@ def main(widgetList):
         frameNumber += TIME_SCALES[currentTimescale]
         if frameNumber < 1:
             frameNumber = 1
-        try:
-            # If statement prevents 'jumping' of particles when user moves
-            # the window
-            if time.time() - previousFrame < 0.1:
-                timeMultiplier = (time.time() - previousFrame)
-                timeMultiplier *= TIME_SCALES[currentTimescale]
-                # Calculates time between frames
-        except NameError:
-            # Will occur on the first frame, as there is no previous frame
-            pass
-
-        previousFrame = time.time()
+        # Time between frames. A single slow frame (or the user moving the
+        # window) shouldn't make the particles jump forward, so frames can
+        # only count as taking twice as long as they have been recently.
+        frameTime = min(clock.get_time() / 1000, averageFrameTime * 2, 0.1)
+        averageFrameTime += (frameTime - averageFrameTime) * 0.1
+        timeMultiplier = frameTime * TIME_SCALES[currentTimescale]
+
+        # Turn extras off (or back on) depending on how long the last frame
+        # took to make
+        qualityGovernor.newFrame(clock.get_rawtime() / 1000)
+        levelOfDetail.config(arrows=qualityGovernor.isOn("arrows"))
+        particleGraph.showTrails(qualityGovernor.isOn("trails"))
+        antialias = qualityGovernor.isOn("antialiasing")
+        if qualityGovernor.isOn("full resolution"):
+            setRenderScale(baseRenderScale)
+        else:
+            setRenderScale(baseRenderScale / 2)
 
         if tNow <= 0 and currentTimescale < 3:
             pauseMenu(timeWidgets)
 
-        screen.fill(BG_COLOUR)
-        particleGraph.draw()
-        particles.update()
+        if renderThread is not None:
+            # The render thread draws the particles as they are now, while
+            # they are moved on to the next frame. This means that what's on
+            # screen is always one frame behind the simulation.
+            tDisplay = round(tNow, 4)
+            renderThread.submit(particleGraph.takeTrailChanges(),
+                                [ParticleSnapshot(p) for p in particles])
+            particles.update(False)
+            renderThread.wait()
+        else:
+            renderSurface.fill(BG_COLOUR)
+            particleGraph.draw()
+
+            # Counted again by the particles as they're drawn
+            culledParticles = 0
+            levelOfDetail.newFrame(len(particles), clock.get_rawtime() / 1000)
+            particles.update()
+            particleRenderer.finish()
+            presentRender()
 
         if timeMultiplier > 0:
             tNow += timeMultiplier
 
-        # Set up text that shows current time
-        tDisplay = round(tNow, 4)
-        timeFont = pg.font.SysFont(MID_FONT[0], MID_FONT[1])
-        timeText = timeFont.render("Time: T+" + str(tDisplay), True, (0, 0, 0))
-        tRect = timeText.get_rect(topleft=(10, 10))
-
-        timescaleFont = pg.font.SysFont(SMALL_FONT[0], SMALL_FONT[1])
-        tscaleText = timescaleFont.render("Time Multiplier: x" +
-                                          str(TIME_SCALES[currentTimescale]),
-                                          True, (0, 0, 0))
-        tscaleRect = tscaleText.get_rect(topleft=(scaler(10, "x"),
-                                                  scaler(50, "y")))
+        if renderThread is None:
+            tDisplay = round(tNow, 4)
 
-        screen.blit(timeText, tRect)
-        screen.blit(tscaleText, tscaleRect)
+        # Show current time
+        drawTimeText(tDisplay)
 
         pgkRoot.update()
 
         fps = str(int(clock.get_fps()))
 
         # Create text that shows the fps that the program is running at
-        fpsFont = pg.font.SysFont(SMALL_FONT[0], SMALL_FONT[1])
-        fpsText = fpsFont.render(u"FPS: {0}".format(fps), True, (0, 0, 0))
+        fpsFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        fpsText = pgkRoot.renderText(fpsFont, u"FPS: {0}".format(fps),
+                                     antialias, (0, 0, 0))
         fpsRect = fpsText.get_rect(midtop=(int(SW / 2), int(scaler(10, "y"))))
         screen.blit(fpsText, fpsRect)
+        drawQualityText(drawCulledCount(fpsRect))
 
         pg.display.update()
         pg.display.set_caption('HAHA CIRCLE GO BRR | FPS: ' + fps)
 
-        clock.tick()
+        # Waits until it's time for the next frame
+        clock.tick(TARGET_FPS)
 
     for i in particles.sprites():
         i.delete()
+
+    # Whatever the governor turned off only applies to this run of the
+    # simulation - setup and the next run start at full quality
+    qualityGovernor = QualityGovernor(1 / TARGET_FPS)
+    setRenderScale(baseRenderScale)
+    levelOfDetail.config(arrows=True, auto=True)
+    particleGraph.showTrails(True)
+    antialias = True
+
     return mainMenu, (1,)
 
 
@@ -2207,8 +3541,10 @@ def pauseMenu(timeWidgets):
             timeWidgets[0].delete()
             del timeWidgets
 
-        # Get rid of the menu
-        menuWidgets[-1].startAnimation("centre", 0.25, "out", deleteAfter=True)
+        # Get rid of the menu, and the particle stats if they are showing
+        menuWidgets[-1].startAnimation("centre", 0.25, "out", hideAfter=True)
+        if statList and not statList[-1].isHidden():
+            hideStats(statList)
 
     def exitPause(menuWidgets, timeWidgets):
         # Simply ends the pause loop, and starts the disappearing animation
@@ -2220,7 +3556,7 @@ def pauseMenu(timeWidgets):
         timeWidgets[2].config(action=lambda: pauseMenu(timeWidgets),
                               image=PAUSE_IMG, hoverImage=H_PAUSE_IMG)
 
-        menuWidgets[-1].startAnimation("centre", 0.25, "out", deleteAfter=True)
+        menuWidgets[-1].startAnimation("centre", 0.25, "out", hideAfter=True)
         # If current time is earlier or equal to the time that the simulation
         # started, set timescale to 1x, as the user shouldn't be able to rewind
         # to earlier than the beginning of the sim
@@ -2233,70 +3569,135 @@ def pauseMenu(timeWidgets):
 
     def hideStats(statList):
         # Menu for showing stats will disappear
-        statList[-1].startAnimation("centre", 0.25, "out", deleteAfter=True)
+        statList[-1].startAnimation("centre", 0.25, "out", hideAfter=True)
+
+    def buildMenu():
+        pauseContainer = pgk.Container(pgkRoot, screen,
+                                       centre=(SW / 2, SH / 2),
+                                       bg=True, bgColour=BG_COLOUR,
+                                       maskColour=BG_COLOUR,
+                                       outlineThickness=3,
+                                       outlineColour=(33, 33, 33),
+                                       width=scaler(345, "x"),
+                                       height=scaler(125, "y"),
+                                       startVisible=False)
+
+        contWidth = scaler(400, "x")
+        gap = scaler(55, "y")
+
+        # The main menu button's action is set every time the menu is shown,
+        # as it needs this pause's time controls
+        return [
+            pgk.Button(pgkRoot, screen,
+                       contWidth - scaler(390, "x"), scaler(10, "y"),
+                       font=MID_FONT,
+                       bgColour=(33, 33, 33),
+                       text="Main Menu",
+                       height=scaler(50, "y"),
+                       width=scaler(325, "x"),
+                       container=pauseContainer, swellOnHover=True),
+            pgk.Button(pgkRoot, screen,
+                       contWidth - scaler(390, "x"), gap + scaler(10, "y"),
+                       font=MID_FONT,
+                       bgColour=(33, 33, 33),
+                       text="Exit Program",
+                       height=scaler(50, "y"),
+                       width=scaler(325, "x"), action=exitProgram,
+                       container=pauseContainer, swellOnHover=True),
+            pauseContainer
+        ]
 
-    global paused
+    def buildStats():
+        # Create container for widgets first - it is moved next to the
+        # particle every time it is shown
+        eContainer = pgk.Container(pgkRoot, screen,
+                                   centre=(0, 0),
+                                   outlineThickness=3,
+                                   width=scaler(310, "x"),
+                                   height=scaler(250, "y"),
+                                   bg=True,
+                                   bgColour=(255, 255, 255),
+                                   startVisible=False)
+
+        editContWidth = scaler(310, "x")
+        offset = scaler(150, "x") / 2
+        boxWidth = scaler(125, "x") / 2
+
+        # Creating list of widgets used to show the particle's stats
+        inlineTexts = ["Coefficient of Restitution",
+                       "Velocity to the right (ms^-1):",
+                       "Velocity downwards (ms^-1):",
+                       "Acceleration to the right (ms^-2):",
+                       "Acceleration downwards (ms^-2):",
+                       "Radius (m):",
+                       "Mass (kg):",
+                       "Height off of ground (m):"]
+        inputList = []
+        for row, inlineText in enumerate(inlineTexts):
+            inputList.append(pgk.InputBox(pgkRoot, screen,
+                                          editContWidth - offset,
+                                          scaler(3 + 25 * row, "y"),
+                                          font=SMALLER_FONT,
+                                          bgColour=(222, 222, 222),
+                                          inlineText=inlineText,
+                                          width=boxWidth,
+                                          allowLetters=False,
+                                          allowSpecial=False,
+                                          allowSpace=False, charLimit=10,
+                                          container=eContainer,
+                                          canUse=False))
+
+        buttonHeight = inputList[0].getHeight() * 2
+        closeButton = pgk.Button(pgkRoot, screen,
+                                 editContWidth - scaler(225, "x"),
+                                 scaler(203, "y"),
+                                 font=SMALL_FONT,
+                                 bgColour=(33, 33, 33),
+                                 text="Hide Particle Stats",
+                                 height=buttonHeight,
+                                 width=scaler(213, "x"),
+                                 container=eContainer,
+                                 swellOnHover=True)
+
+        return inputList + [closeButton, eContainer]
 
-    pauseContainer = pgk.Container(pgkRoot, screen,
-                                   centre=(SW / 2, SH / 2),
-                                   bg=True, bgColour=BG_COLOUR,
-                                   maskColour=BG_COLOUR, outlineThickness=3,
-                                   outlineColour=(33, 33, 33),
-                                   width=scaler(345, "x"),
-                                   height=scaler(125, "y"), startVisible=False)
+    global paused
 
-    contWidth = scaler(400, "x")
-    gap = scaler(55, "y")
+    menuWidgets = pooledMenu("pause", buildMenu)
+    menuWidgets[0].config(action=lambda: returnToMain(menuWidgets,
+                                                      timeWidgets))
 
-    # Need to initially create menuWidgets as an empty list, so that the
-    # buttons can reference it when passing arguments to their functions
-    menuWidgets = []
+    # Only built the first time a particle's stats are shown
     statList = []
 
-    menuWidgets += [
-        pgk.Button(pgkRoot, screen,
-                   contWidth - scaler(390, "x"), scaler(10, "y"),
-                   font=MID_FONT,
-                   bgColour=(33, 33, 33),
-                   text="Main Menu",
-                   height=scaler(50, "y"),
-                   width=scaler(325, "x"),
-                   action=lambda: returnToMain(menuWidgets, timeWidgets),
-                   container=pauseContainer, swellOnHover=True),
-        pgk.Button(pgkRoot, screen,
-                   contWidth - scaler(390, "x"), gap + scaler(10, "y"),
-                   font=MID_FONT,
-                   bgColour=(33, 33, 33),
-                   text="Exit Program",
-                   height=scaler(50, "y"),
-                   width=scaler(325, "x"), action=exitProgram,
-                   container=pauseContainer, swellOnHover=True)
-    ]
-
-    menuWidgets += [pauseContainer]
-
-    del pauseContainer
-
+    menuWidgets[-1].show(startVisible=False)
     menuWidgets[-1].startAnimation("centre", 0.25, "in")
 
     # Change pause button into a play button
     timeWidgets[2].config(action=lambda: exitPause(menuWidgets, timeWidgets),
                           image=PLAY_IMG,
                           hoverImage=H_PLAY_IMG)
-    pausedFont = pg.font.SysFont(LARGE_FONT[0], LARGE_FONT[1])
-    pausedText = pausedFont.render("PAUSED", True, (0, 0, 0))
+    pausedFont = pgkRoot.getFont(LARGE_FONT[0], LARGE_FONT[1])
+    pausedText = pgkRoot.renderText(pausedFont, "PAUSED", True, (0, 0, 0))
     pRect = pausedText.get_rect(center=(int(SW / 2), int(scaler(380, "y"))))
 
     tDisplay = round(tNow, 4)
-    timeFont = pg.font.SysFont(MID_FONT[0], MID_FONT[1])
-    timeText = timeFont.render("Time: T+" + str(tDisplay), True, (0, 0, 0))
+    timeFont = pgkRoot.getFont(MID_FONT[0], MID_FONT[1])
+    timeText = pgkRoot.renderText(timeFont, "Time: T+" + str(tDisplay), True,
+                                  (0, 0, 0))
     tRect = timeText.get_rect(topleft=(scaler(10, "x"), scaler(10, "y")))
 
     # The pause loop is just an empty loop - only showing the UI elements
     # such as fps text, paused text, and time text
+    # The simulation is frozen while paused, so the particles and graph are
+    # only drawn once, and that frame is reused
+    scene = None
+
     paused = True
+    idle = False
     while paused:
-        for event in pg.event.get():
+        events = getEvents(idle)
+        for event in events:
             pgkRoot.eventHandler(event)
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
@@ -2307,32 +3708,18 @@ def pauseMenu(timeWidgets):
                     # Showing particle stat
                     mouseCoords = pg.mouse.get_pos()
                     for i in particles.sprites():
-                        if absoluteDistance(pgmath.Vector2(mouseCoords),
-                                            i.pos) <= i.radius * scale:
-                            if statList:
-                                for widget in statList:
-                                    widget.delete()
-                                del statList
-
-                            # Create container for widgets first,
-                            # then position it so that it will always be
-                            # on screen.
-                            eContainer = pgk.Container(pgkRoot, screen,
-                                                       centre=(0, 0),
-                                                       outlineThickness=3,
-                                                       width=scaler(310,
-                                                                    "x"),
-                                                       height=scaler(250,
-                                                                     "y"),
-                                                       bg=True,
-                                                       bgColour=(255, 255,
-                                                                 255),
-                                                       startVisible=False)
+                        if absoluteDistance(screenToWorld(mouseCoords),
+                                            i.pos) <= i.radius:
+                            statList = pooledMenu("stats", buildStats)
+                            statList[-2].config(
+                                action=lambda: hideStats(statList))
 
                             # Container will be positioned so that one of
                             # its corners will be in the centre of the
-                            # particle
-                            pos = i.pos
+                            # particle, so that it will always be on screen
+                            eContainer = statList[-1]
+                            x, y = worldToScreen(i.pos)
+                            pos = (int(x), int(y))
                             if pos[1] + scaler(400, "y") <= SH:
                                 if pos[0] + scaler(310, "x") <= SW:
                                     eContainer.config(topleft=pos)
@@ -2344,129 +3731,9 @@ def pauseMenu(timeWidgets):
                                 else:
                                     eContainer.config(bottomright=pos)
 
-                            editContWidth = scaler(310, "x")
-                            offset = scaler(150, "x") / 2
-                            boxWidth = scaler(125, "x") / 2
-
-                            # Creating list of widgets used in editing
-                            # the particle
-                            inputList = [
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(3, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Coefficient of "
-                                                        "Restitution",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             container=eContainer, canUse=False),
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(28, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Velocity to the "
-                                                        "right (ms^-1):",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             container=eContainer, canUse=False),
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(53, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Velocity "
-                                                        "downwards ("
-                                                        "ms^-1):",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             container=eContainer, canUse=False),
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(78, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Acceleration to "
-                                                        "the right ("
-                                                        "ms^-2):",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             container=eContainer, canUse=False),
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(103, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Acceleration "
-                                                        "downwards ("
-                                                        "ms^-2):",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             container=eContainer, canUse=False),
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(128, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Radius (m):",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             container=eContainer, canUse=False),
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(153, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Mass (kg):",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             container=eContainer, canUse=False),
-                                pgk.InputBox(pgkRoot, screen,
-                                             editContWidth - offset,
-                                             scaler(178, "y"),
-                                             font=SMALLER_FONT,
-                                             bgColour=(222, 222, 222),
-                                             inlineText="Height off of "
-                                                        "ground (m):",
-                                             width=boxWidth,
-                                             allowLetters=False,
-                                             allowSpecial=False,
-                                             allowSpace=False, charLimit=10,
-                                             defaultEntry="0",
-                                             container=eContainer, canUse=False),
-                            ]
-
-                            buttonHeight = inputList[0].getHeight() * 2
-                            closeButton = pgk.Button(pgkRoot, screen,
-                                                 editContWidth - scaler(225,
-                                                                        "x"),
-                                                 scaler(203, "y"),
-                                                 font=SMALL_FONT,
-                                                 bgColour=(33, 33, 33),
-                                                 text="Hide Particle Stats",
-                                                 height=buttonHeight,
-                                                 width=scaler(213, "x"),
-                                                 action=lambda: hideStats(statList),
-                                                 container=eContainer,
-                                                 swellOnHover=True)
-
                             # Write to the input boxes so that they so
                             # the selected particle's properties
+                            inputList = statList[:-2]
                             inputList[0].write(str(i.restCoefficient))
                             inputList[1].write(str(roundToSigFig(i.velocity.x,
                                                                  3)))
@@ -2476,15 +3743,16 @@ def pauseMenu(timeWidgets):
                             inputList[4].write(str(i.acceleration.y))
                             inputList[5].write(str(roundToSigFig(i.radius, 3)))
                             inputList[6].write(str(roundToSigFig(i.mass, 3)))
-                            height = (SH - i.pos.y) / scale - i.radius
+                            height = worldBounds[3] - i.pos.y - i.radius
                             inputList[7].write(str(roundToSigFig(height, 3)))
 
-                            statList = inputList + [closeButton, eContainer]
-
                             # Delete references
                             del inputList
                             del eContainer
 
+                            # Appears from the centre again, even if it was
+                            # already showing another particle's stats
+                            statList[-1].show(startVisible=False)
                             statList[-1].startAnimation("centre", 0.25,
                                                         "in")
 
@@ -2493,19 +3761,23 @@ def pauseMenu(timeWidgets):
                 pg.quit()
                 quit()
 
-        screen.fill(BG_COLOUR)
-        particleGraph.draw()
+        if scene is None:
+            renderSurface.fill(BG_COLOUR)
+            particleGraph.draw()
 
-        for sprite in particles.sprites():
-            sprite.draw()
-            sprite.drawDirectionArrow()
+            drawParticles(particles.sprites())
+            presentRender()
+            scene = screen.copy()
+        else:
+            screen.blit(scene, (0, 0))
 
         pgkRoot.update()
 
-        timescaleFont = pg.font.SysFont(SMALL_FONT[0], SMALL_FONT[1])
-        tscaleText = timescaleFont.render("Time Multiplier: x" +
-                                          str(TIME_SCALES[currentTimescale]),
-                                          True, (0, 0, 0))
+        timescaleFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        tscaleText = pgkRoot.renderText(timescaleFont,
+                                        "Time Multiplier: x" +
+                                        str(TIME_SCALES[currentTimescale]),
+                                        True, (0, 0, 0))
         tscaleRect = tscaleText.get_rect(topleft=(scaler(10, "x"),
                                                   scaler(50, "y")))
 
@@ -2514,22 +3786,58 @@ def pauseMenu(timeWidgets):
         screen.blit(pausedText, pRect)
 
         fps = str(int(clock.get_fps()))
-        fpsFont = pg.font.SysFont(SMALL_FONT[0], SMALL_FONT[1])
-        fpsText = fpsFont.render(u"FPS: {0}".format(fps), True, (0, 0, 0))
+        fpsFont = pgkRoot.getFont(SMALL_FONT[0], SMALL_FONT[1])
+        fpsText = pgkRoot.renderText(fpsFont, u"FPS: {0}".format(fps), True,
+                                     (0, 0, 0))
         fpsRect = fpsText.get_rect(midtop=(int(SW / 2), int(scaler(10, "y"))))
         screen.blit(fpsText, fpsRect)
+        drawCulledCount(fpsRect)
 
         pg.display.update()
 
         pg.display.set_caption('HAHA CIRCLE GO BRR | FPS: ' + fps)
         clock.tick()
 
+        # Nothing will change until the next event, unless a widget is
+        # animating
+        idle = not events and not pgkRoot.isAnimating()
+
 
 # noinspection PyUnboundLocalVariable
 
 
 if __name__ == "__main__":  # If program is run as a script, this will run
 
+    # Scenarios can be exported as a sequence of frames (and a video, if
+    # ffmpeg is installed) without opening the window, e.g.
+    # V3.py --export "Scenario 1.txt" --seconds 10 --fps 60
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export", metavar="SCENARIO",
+                        help="saved scenario to export instead of opening "
+                             "the program")
+    parser.add_argument("--seconds", type=float, default=10,
+                        help="length of the export in simulated seconds")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="frames per simulated second")
+    parser.add_argument("--out", default="Exports",
+                        help="folder to save the exported frames in")
+    parser.add_argument("--target-fps", type=int, default=60,
+                        help="frame rate that the simulation aims for")
+    parser.add_argument("--render-scale", type=float, default=1,
+                        help="resolution the simulation is drawn at, "
+                             "relative to the window (e.g. 0.5)")
+    options = parser.parse_args()
+
+    if options.target_fps <= 0:
+        parser.error("--target-fps must be greater than 0")
+
+    if not 0 < options.render_scale <= 1:
+        parser.error("--render-scale must be greater than 0 and at most 1")
+
+    if options.export:
+        # Nothing is shown, so no window is needed
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
     exitProgram = False
     while not exitProgram:
         pg.init()
@@ -2564,8 +3872,16 @@ if __name__ == "__main__":  # If program is run as a script, this will run
 
         BG_COLOUR = (244, 244, 244)
 
+        # Colour used for the transparent parts of the trail layer. Trails of
+        # this colour are drawn one shade off it, so they still show up.
+        TRAIL_KEY = (255, 0, 254)
+
         scale = scaler(100, "x")
-        previousScale = scale
+
+        # Position of the top left corner of the screen in the world, and the
+        # left, top, right and bottom walls of the world (all in metres)
+        cameraOffset = pgmath.Vector2(0, 0)
+        worldBounds = [0, 0, SW / scale, SH / scale]
 
         # Fullscreen doesn't work with pg.mouse.set_visible() (mouse gets
         # centred every time function is called), so I am using a borderless
@@ -2578,22 +3894,19 @@ if __name__ == "__main__":  # If program is run as a script, this will run
         screen = pg.display.set_mode((SW, SH), NOFRAME | DOUBLEBUF)
         screen.set_alpha(None)
 
-        particleGraph = Graph(screen, SW, SH, (0, 0), BG_COLOUR, scale, scale)
+        # The simulation is drawn onto renderSurface, which is just the screen
+        # unless setRenderScale has been used to draw it at a lower resolution
+        renderScale = 1
+        renderSurface = screen
 
-        # Read a dictionary in from a file
-        with open("materials.txt", "r") as file:
-            contents = file.read()
+        particleGraph = newGraph(scale)
 
-        # ast.literal_eval reads the contents of the file, and evaluates the
-        # string as a python expression - in this case a dictionary
-        MATERIALS = ast.literal_eval(contents)
-        MATERIALS_SORTED = sorted(MATERIALS)
-
-        with open("customMaterials.txt", "r") as file:
-            contents = file.read()
-
-        customMaterials = ast.literal_eval(contents)
-        sortedCustoms = sorted(customMaterials)
+        # Every material gets an id, which particles store instead of the
+        # material's name
+        registry = materialRegistry.MaterialRegistry("materials.txt",
+                                                     "customMaterials.txt")
+        MATERIALS_SORTED = registry.sortedNames()
+        sortedCustoms = registry.sortedNames(custom=True)
 
         timeMultiplier = 1 / 60  # Initial value for time between frames
         TIME_SCALES = [-2, -1, -0.5, 0.5, 1, 2]
@@ -2601,6 +3914,45 @@ if __name__ == "__main__":  # If program is run as a script, this will run
         tNow = 0
         frameNumber = 0
 
+        # Longest time (in ms) that menus will wait for an event before
+        # redrawing anyway
+        IDLE_TIMEOUT = 250
+
+        # The main menu has a moving logo, so always needs redrawing
+        MENU_FPS = 120
+
+        # Number of particles that weren't drawn last frame as they were off
+        # screen
+        culledParticles = 0
+
+        # Frame rate that the simulation runs at, if it can keep up
+        TARGET_FPS = options.target_fps
+
+        levelOfDetail = LevelOfDetail(arrowRadius=scaler(8, "x"),
+                                      pointRadius=2, denseCount=1000,
+                                      targetFrameTime=1 / TARGET_FPS)
+
+        # Turns off arrows, trails etc. if frames take longer than they should
+        qualityGovernor = QualityGovernor(1 / TARGET_FPS)
+
+        # Whether arrows and text are smoothed - turned off by the governor
+        antialias = True
+
+        particleRenderer = SpriteRenderer()
+
+        # Render scale chosen by the user - the governor can lower it further
+        # (to half of this) when frames are slow
+        baseRenderScale = options.render_scale
+        setRenderScale(baseRenderScale)
+
+        # Particles are drawn on a separate thread while the next frame is
+        # simulated, but only if there's another core for it to run on
+        if (os.cpu_count() or 1) > 1:
+            renderThread = RenderThread()
+            renderThread.start()
+        else:
+            renderThread = None
+
         imagesFolder = Path("resources/images/")
         saveLocation = Path("Saved Scenarios/")
 
@@ -2664,10 +4016,33 @@ if __name__ == "__main__":  # If program is run as a script, this will run
         paused = False
         mainWidgets = []
 
+        # Menus that have been built already, and are hidden until they are
+        # needed again (see pooledMenu)
+        menuPool = {}
+
+        # Scenario being loaded in the background, if there is one
+        scenarioLoad = None
+
+        # Cached details of the saved scenarios, for the load menu
+        savedScenarios = scenarioLibrary.ScenarioLibrary(saveLocation)
+        scenarioSort = "name"
+        SORT_NAMES = {"name": "Sort: Name", "newest": "Sort: Newest",
+                      "particles": "Sort: Most Particles"}
+
+        # Everything done in setup is saved as it happens, so it can be
+        # picked up again if the program closes before setup is finished
+        journal = setupJournal.SetupJournal(saveLocation / ".setup.journal")
+
         pg.display.set_caption('HAHA CIRCLE GO BRRRRRR')
         clock = pg.time.Clock()
         particles = pg.sprite.Group()
 
+        if options.export:
+            exportRun(options.export, options.seconds, options.fps,
+                      options.out)
+            pg.quit()
+            quit()
+
         nextFunction, args = mainMenu(1)
         # Prevents recursion (For example, mainMenu would be called
         # from within main, which would be called from within setup, which would
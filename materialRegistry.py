@@ -0,0 +1,158 @@
+"""Every material particles can be made of, each with a small integer id.
+
+Particles store the id of their material rather than looking it up by name,
+and the density and colour of a material are found by indexing the
+registry's lists with it. Ids are handed out in the order materials are
+added, and never change while the program is running.
+
+The built in materials are read from materials.txt. Custom materials are kept
+in customMaterials.txt, one per line:
+
+    ["Name - 1000kgm^-3", 1000.0, [126, 25, 27]]
+
+New custom materials are appended to the end of the file, so it never has to
+be rewritten or read again. Files in the old format (one python dictionary of
+every custom material) are converted the first time they are read.
+
+"""
+import os
+import ast
+import json
+from array import array
+
+# First line of the custom materials file
+CUSTOM_HEADER = "# One material per line: [name, density, [red, green, blue]]"
+
+
+class MaterialRegistry(object):
+    def __init__(self, materialsPath, customPath):
+        self.__customPath = customPath
+
+        # Indexed by id
+        self.names = []
+        self.densities = array("d")
+        self.colours = []
+
+        self.__ids = {}
+        # Ids of materials that can be chosen in setup, rather than ones
+        # that only came from loaded scenarios
+        self.__builtIn = []
+        self.__custom = []
+
+        with open(str(materialsPath), "r") as file:
+            contents = file.read()
+
+        # ast.literal_eval evaluates the string as a python expression - in
+        # this case a dictionary of each material's density and colour
+        for name, (density, colour) in ast.literal_eval(contents).items():
+            self.__builtIn.append(self.add(name, density, colour))
+
+        self.loadCustom()
+
+    def __contains__(self, name):
+        return name in self.__ids
+
+    def add(self, name, density, colour):
+        # Adds a material, or changes an existing one's density and colour.
+        # Returns its id.
+        colour = tuple(int(value) for value in colour[:3])
+        if name in self.__ids:
+            id = self.__ids[name]
+            self.densities[id] = density
+            self.colours[id] = colour
+            return id
+
+        id = len(self.names)
+        self.__ids[name] = id
+        self.names.append(name)
+        self.densities.append(density)
+        self.colours.append(colour)
+        return id
+
+    def addCustom(self, name, density, colour):
+        """Adds a material made in setup, and appends it to the custom
+        materials file straight away - nothing else in the file is touched.
+        Returns its id.
+
+        """
+        id = self.add(name, density, colour)
+        if id not in self.__custom:
+            self.__custom.append(id)
+
+        line = json.dumps([name, float(density), list(self.colours[id])])
+        with open(str(self.__customPath), "ab+") as file:
+            # If the program closed part way through adding the last
+            # material, it's left on a line of its own
+            file.seek(0, os.SEEK_END)
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    line = "\n" + line
+            file.write((line + "\n").encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+
+        return id
+
+    def getId(self, name, density=None, colour=None):
+        """The id of a material. Materials that aren't in the registry (from
+        a scenario saved with someone else's custom materials) are added with
+        the density and colour given, but aren't listed in setup.
+
+        """
+        id = self.__ids.get(name)
+        if id is None:
+            if density is None or colour is None:
+                raise KeyError(name)
+            id = self.add(name, density, colour)
+
+        return id
+
+    def loadCustom(self):
+        try:
+            with open(str(self.__customPath), "r", encoding="utf-8") as file:
+                contents = file.read()
+        except OSError:
+            return
+
+        if contents.lstrip().startswith("{"):
+            # Old format - converted once, then appended to like any other
+            for name, (density, colour) in \
+                    ast.literal_eval(contents).items():
+                self.__custom.append(self.add(name, density, colour))
+            self.saveCustom()
+            return
+
+        for line in contents.splitlines():
+            if not line.strip() or line.startswith("#"):
+                continue
+            try:
+                name, density, colour = json.loads(line)
+            except ValueError:
+                # The program may have closed part way through adding a
+                # material
+                continue
+
+            id = self.add(name, density, colour)
+            if id not in self.__custom:
+                self.__custom.append(id)
+
+    def saveCustom(self):
+        # Writes every custom material in the new format. Only needed when
+        # converting an old file.
+        tempPath = str(self.__customPath) + ".part"
+        with open(tempPath, "w", encoding="utf-8") as file:
+            file.write(CUSTOM_HEADER + "\n")
+            for id in self.__custom:
+                file.write(json.dumps([self.names[id], self.densities[id],
+                                       list(self.colours[id])]) + "\n")
+        os.replace(tempPath, str(self.__customPath))
+
+    def sortedNames(self, custom=False):
+        # Names of the built in (or custom) materials in alphabetical order,
+        # for the dropdowns in setup
+        if custom:
+            ids = self.__custom
+        else:
+            ids = self.__builtIn
+        return sorted(self.names[id] for id in ids)
@@ -0,0 +1,323 @@
+"""Headless benchmark for pgkinter.
+
+Builds panels of widgets like the setup panel (input boxes, checkboxes, a
+dropdown and buttons inside a container), then replays a made-up stream of
+mouse movement, clicks, scrolling and typing through Pgk.eventHandler, and
+reports how long each Pgk.update takes and how much memory it allocates. No
+window is opened, so the physics doesn't get in the way of the numbers, and it
+can be run anywhere, e.g.
+
+    python pgkBenchmark.py --containers 4 --options 5000 --frames 1000
+
+"""
+import os
+import time
+import random
+import argparse
+import json
+import statistics
+import tracemalloc
+from pathlib import Path
+
+# Nothing is shown, so no window is needed
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame as pg
+from pygame.locals import *
+
+import pgkinter as pgk
+
+SW = 1920
+SH = 1080
+
+# Size of each panel, and the gap between rows of widgets in it
+PANEL_WIDTH = 460
+ROW_GAP = 45
+
+
+class ReplayMouse(object):
+    # The dummy video driver has no mouse, so the replayed events move this
+    # one instead - pgkinter reads it through pg.mouse.get_pos
+    def __init__(self):
+        self.pos = (0, 0)
+
+    def get_pos(self):
+        return self.pos
+
+
+def buildTree(root, screen, options):
+    # Creates the containers, and the widgets inside them. Returns the
+    # containers, and every widget that the events can be aimed at.
+    containers = []
+    widgets = []
+    dropdownOptions = ["Material %d" % i for i in range(options.options)]
+
+    rows = options.inputs + options.checkboxes + options.buttons + \
+        options.dropdowns
+    height = ROW_GAP * rows + 10
+    perRow = max(1, SW // PANEL_WIDTH)
+
+    for i in range(options.containers):
+        topleft = ((i % perRow) * PANEL_WIDTH,
+                   (i // perRow) * (height + 10) % SH)
+        container = pgk.Container(root, screen, bg=True, bgColour=(222, 222,
+                                                                   222),
+                                  outlineThickness=3, width=PANEL_WIDTH - 20,
+                                  height=height, topleft=topleft,
+                                  maskColour=(244, 244, 244))
+        containers.append(container)
+
+        # Labels are put on the left of each widget, like in setup
+        x = PANEL_WIDTH - 240
+        y = 5
+        for n in range(options.inputs):
+            widgets.append(pgk.InputBox(root, screen, x, y, width=200,
+                                        bgColour=(255, 255, 255),
+                                        inlineText="Input %d:" % n,
+                                        defaultEntry="1.0",
+                                        container=container))
+            y += ROW_GAP
+
+        for n in range(options.checkboxes):
+            widgets.append(pgk.Checkbox(root, screen, x, y,
+                                        bgColour=(255, 255, 255),
+                                        inlineText="Check %d:" % n,
+                                        container=container))
+            y += ROW_GAP
+
+        for n in range(options.buttons):
+            widgets.append(pgk.Button(root, screen, 20, y, text="Button %d" % n,
+                                      bgColour=(33, 33, 33), width=200,
+                                      height=ROW_GAP - 10, container=container,
+                                      swellOnHover=True))
+            y += ROW_GAP
+
+        # Dropdowns go last so they are drawn over the other widgets
+        y = 5 + ROW_GAP * (rows - options.dropdowns)
+        for n in range(options.dropdowns):
+            widgets.append(pgk.Dropdown(root, screen, x, y, dropdownOptions,
+                                        bgColour=(255, 255, 255), width=200,
+                                        inlineText="Drop %d:" % n,
+                                        container=container))
+            y += ROW_GAP
+
+    return containers, widgets
+
+
+def makeEventStream(widgets, containers, options):
+    # Works out where the mouse is and which events happen on every frame.
+    # The mouse glides from one widget to the next, and then clicks on it -
+    # typing into input boxes, and scrolling and typing into dropdowns.
+    rng = random.Random(options.seed)
+    stream = []
+    pos = (SW // 2, SH // 2)
+
+    def key(char):
+        return pg.event.Event(KEYDOWN, key=ord(char), unicode=char, mod=0,
+                              scancode=0)
+
+    def click(at, button=1):
+        return [pg.event.Event(MOUSEBUTTONDOWN, button=button, pos=at),
+                pg.event.Event(MOUSEBUTTONUP, button=button, pos=at)]
+
+    while len(stream) < options.frames:
+        widget = rng.choice(widgets)
+        target = widget.getHitRect().center
+
+        # Glide over to the widget
+        steps = rng.randint(5, 15)
+        for step in range(1, steps + 1):
+            pos = (pos[0] + (target[0] - pos[0]) * step // steps,
+                   pos[1] + (target[1] - pos[1]) * step // steps)
+            stream.append((pos, []))
+
+        stream.append((pos, click(pos)))
+
+        if isinstance(widget, pgk.InputBox):
+            for char in rng.choice(["2.5", "10", "0.75", "1e3"]):
+                stream.append((pos, [key(char)]))
+            stream.append((pos, [pg.event.Event(KEYDOWN, key=K_BACKSPACE,
+                                                unicode="", mod=0,
+                                                scancode=0)]))
+
+        elif isinstance(widget, pgk.Dropdown):
+            for i in range(rng.randint(1, 5)):
+                stream.append((pos, [pg.event.Event(MOUSEBUTTONDOWN, button=5,
+                                                    pos=pos)]))
+            for char in str(rng.randint(1, 99)):
+                stream.append((pos, [key(char)]))
+
+            # Picks an option, then closes the dropdown
+            option = (pos[0], pos[1] + widget.getHeight())
+            stream.append((option, []))
+            stream.append((option, click(option)))
+
+        # Clicks on an empty part of the screen, so that input boxes stop
+        # being typed in
+        stream.append(((SW - 5, SH - 5), []))
+        stream.append(((SW - 5, SH - 5), click((SW - 5, SH - 5))))
+        pos = (SW - 5, SH - 5)
+
+    stream = stream[:options.frames]
+
+    if options.animate:
+        # Every so often, a container hides itself and comes back
+        for frame in range(0, len(stream), options.animate):
+            container = containers[(frame // options.animate) %
+                                   len(containers)]
+            stream[frame] = (stream[frame][0], stream[frame][1] +
+                             [("animate", container)])
+
+    return stream
+
+
+def replay(root, screen, stream, mouse, measureMemory=False):
+    # Runs every frame of the stream, timing the event handling and the
+    # update separately
+    updateTimes = []
+    eventTimes = []
+    allocated = []
+    retained = 0
+    handled = 0
+
+    for pos, events in stream:
+        mouse.pos = pos
+
+        start = time.perf_counter()
+        for event in events:
+            if isinstance(event, tuple):
+                container = event[1]
+                if container.isMasked():
+                    container.startAnimation("centre", 0.25, "in")
+                else:
+                    container.startAnimation("centre", 0.25, "out")
+            elif root.eventHandler(event):
+                handled += 1
+        eventTimes.append(time.perf_counter() - start)
+
+        screen.fill((244, 244, 244))
+
+        if measureMemory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        root.update()
+        updateTimes.append(time.perf_counter() - start)
+
+        if measureMemory:
+            after, peak = tracemalloc.get_traced_memory()
+            allocated.append(peak - before)
+            retained += after - before
+
+    return updateTimes, eventTimes, allocated, retained, handled
+
+
+def summarise(times):
+    # In milliseconds
+    times = sorted(times)
+    return {"mean": statistics.mean(times) * 1000,
+            "median": statistics.median(times) * 1000,
+            "p95": times[int(len(times) * 0.95)] * 1000,
+            "max": times[-1] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Times pgkinter on its own, without a window")
+    parser.add_argument("--containers", type=int, default=1,
+                        help="number of panels")
+    parser.add_argument("--inputs", type=int, default=7,
+                        help="input boxes in each panel")
+    parser.add_argument("--checkboxes", type=int, default=3,
+                        help="checkboxes in each panel")
+    parser.add_argument("--buttons", type=int, default=3,
+                        help="buttons in each panel")
+    parser.add_argument("--dropdowns", type=int, default=1,
+                        help="dropdowns in each panel")
+    parser.add_argument("--options", type=int, default=200,
+                        help="options in each dropdown")
+    parser.add_argument("--frames", type=int, default=600,
+                        help="number of frames to replay")
+    parser.add_argument("--animate", type=int, default=120, metavar="FRAMES",
+                        help="start a container animation every this many "
+                             "frames (0 for none)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the made-up events")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the (slower) allocation measurements")
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON, for comparing runs")
+    options = parser.parse_args()
+
+    if options.containers < 1:
+        parser.error("--containers must be at least 1")
+    if options.options < 1:
+        parser.error("--options must be at least 1")
+
+    # pgkinter loads its images relative to the program folder
+    os.chdir(Path(__file__).resolve().parent)
+
+    pg.init()
+    screen = pg.display.set_mode((SW, SH))
+    mouse = ReplayMouse()
+    pg.mouse.get_pos = mouse.get_pos
+
+    root = pgk.Pgk()
+    start = time.perf_counter()
+    containers, widgets = buildTree(root, screen, options)
+    buildTime = time.perf_counter() - start
+
+    # One frame so that the widgets are placed in their containers
+    screen.fill((244, 244, 244))
+    root.update()
+    stream = makeEventStream(widgets, containers, options)
+
+    updateTimes, eventTimes, unused, unused, handled = replay(root, screen,
+                                                               stream, mouse)
+
+    results = {"widgets": len(widgets),
+               "containers": len(containers),
+               "frames": len(stream),
+               "events": sum(1 for pos, events in stream for event in events
+                             if not isinstance(event, tuple)),
+               "events handled": handled,
+               "build ms": buildTime * 1000,
+               "update ms": summarise(updateTimes),
+               "events ms": summarise(eventTimes)}
+
+    if not options.no_memory:
+        # Replayed again, as tracing allocations slows everything down
+        tracemalloc.start()
+        unused, unused, allocated, retained, unused = replay(
+            root, screen, stream, mouse, True)
+        tracemalloc.stop()
+        results["allocated KiB per frame"] = {
+            "mean": statistics.mean(allocated) / 1024,
+            "max": max(allocated) / 1024}
+        results["retained KiB"] = retained / 1024
+
+    pg.quit()
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("%d widgets in %d containers, built in %.1f ms" %
+          (results["widgets"], results["containers"], results["build ms"]))
+    print("%d frames replayed, %d of %d events handled by widgets" %
+          (results["frames"], results["events handled"], results["events"]))
+    for name in ["update ms", "events ms"]:
+        print("%-14s mean %7.3f  median %7.3f  p95 %7.3f  max %7.3f" %
+              (name, results[name]["mean"], results[name]["median"],
+               results[name]["p95"], results[name]["max"]))
+    if not options.no_memory:
+        print("allocated      mean %7.1f KiB per frame, max %.1f KiB" %
+              (results["allocated KiB per frame"]["mean"],
+               results["allocated KiB per frame"]["max"]))
+        print("retained       %7.1f KiB over the whole run" %
+              results["retained KiB"])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import time
+from collections import OrderedDict
 from pathlib import Path
 from math import sqrt, floor
 
@@ -34,13 +35,109 @@ class Pgk(object):
             str(imagesFolder / "pgkWhiteCross.png"))
         self.pgkBlackCrossImage = pg.image.load(
             str(imagesFolder / "pgkBlackCross.png"))
+
+        # pg.font.SysFont has to search through every font on the system, so
+        # fonts are only ever loaded once, and shared between widgets
+        self.pgkFonts = {}
+
+        # Rendered text surfaces, with the least recently used ones at the
+        # front. Means text that doesn't change doesn't need re-rendering
+        # every frame.
+        self.pgkTextCache = OrderedDict()
+        self.pgkTextCacheSize = 512
+
+        # Spatial index of the widgets that can be clicked on. The screen is
+        # split into square cells, and each cell has a list of the widgets
+        # that overlap it, topmost first - so finding what is under the mouse
+        # only means checking the few widgets in one cell, rather than all of
+        # them. It is rebuilt (the next time it is needed) whenever widgets
+        # are added, removed, moved or animated.
+        self.pgkHitIndex = None
+        self.pgkHitCellSize = 128
+        self.pgkLayoutChanged = False
+        self.pgkIndexedSprites = []
+        self.pgkWasAnimating = False
+
+        # Widgets under the mouse at the start of this frame's update
+        self.pgkUnderMouse = set()
+
+        # The input box that keyboard events are sent to, if any
+        self.pgkFocus = None
+
+        # Expanded dropdowns - drawn on top of everything else, so they come
+        # first in the hit index, and they are sent every click (wherever it
+        # is) so that they can close when the user clicks somewhere else
+        self.pgkPopups = []
+
+        # The time, mouse position and pressed keys are read once at the
+        # start of each update, and every widget uses those readings - so
+        # timers and animations all run off the same clock
+        self.pgkFrameTime = time.time()
+        self.pgkMousePos = (0, 0)
+        self.pgkKeysPressed = None
+
+        # Widgets part way through an animation (containers, and buttons
+        # swelling or shrinking), and when they were last animated - None if
+        # they have only just started
+        self.pgkAnimations = {}
         print("Pgkinter V1.0.0 initialised successfully! Hello there!")
 
+    def buildHitIndex(self):
+        self.pgkHitIndex = {}
+        cellSize = self.pgkHitCellSize
+
+        # pgkGroup is already ordered so that widgets that should get events
+        # first (e.g. dropdowns before buttons) come first
+        ordered = self.pgkPopups + [i for i in self.pgkGroup.sprites()
+                                    if i not in self.pgkPopups]
+        for widget in ordered:
+            if not isinstance(widget, (Button, Checkbox, Dropdown, InputBox)):
+                continue
+
+            rect = widget.getHitRect()
+            if rect.w <= 0 or rect.h <= 0:
+                continue
+
+            for cellX in range(rect.left // cellSize,
+                               (rect.right - 1) // cellSize + 1):
+                for cellY in range(rect.top // cellSize,
+                                   (rect.bottom - 1) // cellSize + 1):
+                    self.pgkHitIndex.setdefault((cellX, cellY), []).append(
+                        (rect, widget))
+
     def buttonDefaultAction(self):
         # Default action that will be assigned to buttons if none is assigned on
         # instantiation
         pass
 
+    def clipToContainer(self, rect, container):
+        # Part of a widget's rect that isn't hidden by its container's masks
+        if container is None:
+            return rect
+
+        visible = container.getVisibleRect()
+        if visible is None:
+            return rect
+
+        return rect.clip(visible)
+
+    def focus(self, widget):
+        # Keyboard events will only be sent to this widget
+        self.pgkFocus = widget
+
+    def unfocus(self, widget):
+        if self.pgkFocus is widget:
+            self.pgkFocus = None
+
+    def getFont(self, name, size):
+        # Returns the shared font object for this name and size, loading it
+        # if it hasn't been used before
+        key = (name, int(size))
+        if key not in self.pgkFonts:
+            self.pgkFonts[key] = pg.font.SysFont(name, int(size))
+
+        return self.pgkFonts[key]
+
     def getWidgets(self):
         return self.pgkGroup.sprites()
 
@@ -55,6 +152,16 @@ class Pgk(object):
                 rgb[1] + ((255 - rgb[1]) * 1 / 2),
                 rgb[2] + ((255 - rgb[2]) * 1 / 2))
 
+    def isAnimating(self):
+        # True if any widget is part way through an animation. Programs can
+        # use this to decide whether the screen needs redrawing, or whether
+        # they can wait for the next event instead.
+        return len(self.pgkAnimations) > 0
+
+    def isUnderMouse(self, widget):
+        # Used by widgets to decide whether they are hovered over
+        return widget in self.pgkUnderMouse
+
     def isLight(self, rgb):  # Determines whether an rgb code is light or dark
         """Treats the rgb code as a 3D position vector and calculates the length of
         the line from the origin to the position vector. The longer the line,
@@ -67,19 +174,135 @@ class Pgk(object):
         else:
             return False
 
+    def renderText(self, font, text, antialias, colour):
+        """Works the same as font.render, but keeps hold of the surfaces it
+        renders. Surfaces returned by this may be shared, so they should not be
+        drawn on.
+
+        """
+        key = (font, text, tuple(colour), antialias)
+        try:
+            self.pgkTextCache.move_to_end(key)
+            return self.pgkTextCache[key]
+        except KeyError:
+            pass
+
+        rendered = font.render(text, antialias, colour)
+        self.pgkTextCache[key] = rendered
+
+        if len(self.pgkTextCache) > self.pgkTextCacheSize:
+            # Remove the least recently used surface
+            self.pgkTextCache.popitem(last=False)
+
+        return rendered
+
+    def layoutChanged(self):
+        # Called by widgets when they are moved, resized or deleted
+        self.pgkHitIndex = None
+        self.pgkLayoutChanged = True
+
+    def openPopup(self, widget):
+        if widget not in self.pgkPopups:
+            self.pgkPopups.append(widget)
+        self.layoutChanged()
+
+    def closePopup(self, widget):
+        if widget in self.pgkPopups:
+            self.pgkPopups.remove(widget)
+        self.layoutChanged()
+
+    def startAnimating(self, widget):
+        # The widget's animate method will be called once every frame, with
+        # the time since the last frame, until it calls stopAnimating
+        if widget not in self.pgkAnimations:
+            self.pgkAnimations[widget] = None
+
+    def stopAnimating(self, widget):
+        if widget in self.pgkAnimations:
+            del self.pgkAnimations[widget]
+
     # noinspection SpellCheckingInspection
     def update(self):  # Only need pgkinter.update() in main code
+        self.pgkFrameTime = time.time()
+        self.pgkMousePos = pg.mouse.get_pos()
+        self.pgkKeysPressed = pg.key.get_pressed()
+
+        self.pgkUnderMouse = set(self.widgetsAt(self.pgkMousePos))
+
         self.pgkGroup.update()
 
+        # Every animation is moved on here, after everything has been drawn
+        for widget, lastFrame in list(self.pgkAnimations.items()):
+            if widget not in self.pgkGroup:
+                # Widget has been deleted (or hidden) part way through - it
+                # may already have been taken out by the container hiding it
+                self.stopAnimating(widget)
+                continue
+
+            # Animations are timed from their first frame, as the widget may
+            # not have been updated for a while before they started (if the
+            # program was waiting for input)
+            if lastFrame is None:
+                frameTime = 0
+            else:
+                frameTime = self.pgkFrameTime - lastFrame
+
+            self.pgkAnimations[widget] = self.pgkFrameTime
+            widget.animate(frameTime)
+
+        # Widgets in containers only find out where they are when they're
+        # drawn, so the index is rebuilt after drawing if anything could have
+        # moved. Animations need one more rebuild once they have finished.
+        animating = self.isAnimating()
+        sprites = self.pgkGroup.sprites()
+        if self.pgkLayoutChanged or animating or self.pgkWasAnimating or \
+                sprites != self.pgkIndexedSprites:
+            self.pgkHitIndex = None
+            self.pgkIndexedSprites = sprites
+            self.pgkLayoutChanged = False
+        self.pgkWasAnimating = animating
+
+    def widgetsAt(self, pos):
+        # Every clickable widget that covers pos, topmost first
+        if self.pgkHitIndex is None:
+            self.buildHitIndex()
+
+        cell = (int(pos[0]) // self.pgkHitCellSize,
+                int(pos[1]) // self.pgkHitCellSize)
+        return [widget for rect, widget in self.pgkHitIndex.get(cell, [])
+                if rect.collidepoint(pos)]
+
     # noinspection SpellCheckingInspection,SpellCheckingInspection
     def eventHandler(self, event):
-        # Takes an event list from the main pygame loop, and passes it to every
-        # pgkinter sprite.
+        # Takes an event from the main pygame loop, and passes it to the
+        # widgets that it is meant for. Keyboard events only go to the focused
+        # input box, and mouse events go to the widgets under the mouse (until
+        # one of them handles it).
+        if event.type in [KEYDOWN, KEYUP, TEXTINPUT]:
+            if self.pgkFocus is not None:
+                return bool(self.pgkFocus.handleEvent(event))
+            return False
+
+        if event.type not in [MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEWHEEL]:
+            return False
+
+        if event.type == MOUSEWHEEL:
+            pos = pg.mouse.get_pos()
+        else:
+            pos = event.pos
+
+        # The focused input box and any expanded dropdowns are sent every
+        # click, even if another widget has already handled it, as they need
+        # to know when the user clicks away from them
+        listeners = list(self.pgkPopups)
+        if self.pgkFocus is not None and self.pgkFocus not in listeners:
+            # An expanded dropdown is also focused while it is being typed in
+            listeners.append(self.pgkFocus)
+
         handled = False
-        for obj in self.pgkGroup.sprites():
-            # InputBoxes can handle events even after one has been handled as
-            # they need to be able to become inactive
-            if not handled or isinstance(obj, InputBox):
+        for obj in listeners + [i for i in self.widgetsAt(pos)
+                                if i not in listeners]:
+            if not handled or obj in listeners:
                 if obj.handleEvent(event):
                     handled = True
         return handled
@@ -96,7 +319,7 @@ class Button(pg.sprite.Sprite):
         self.__parent = parent
         self.__screen = screen
         self.__timer = 0.5  # Starts at 0.5 so button is usable instantly
-        self.__previousFrame = time.time()
+        self.__previousFrame = self.__parent.pgkFrameTime
         self.__hovered = False
 
         try:  # Input validation
@@ -111,9 +334,9 @@ class Button(pg.sprite.Sprite):
         """
 
         if font is None:
-            self.__font = pg.font.SysFont("Helvetica", 30)
+            self.__font = self.__parent.getFont("Helvetica", 30)
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if bgColour is None:
             self.__bgColour = (255, 255, 255)
@@ -128,11 +351,13 @@ class Button(pg.sprite.Sprite):
         # Changes text colour depending on whether the background colour is
         # light or not.
         if self.__parent.isLight(self.__bgColour):
-            self.__displayText = self.__font.render(self.__text, True,
-                                                    (0, 0, 0))
+            self.__displayText = self.__parent.renderText(self.__font,
+                                                          self.__text, True,
+                                                          (0, 0, 0))
         else:
-            self.__displayText = self.__font.render(self.__text, True,
-                                                    (255, 255, 255))
+            self.__displayText = self.__parent.renderText(self.__font,
+                                                          self.__text, True,
+                                                          (255, 255, 255))
 
         if not height:
             self.__height = self.__displayText.get_rect().h * 1.25
@@ -186,6 +411,17 @@ class Button(pg.sprite.Sprite):
             self.__swellOnHover = True
             self.__origWidth = self.__width
             self.__origHeight = self.__height
+            self.__origCoords = (x, y)
+
+        # The button is drawn onto a surface once for each state (normal and
+        # hovered), which is then blitted every frame until something about
+        # the button changes
+        self.__stateSurfaces = {}
+        self.__surfaceGeometry = None
+
+        # The size and position the button was last placed at in its
+        # container
+        self.__placedGeometry = None
 
         self.__parent.pgkGroup.add(self)
 
@@ -200,13 +436,16 @@ class Button(pg.sprite.Sprite):
         if not font:
             pass
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
             if self.__parent.isLight(self.__bgColour):
-                self.__displayText = self.__font.render(self.__text, True,
-                                                        (0, 0, 0))
+                self.__displayText = self.__parent.renderText(self.__font,
+                                                              self.__text,
+                                                              True, (0, 0, 0))
             else:
-                self.__displayText = self.__font.render(self.__text, True,
-                                                        (255, 255, 255))
+                self.__displayText = self.__parent.renderText(self.__font,
+                                                              self.__text,
+                                                              True,
+                                                              (255, 255, 255))
 
         if not bgColour:
             pass
@@ -219,12 +458,15 @@ class Button(pg.sprite.Sprite):
         else:
             if self.__parent.isLight(self.__bgColour):
                 self.__text = text
-                self.__displayText = self.__font.render(self.__text, True,
-                                                        (0, 0, 0))
+                self.__displayText = self.__parent.renderText(self.__font,
+                                                              self.__text,
+                                                              True, (0, 0, 0))
             else:
                 self.__text = text
-                self.__displayText = self.__font.render(self.__text, True,
-                                                        (255, 255, 255))
+                self.__displayText = self.__parent.renderText(self.__font,
+                                                              self.__text,
+                                                              True,
+                                                              (255, 255, 255))
 
         if not height:
             pass
@@ -254,15 +496,24 @@ class Button(pg.sprite.Sprite):
                                                    (int(self.__width),
                                                     int(self.__height)))
 
-        self.__textRect = self.__displayText.get_rect(
-            center=(self.__rect.x + 0.5 * self.__width,
-                    self.__rect.y + 0.45 * self.__height))
+        # Menus that are shown again give their buttons new actions each
+        # time, which doesn't change how they look - so they only need
+        # drawing again if something else was changed
+        if font or bgColour or text or height or width or image is not None \
+                or hoverImage is not None:
+            self.__textRect = self.__displayText.get_rect(
+                center=(self.__rect.x + 0.5 * self.__width,
+                        self.__rect.y + 0.45 * self.__height))
+
+            self.__stateSurfaces = {}
+            self.__parent.layoutChanged()
 
     def delete(self):
         # Need to set mouse back to normal, otherwise the mouse will remain
         # hidden after the widget has been deleted
         pg.mouse.set_cursor(*pg.cursors.arrow)
         self.__parent.pgkGroup.remove(self)
+        self.__parent.layoutChanged()
 
         if self.__container:
             self.__container.removeWidget(self)
@@ -272,42 +523,52 @@ class Button(pg.sprite.Sprite):
     def draw(self):
         # Made draw its own function, as widgets need to be drawn in a
         # different order if they are in a container
+        surface, pos = self.getImage()
+        self.__screen.blit(surface, pos)
+        self.drawOverlay()
 
-        if self.__container:
-            x, y = self.__container.getCorrectedCoords(self.__coords)
-            self.__rect = pg.Rect(x, y, self.__width, self.__height)
-
-            # Uses 0.45 * height as 0.5 places text slightly below-centre
-            self.__textRect = self.__displayText.get_rect(
-                center=(x + 0.5 * self.__width, y + 0.45 * self.__height))
-
+    def drawOverlay(self):
+        # The pointer goes on top of everything, so isn't part of the image
+        # a container keeps of its widgets
         if self.__hovered and self.__timer > 0.5:
-            if self.__image is None:
-                # Draws button with hover colour variant
-                pg.draw.rect(self.__screen, self.__bgColourHover, self.__rect)
-                self.__screen.blit(self.__displayText, self.__textRect)
-            else:
-                self.__screen.blit(self.__hoverImage, self.__rect)
-
             pg.mouse.set_visible(False)
             # Draws custom mouse image over mouse location
             self.__pointerRect = self.__parent.pgkPointerCursor.get_rect(
-                top=pg.mouse.get_pos()[1])
-            self.__pointerRect.x = pg.mouse.get_pos()[
+                top=self.__parent.pgkMousePos[1])
+            self.__pointerRect.x = self.__parent.pgkMousePos[
                                        0] - self.__pointerRect.w / 2
             self.__screen.blit(self.__parent.pgkPointerCursor,
                                self.__pointerRect)
 
-        elif not self.__hovered or self.__timer < 0.5:
+    def getHeight(self):
+        return self.__height
+
+    def getHitRect(self):
+        return self.__parent.clipToContainer(self.__rect, self.__container)
+
+    def getImage(self):
+        # Returns the surface the button currently looks like, and where it
+        # goes on screen
+        if self.__container and (self.__coords[0], self.__coords[1],
+                                 self.__width, self.__height) != \
+                self.__placedGeometry:
+            # Swelling or shrinking moves the button inside its container
+            self.place()
+
+        if self.__hovered and self.__timer > 0.5:
+            if self.__image is None:
+                # Button with hover colour variant
+                surface, offset = self.getStateSurface("hovered")
+            else:
+                return self.__hoverImage, self.__rect.topleft
+        else:
             if self.__image is None:
-                # Draws button with regular colour
-                pg.draw.rect(self.__screen, self.__bgColour, self.__rect)
-                self.__screen.blit(self.__displayText, self.__textRect)
+                # Button with regular colour
+                surface, offset = self.getStateSurface("normal")
             else:
-                self.__screen.blit(self.__image, self.__rect)
+                return self.__image, self.__rect.topleft
 
-    def getHeight(self):
-        return self.__height
+        return surface, (self.__rect.x + offset[0], self.__rect.y + offset[1])
 
     def getWidth(self):
         return self.__width
@@ -315,9 +576,77 @@ class Button(pg.sprite.Sprite):
     def getPos(self):
         return self.__rect.x, self.__rect.y
 
+    def place(self):
+        # Works out where the button is on screen from where its container
+        # is - the container calls this whenever it moves
+        x, y = self.__container.getCorrectedCoords(self.__coords)
+        self.__placedGeometry = (self.__coords[0], self.__coords[1],
+                                 self.__width, self.__height)
+        self.__rect = pg.Rect(x, y, self.__width, self.__height)
+
+        # Uses 0.45 * height as 0.5 places text slightly below-centre
+        self.__textRect = self.__displayText.get_rect(
+            center=(x + 0.5 * self.__width, y + 0.45 * self.__height))
+
+    def getStateSurface(self, state):
+        # Returns the button drawn in the given state, and where it goes
+        # relative to the button's rect (the text can stick out of the rect)
+        geometry = (self.__rect.size, self.__textRect.x - self.__rect.x,
+                    self.__textRect.y - self.__rect.y)
+        if geometry != self.__surfaceGeometry:
+            # Swelling or shrinking - the old surfaces are the wrong size
+            self.__stateSurfaces = {}
+            self.__surfaceGeometry = geometry
+
+        if state not in self.__stateSurfaces:
+            area = self.__rect.union(self.__textRect)
+            surface = pg.Surface(area.size, SRCALPHA)
+
+            if state == "hovered":
+                colour = self.__bgColourHover
+            else:
+                colour = self.__bgColour
+
+            pg.draw.rect(surface, colour, self.__rect.move(-area.x, -area.y))
+            surface.blit(self.__displayText,
+                         self.__textRect.move(-area.x, -area.y))
+
+            self.__stateSurfaces[state] = (surface, (area.x - self.__rect.x,
+                                                     area.y - self.__rect.y))
+
+        return self.__stateSurfaces[state]
+
     def isHovered(self):
         return self.__hovered
 
+    def isAnimating(self):
+        # True while swelling or shrinking
+        return self in self.__parent.pgkAnimations
+
+    def animate(self, frameTime):
+        # Called by the parent every frame while the button is swelling or
+        # shrinking
+        self.__frameTime = frameTime
+
+        if self.__hovered:
+            if self.__height < self.__origHeight * 1.25 and \
+                    self.__width < self.__origWidth * 1.05:
+                self.swell()
+            else:
+                self.__parent.stopAnimating(self)
+
+        else:
+            if self.__height > self.__origHeight and \
+                    self.__width > self.__origWidth:
+                self.shrink()
+            else:
+                # Puts the button back to exactly its original size, as the
+                # last step of shrinking can take it slightly past it
+                self.__width = self.__origWidth
+                self.__height = self.__origHeight
+                self.__coords = list(self.__origCoords)
+                self.__parent.stopAnimating(self)
+
     # Swell and shrink are button animations that make the button change size
     # when you hover over it - gives the UI a more modern and sleek feel
     def swell(self):
@@ -325,7 +654,7 @@ class Button(pg.sprite.Sprite):
 
         # Multiplier controls how much the button swells by, in order to make
         # the animation last a certain length of time (0.25 seconds)
-        multiplier = (time.time() - self.__previousFrame) / 0.25
+        multiplier = self.__frameTime / 0.25
 
         widthDifference = self.__origWidth * 1.05 - self.__origWidth
         heightDifference = self.__origHeight * 1.25 - self.__origHeight
@@ -349,7 +678,7 @@ class Button(pg.sprite.Sprite):
 
     def shrink(self):
         # Identical to swell function, but inverse signs
-        multiplier = (time.time() - self.__previousFrame) / 0.25
+        multiplier = self.__frameTime / 0.25
 
         widthDifference = self.__origWidth * 1.05 - self.__origWidth
         heightDifference = self.__origHeight * 1.25 - self.__origHeight
@@ -368,48 +697,55 @@ class Button(pg.sprite.Sprite):
             self.__height -= 1
             self.__coords[1] += 0.5
 
+    def reset(self):
+        # Called when the button's container is hidden - it goes back to its
+        # original size, and isn't hovered over any more, so it looks normal
+        # when the container is shown again
+        if self.__hovered:
+            pg.mouse.set_visible(True)
+            self.__hovered = False
+
+        # Only swelling buttons change size
+        if self.__swellOnHover:
+            self.__width = self.__origWidth
+            self.__height = self.__origHeight
+            self.__coords = list(self.__origCoords)
+            self.__parent.stopAnimating(self)
+
+    def restartSwellTiming(self):
+        # The button may not have been updated for a while (if the program was
+        # waiting for input), so swelling and shrinking are timed from when
+        # the mouse moved on or off the button instead
+        self.__timer += self.__parent.pgkFrameTime - self.__previousFrame
+        self.__previousFrame = self.__parent.pgkFrameTime
+
+        if self.__swellOnHover:
+            self.__parent.startAnimating(self)
+
     # noinspection PyAttributeOutsideInit
     def update(self):
         # 0.5 timer check ensures that button can only be clicked once every
         # 0.5 seconds
-        if self.__rect.collidepoint(pg.mouse.get_pos()) and not self.__hovered:
-            # Can only be hovered over if button is not obstructed by
-            # container mask
-            if (self.__container and not self.__container.mouseMasked()) or \
-                    not self.__container:
-                # Sets mouse cursor to invisible
-                self.__hovered = True
-
-        elif not self.__rect.collidepoint(
-                pg.mouse.get_pos()) and self.__hovered:
+        # The hit index leaves out any part of the button that is hidden by
+        # its container's masks, so it can't be hovered over through them
+        underMouse = self.__parent.isUnderMouse(self)
+        if underMouse and not self.__hovered:
+            # Sets mouse cursor to invisible
+            self.__hovered = True
+            self.restartSwellTiming()
+
+        elif not underMouse and self.__hovered:
             # Sets mouse cursor back to default
             pg.mouse.set_visible(True)
             self.__hovered = False
-
-        if self.__swellOnHover and self.__hovered:
-            if self.__rect.height < self.__origHeight * 1.25 and \
-                    self.__rect.width < self.__origWidth * 1.05:
-                self.swell()
-            elif self.__rect.height > self.__origHeight * 1.25 or \
-                    self.__rect.width > self.__origWidth * 1.05:
-                self.__rect.height = self.__origHeight * 1.25
-                self.__rect.width = self.__origWidth * 1.05
-
-        if self.__swellOnHover and not self.__hovered:
-            if self.__rect.height > self.__origHeight and \
-                    self.__rect.width > self.__origWidth:
-                self.shrink()
-            if self.__rect.height < self.__origHeight or \
-                    self.__rect.width < self.__origWidth:
-                self.__rect.height = self.__origHeight
-                self.__rect.width = self.__origWidth
+            self.restartSwellTiming()
 
         # If button is not in a container, it can be drawn normally
         if not self.__container:
             self.draw()
 
-        self.__timer += time.time() - self.__previousFrame
-        self.__previousFrame = time.time()
+        self.__timer += self.__parent.pgkFrameTime - self.__previousFrame
+        self.__previousFrame = self.__parent.pgkFrameTime
 
     def handleEvent(self, event):
         """ Due to the nature of pygame's events, you cannot have a for loop
@@ -459,9 +795,9 @@ class Checkbox(pg.sprite.Sprite):
         """
 
         if not font:
-            self.__font = pg.font.SysFont("Helvetica", 30)
+            self.__font = self.__parent.getFont("Helvetica", 30)
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if not bgColour:
             self.__bgColour = (255, 255, 255)
@@ -479,8 +815,10 @@ class Checkbox(pg.sprite.Sprite):
             self.__inlineText = inlineText
 
         # Renders inlineText as a pygame surface object
-        self.__inlineDisplayText = self.__font.render(self.__inlineText, True,
-                                                      self.__textColour)
+        self.__inlineDisplayText = self.__parent.renderText(self.__font,
+                                                            self.__inlineText,
+                                                            True,
+                                                            self.__textColour)
 
         if not height:
             # Height and width of checkbox scales with the font
@@ -505,7 +843,12 @@ class Checkbox(pg.sprite.Sprite):
         self.__rect = pg.Rect(x, y, self.__width, self.__height)
 
         # Default output is blank (False)
-        self.__outputDisplay = self.__font.render("", True, (0, 0, 0))
+        self.__outputDisplay = self.__parent.renderText(self.__font, "", True,
+                                                        (0, 0, 0))
+
+        # The checkbox (and its text) is drawn onto a surface once each for
+        # checked and unchecked, and only drawn again if config is used
+        self.__stateSurfaces = {}
 
         # Ordering of widgets - Containers first, then labels, dropdowns,
         # input boxes, checkboxes, then buttons. Helps with widgets handling
@@ -535,7 +878,7 @@ class Checkbox(pg.sprite.Sprite):
         if not font:
             pass
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if not bgColour:
             pass
@@ -552,8 +895,10 @@ class Checkbox(pg.sprite.Sprite):
         else:
             self.__inlineText = inlineText
 
-        self.__inlineDisplayText = self.__font.render(self.__inlineText, True,
-                                                      self.__textColour)
+        self.__inlineDisplayText = self.__parent.renderText(self.__font,
+                                                            self.__inlineText,
+                                                            True,
+                                                            self.__textColour)
 
         self.__inlineTextRect = self.__inlineDisplayText.get_rect(
             center=(self.__rect.x - self.__inlineDisplayText.get_rect().w * 0.6,
@@ -575,13 +920,16 @@ class Checkbox(pg.sprite.Sprite):
                                                        floor(self.__height)))
 
         else:
-            self.__outputDisplay = self.__font.render("", True, (0, 0, 0))
+            self.__outputDisplay = self.__parent.renderText(self.__font, "",
+                                                            True, (0, 0, 0))
+
+        self.__stateSurfaces = {}
 
     def click(self):
         if self.__output:
             self.__output = False
-            self.__outputDisplay = self.__font.render("", True,
-                                                      (0, 0, 0))
+            self.__outputDisplay = self.__parent.renderText(self.__font, "",
+                                                            True, (0, 0, 0))
         else:
             self.__output = True
 
@@ -597,6 +945,7 @@ class Checkbox(pg.sprite.Sprite):
     def delete(self):
         pg.mouse.set_cursor(*pg.cursors.arrow)
         self.__parent.pgkGroup.remove(self)
+        self.__parent.layoutChanged()
 
         if self.__container:
             self.__container.removeWidget(self)
@@ -604,57 +953,99 @@ class Checkbox(pg.sprite.Sprite):
         del self
 
     def draw(self):
-        if self.__container:
-            x, y = self.__container.getCorrectedCoords(self.__coords)
-            # Aligns text with the checkbox
-            self.__inlineTextRect = self.__inlineDisplayText.get_rect(
-                center=(x - self.__inlineDisplayText.get_rect().w * 0.6,
-                        y + 0.45 * self.__height))
-
-            self.__rect = pg.Rect(x, y, self.__width, self.__height)
-
-        pg.draw.rect(self.__screen, self.__bgColour, self.__rect)
-
-        self.__screen.blit(self.__outputDisplay, self.__rect)
+        surface, pos = self.getImage()
+        self.__screen.blit(surface, pos)
+        self.drawOverlay()
 
+    def drawOverlay(self):
         if self.__hovered:
             # PointerRect is modified in order to appear similarly to how the
             # pointer appears in windows, with the top of the hand in line
             # with the location that the mouse is pointing to.
             self.__pointerRect = self.__parent.pgkPointerCursor.get_rect(
-                top=pg.mouse.get_pos()[1])
-            self.__pointerRect.x = pg.mouse.get_pos()[
+                top=self.__parent.pgkMousePos[1])
+            self.__pointerRect.x = self.__parent.pgkMousePos[
                                        0] - self.__pointerRect.w / 2
             self.__screen.blit(self.__parent.pgkPointerCursor,
                                self.__pointerRect)
 
-        self.__screen.blit(self.__inlineDisplayText, self.__inlineTextRect)
-
     def get(self):
         return self.__output
 
     def getHeight(self):
         return self.__height
 
+    def getHitRect(self):
+        return self.__parent.clipToContainer(self.__rect, self.__container)
+
+    def getImage(self):
+        # Returns the surface the checkbox currently looks like, and where it
+        # goes on screen
+        if self.__output:
+            surface, offset = self.getStateSurface("checked")
+        else:
+            surface, offset = self.getStateSurface("unchecked")
+
+        return surface, (self.__rect.x + offset[0], self.__rect.y + offset[1])
+
     def getWidth(self):
         return self.__width
 
     def getPos(self):
         return self.__rect.x, self.__rect.y
 
+    def place(self):
+        # Moves the checkbox along with its container
+        x, y = self.__container.getCorrectedCoords(self.__coords)
+
+        # Aligns text with the checkbox
+        self.__inlineTextRect = self.__inlineDisplayText.get_rect(
+            center=(x - self.__inlineDisplayText.get_rect().w * 0.6,
+                    y + 0.45 * self.__height))
+
+        self.__rect = pg.Rect(x, y, self.__width, self.__height)
+
+    def reset(self):
+        # Called when the checkbox's container is hidden
+        if self.__hovered:
+            pg.mouse.set_visible(True)
+            self.__hovered = False
+
+    def setChecked(self, checked):
+        # Ticks or unticks the checkbox without it being clicked on
+        if checked != self.__output:
+            self.click()
+
+    def getStateSurface(self, state):
+        # Returns the checkbox and its text drawn in the given state, and
+        # where it goes relative to the checkbox's rect
+        if state not in self.__stateSurfaces:
+            area = self.__rect.union(self.__inlineTextRect)
+            surface = pg.Surface(area.size, SRCALPHA)
+
+            pg.draw.rect(surface, self.__bgColour,
+                         self.__rect.move(-area.x, -area.y))
+            surface.blit(self.__outputDisplay,
+                         self.__rect.move(-area.x, -area.y))
+            surface.blit(self.__inlineDisplayText,
+                         self.__inlineTextRect.move(-area.x, -area.y))
+
+            self.__stateSurfaces[state] = (surface, (area.x - self.__rect.x,
+                                                     area.y - self.__rect.y))
+
+        return self.__stateSurfaces[state]
+
     # noinspection PyAttributeOutsideInit
     def update(self):
-        if self.__rect.collidepoint(pg.mouse.get_pos()) and not self.__hovered:
-            # Can only be hovered over if checkbox is not obstructed by
-            # container mask
-            if (self.__container and not self.__container.mouseMasked()) or \
-                    not self.__container:
-                # Sets mouse cursor to invisible
-                pg.mouse.set_visible(False)
-                self.__hovered = True
-
-        elif not self.__rect.collidepoint(
-                pg.mouse.get_pos()) and self.__hovered:
+        # Parts of the checkbox hidden by container masks aren't in the hit
+        # index, so can't be hovered over
+        underMouse = self.__parent.isUnderMouse(self)
+        if underMouse and not self.__hovered:
+            # Sets mouse cursor to invisible
+            pg.mouse.set_visible(False)
+            self.__hovered = True
+
+        elif not underMouse and self.__hovered:
             # Sets mouse cursor back to default
             pg.mouse.set_visible(True)
             self.__hovered = False
@@ -753,29 +1144,12 @@ class Container(pg.sprite.Sprite):
         self.__outlineRect.center = self.__rect.center
 
         # In order to create the illusion of the container hiding widgets,
-        # I will use a 'mask' rect that is the same size as the container -
-        # this will be set to the same colour as the background in the main
-        # part of my code, making a seamless look
-        if startVisible:
-            self.__maskLeftRect = pg.Rect(0, 0, 0, 0)
-            self.__maskRightRect = pg.Rect(0, 0, 0, 0)
-            self.__maskTopRect = pg.Rect(0, 0, 0, 0)
-            self.__maskBottomRect = pg.Rect(0, 0, 0, 0)
-
-        elif not startVisible:
-            self.__maskLeftRect = pg.Rect(0, 0, self.__halfWidth,
-                                          self.__fullHeight)
-            self.__maskRightRect = pg.Rect(0, 0, self.__halfWidth,
-                                           self.__fullHeight)
-            self.__maskTopRect = pg.Rect(0, 0, self.__fullWidth,
-                                         self.__halfHeight)
-            self.__maskBottomRect = pg.Rect(0, 0, self.__fullWidth,
-                                            self.__halfHeight)
-
-        self.__maskLeftRect.topleft = self.__outlineRect.topleft
-        self.__maskRightRect.topright = self.__outlineRect.topright
-        self.__maskTopRect.topleft = self.__outlineRect.topleft
-        self.__maskBottomRect.bottomleft = self.__outlineRect.bottomleft
+        # I will use 'mask' rects that cover the hidden parts of the
+        # container. They aren't drawn - only the part of the container
+        # between them is (see getVisibleRect), so the container can be
+        # animated over anything, not just a plain background. maskColour is
+        # still accepted, but isn't needed any more.
+        self.setMasks(startVisible)
 
         # This attribute will be set in the startAnimation method, and will
         # determine whether or not the container - and widgets inside of it -
@@ -783,18 +1157,27 @@ class Container(pg.sprite.Sprite):
         # is no need for loads of timing variables in the main code.
         self.__deleteAfter = False
 
-        if len(self.__parent.pgkGroup.sprites()) > 0:
-            after = self.__parent.pgkGroup.sprites()[1:]
-            for sprite in after:
-                self.__parent.pgkGroup.remove(sprite)
-            self.__parent.pgkGroup.add(self)
-            for sprite in after:
-                self.__parent.pgkGroup.add(sprite)
+        # Same as deleteAfter, but the container is only hidden, so it can be
+        # shown again later without building all of its widgets again
+        self.__hideAfter = False
 
-        else:
-            self.__parent.pgkGroup.add(self)
+        # Widgets that were taken out of pgkGroup along with the container
+        # when it was hidden (in the order they were in), or None if the
+        # container isn't hidden
+        self.__hiddenWidgets = None
 
-        self.__previousFrame = time.time()
+        self.addToGroup()
+
+        # The outline, background and widgets are all drawn onto one surface,
+        # which is only drawn again when one of the widgets changes how it
+        # looks - animating the container then just means blitting part of
+        # it, or blitting it somewhere else
+        self.__composite = None
+        self.__compositeImages = None
+
+        # Where the container was when its widgets were last placed - they
+        # only need to work out where they are on screen when it moves
+        self.__placedAt = None
 
     def config(self, outlineColour=None,
                outlineThickness=None, bg=False, bgColour=None,
@@ -871,13 +1254,48 @@ class Container(pg.sprite.Sprite):
         self.__maskTopRect.topleft = self.__outlineRect.topleft
         self.__maskBottomRect.bottomleft = self.__outlineRect.bottomleft
 
+        # The composite is relative to the container's corner, so it can be
+        # kept if the container has only been moved
+        if outlineColour is not None or outlineThickness is not None or bg \
+                or height is not None or width is not None:
+            self.__composite = None
+        self.__parent.layoutChanged()
+
+    def addToGroup(self):
+        # Containers go near the front of pgkGroup, so that they are drawn
+        # before any widgets that aren't in a container
+        if len(self.__parent.pgkGroup.sprites()) > 0:
+            after = self.__parent.pgkGroup.sprites()[1:]
+            for sprite in after:
+                self.__parent.pgkGroup.remove(sprite)
+            self.__parent.pgkGroup.add(self)
+            for sprite in after:
+                self.__parent.pgkGroup.add(sprite)
+
+        else:
+            self.__parent.pgkGroup.add(self)
+
     def addWidget(self, widget):
         self.__widgets.add(widget)
+        # New widget needs placing before it can be drawn
+        self.__placedAt = None
 
     def delete(self):
         self.__parent.pgkGroup.remove(self)
+        self.__parent.layoutChanged()
         del self
 
+    def endAnimation(self):
+        # Called once an animation has finished - the container and its
+        # widgets are deleted or hidden now, if that was asked for
+        if self.__deleteAfter:
+            for widget in self.__widgets:
+                widget.delete()
+            self.delete()
+
+        elif self.__hideAfter:
+            self.hide()
+
     def getCorrectedCoords(self, coords):
         newX = self.__rect.topleft[0] + coords[0]
         newY = self.__rect.topleft[1] + coords[1]
@@ -887,6 +1305,34 @@ class Container(pg.sprite.Sprite):
     def getRect(self):
         return self.__rect
 
+    def getVisibleRect(self):
+        # The part of the container between the masks, or None if none of the
+        # masks are showing (widgets aren't hidden at all)
+
+        # Masks can shrink past 0 for a frame at the end of an animation, and
+        # ones that started out invisible have no height (or width) at all,
+        # so only masks that actually cover something count
+        left, right, top, bottom = [
+            mask if mask.w > 0 and mask.h > 0 else None
+            for mask in [self.__maskLeftRect, self.__maskRightRect,
+                         self.__maskTopRect, self.__maskBottomRect]]
+        if left is None and right is None and top is None and bottom is None:
+            return None
+
+        leftEdge, topEdge = self.__outlineRect.topleft
+        rightEdge, bottomEdge = self.__outlineRect.bottomright
+        if left is not None:
+            leftEdge = left.right
+        if right is not None:
+            rightEdge = right.x
+        if top is not None:
+            topEdge = top.bottom
+        if bottom is not None:
+            bottomEdge = bottom.y
+
+        return pg.Rect(leftEdge, topEdge, max(0, rightEdge - leftEdge),
+                       max(0, bottomEdge - topEdge))
+
     def animationDone(self):
         if self.__animation == [None, None, None]:
             return True
@@ -896,12 +1342,39 @@ class Container(pg.sprite.Sprite):
     def handleEvent(self, event):
         pass
 
+    def hide(self):
+        """Takes the container and its widgets out of pgkGroup without
+        deleting them, so they aren't drawn or sent any events. Menus that are
+        opened again and again can be built once, hidden when they are closed,
+        and shown again (with new values written to their widgets) instead of
+        being built from scratch every time.
+
+        """
+        if self.__hiddenWidgets is not None:
+            return
+
+        self.__hiddenWidgets = [i for i in self.__parent.pgkGroup.sprites()
+                                if i in self.__widgets]
+        for widget in self.__hiddenWidgets:
+            # Nothing should still be hovered over, typed in or expanded
+            # when the menu is shown again
+            widget.reset()
+            self.__parent.pgkGroup.remove(widget)
+
+        self.__parent.pgkGroup.remove(self)
+        self.__parent.stopAnimating(self)
+        self.__animation = [None, None, None]
+        self.__parent.layoutChanged()
+
     def isEmpty(self):
         if len(self.__widgets.sprites()) == 0:
             return True
         else:
             return False
 
+    def isHidden(self):
+        return self.__hiddenWidgets is not None
+
     def isMasked(self):
         if (self.__maskRightRect.width == self.__halfWidth and
             self.__maskLeftRect.width == self.__halfWidth) or \
@@ -911,17 +1384,6 @@ class Container(pg.sprite.Sprite):
         else:
             return False
 
-    def mouseMasked(self):
-        # If the mouse is blocked by the masks, then this will be True - used
-        # to prevent clickthrough, allowing the user to interact with buttons
-        # even when they are hidden by the masks
-        mouseCoords = pg.mouse.get_pos()
-        for i in [self.__maskBottomRect, self.__maskLeftRect,
-                  self.__maskTopRect, self.__maskRightRect]:
-            if i.collidepoint(mouseCoords[0], mouseCoords[1]):
-                return True
-        return False
-
     def onScreen(self):
         if self.__animation[0] is None:
             sw, sh = pg.display.get_surface().get_size()
@@ -941,11 +1403,57 @@ class Container(pg.sprite.Sprite):
     def removeWidget(self, widget):
         self.__widgets.remove(widget)
 
+    def setMasks(self, visible):
+        # Opens the masks fully if visible is True, or closes them so that
+        # the whole container is hidden (ready to animate in) if not
+        if visible:
+            self.__maskLeftRect = pg.Rect(0, 0, 0, 0)
+            self.__maskRightRect = pg.Rect(0, 0, 0, 0)
+            self.__maskTopRect = pg.Rect(0, 0, 0, 0)
+            self.__maskBottomRect = pg.Rect(0, 0, 0, 0)
+
+        elif not visible:
+            self.__maskLeftRect = pg.Rect(0, 0, self.__halfWidth,
+                                          self.__fullHeight)
+            self.__maskRightRect = pg.Rect(0, 0, self.__halfWidth,
+                                           self.__fullHeight)
+            self.__maskTopRect = pg.Rect(0, 0, self.__fullWidth,
+                                         self.__halfHeight)
+            self.__maskBottomRect = pg.Rect(0, 0, self.__fullWidth,
+                                            self.__halfHeight)
+
+        self.__maskLeftRect.topleft = self.__outlineRect.topleft
+        self.__maskRightRect.topright = self.__outlineRect.topright
+        self.__maskTopRect.topleft = self.__outlineRect.topleft
+        self.__maskBottomRect.bottomleft = self.__outlineRect.bottomleft
+
+    def show(self, startVisible=True):
+        # Puts a hidden container and its widgets back in pgkGroup. Like when
+        # the container is created, startVisible=False means it is hidden by
+        # its masks, ready for an animation in. Can also be used on a
+        # container that isn't hidden, just to reset its masks.
+        self.setMasks(startVisible)
+
+        if self.__hiddenWidgets is not None:
+            self.addToGroup()
+            for widget in self.__hiddenWidgets:
+                self.__parent.pgkGroup.add(widget)
+            self.__hiddenWidgets = None
+
+        self.__animation = [None, None, None]
+        self.__parent.stopAnimating(self)
+        self.__parent.layoutChanged()
+
     def startAnimation(self, type, time, inOut, startFrom=None,
-                       deleteAfter=None, destination=None):
+                       deleteAfter=None, destination=None, hideAfter=None):
+        # The parent moves the animation on every frame from now on (if the
+        # container wasn't already animating)
+        self.__parent.startAnimating(self)
+
         self.__animation = [type, time, inOut]
 
         self.__deleteAfter = deleteAfter
+        self.__hideAfter = hideAfter
         if startFrom is not None:
             # startFrom is needed for animations that involve the whole
             # container moving
@@ -1030,10 +1538,7 @@ class Container(pg.sprite.Sprite):
                     self.__maskBottomRect.height == 0:
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
         elif inOut == "out":
             # Same as for when the container is appearing, but invert the
@@ -1071,10 +1576,7 @@ class Container(pg.sprite.Sprite):
                     self.__maskBottomRect.height == self.__halfHeight:
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
     def closeSideAnimation(self):
         # Appears as two 'sliding doors'
@@ -1108,10 +1610,7 @@ class Container(pg.sprite.Sprite):
                     self.__maskRightRect.width == 0:
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
 
         elif inOut == "out":
@@ -1133,10 +1632,7 @@ class Container(pg.sprite.Sprite):
                     self.__maskRightRect.width == self.__halfWidth:
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
     def closeUpAnimation(self):
         # Appears the same as slideSideAnimation, but flipped by 90 degrees
@@ -1168,10 +1664,7 @@ class Container(pg.sprite.Sprite):
                     self.__maskBottomRect.height == 0:
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
 
         elif inOut == "out":
@@ -1191,10 +1684,7 @@ class Container(pg.sprite.Sprite):
                     self.__maskBottomRect.height == self.__halfHeight:
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
     def horizontalSlideAnimation(self):
         # Whole container slides in from the left or right
@@ -1223,10 +1713,7 @@ class Container(pg.sprite.Sprite):
                 self.__rect.x = destination
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
 
         elif (inOut == "in" and destination > startFrom) or \
@@ -1242,10 +1729,7 @@ class Container(pg.sprite.Sprite):
                 self.__rect.x = destination
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
     def verticalSlideAnimation(self):
         # Whole container slides in from the top/bottom
@@ -1274,10 +1758,7 @@ class Container(pg.sprite.Sprite):
                 self.__rect.y = destination
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
 
 
         elif (inOut == "in" and destination > startFrom) or \
@@ -1293,36 +1774,77 @@ class Container(pg.sprite.Sprite):
                 self.__rect.y = destination
                 self.__animation = [None, None, None]
 
-                if self.__deleteAfter:
-                    for widget in self.__widgets:
-                        widget.delete()
-                    self.delete()
+                self.endAnimation()
+
+    def renderComposite(self, images):
+        # Draws the outline, background and widgets onto the container's own
+        # surface. Everything is relative to the container's topleft corner,
+        # so the surface stays the same wherever the container moves to
+        outlineRect = self.__outlineRect.move(-self.__rect.x, -self.__rect.y)
+
+        # Widgets (and their text) can stick out of the container
+        area = outlineRect.unionall([pg.Rect((x, y), surface.get_size())
+                                     for surface, x, y in images])
+        composite = pg.Surface(area.size, SRCALPHA)
 
-    def update(self):
         # Only draw outline rect if the outline thickness is greater than 0 -
         # no point otherwise, as it will be completely obscured by the
         # container rect
         if self.__outlineThickness > 0:
-            pg.draw.rect(self.__screen, self.__outlineColour,
-                         self.__outlineRect)
+            pg.draw.rect(composite, self.__outlineColour,
+                         outlineRect.move(-area.x, -area.y))
         if self.__bg:
-            pg.draw.rect(self.__screen, self.__bgColour, self.__rect)
+            pg.draw.rect(composite, self.__bgColour,
+                         (-area.x, -area.y, self.__rect.w, self.__rect.h))
 
-        # Widgets contained within the container need to be drawn here so
-        # that they will be on top of the container, but below the masks
-        for widget in self.__widgets:
-            widget.draw()
+        for surface, x, y in images:
+            composite.blit(surface, (x - area.x, y - area.y))
+
+        self.__composite = (composite, area.topleft)
+        self.__compositeImages = images
 
-        pg.draw.rect(self.__screen, self.__maskColour, self.__maskLeftRect)
-        pg.draw.rect(self.__screen, self.__maskColour, self.__maskRightRect)
-        pg.draw.rect(self.__screen, self.__maskColour, self.__maskTopRect)
-        pg.draw.rect(self.__screen, self.__maskColour, self.__maskBottomRect)
+    def update(self):
+        # The outline moves with the container when it slides
+        self.__outlineRect.center = self.__rect.center
 
-        self.__frameTime = time.time() - self.__previousFrame
-        self.__previousFrame = time.time()
+        if self.__rect.topleft != self.__placedAt:
+            self.__placedAt = self.__rect.topleft
+            for widget in self.__widgets:
+                widget.place()
+
+        # Nothing is drawn at all once the masks hide the whole container
+        visibleRect = self.getVisibleRect()
+        if visibleRect is None or (visibleRect.w > 0 and visibleRect.h > 0):
+            # Widgets contained within the container are drawn here so that
+            # they will be on top of the container, and hidden along with it.
+            # Each one hands over the surface it currently looks like, and the
+            # container's surface is only drawn again if any of them changed
+            images = []
+            for widget in self.__widgets:
+                surface, (x, y) = widget.getImage()
+                images.append((surface, x - self.__rect.x, y - self.__rect.y))
+
+            if self.__composite is None or images != self.__compositeImages:
+                self.renderComposite(images)
+
+            composite, offset = self.__composite
+            x, y = self.__rect.x + offset[0], self.__rect.y + offset[1]
+            if visibleRect is None:
+                self.__screen.blit(composite, (x, y))
+            else:
+                # Only the part between the masks is blitted - whatever is
+                # behind the container shows through the rest
+                self.__screen.blit(composite, visibleRect,
+                                   visibleRect.move(-x, -y))
+
+        for widget in self.__widgets:
+            widget.drawOverlay()
 
-        # All different animation types - only check if the container should
-        # be playing an animation
+    def animate(self, frameTime):
+        # Called by the parent every frame while an animation is playing
+        self.__frameTime = frameTime
+
+        # All different animation types
         if self.__animation[0]:
             if self.__animation[0] == 'centre':
                 self.centreAnimation()
@@ -1340,6 +1862,9 @@ class Container(pg.sprite.Sprite):
         self.__maskTopRect.topleft = self.__outlineRect.topleft
         self.__maskBottomRect.bottomleft = self.__outlineRect.bottomleft
 
+        if self.__animation[0] is None:
+            self.__parent.stopAnimating(self)
+
 
 # Will be used for dropdown menus (in cases where there are multiple options
 # to select from)
@@ -1360,11 +1885,12 @@ class Dropdown(pg.sprite.Sprite):
         self.__currentOption = options[0]
 
         if font is None:
-            self.__font = pg.font.SysFont("Helvetica", 30)
-            self.__arrowFont = pg.font.SysFont("Helvetica", 20)
+            self.__font = self.__parent.getFont("Helvetica", 30)
+            self.__arrowFont = self.__parent.getFont("Helvetica", 20)
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
-            self.__arrowFont = pg.font.SysFont(font[0], int(font[1] * 2 / 3))
+            self.__font = self.__parent.getFont(font[0], font[1])
+            self.__arrowFont = self.__parent.getFont(font[0],
+                                                     int(font[1] * 2 / 3))
 
         if bgColour is None:
             self.__bgColour = (255, 255, 255)
@@ -1394,18 +1920,28 @@ class Dropdown(pg.sprite.Sprite):
 
         self.__hoverColour = self.__parent.hoverEffect(self.__bgColour)
 
-        self.__inlineDisplayText = self.__font.render(self.__inlineText, True,
-                                                      self.__textColour)
+        self.__inlineDisplayText = self.__parent.renderText(self.__font,
+                                                            self.__inlineText,
+                                                            True,
+                                                            self.__textColour)
 
         # Scales height based on size of text
         self.__height = self.__inlineDisplayText.get_rect().h * 1.25
 
-        # Using a dict for rendered text objects  - easier to retrieve when
-        # needed than using indices in a list
-        self.__optionDisplays = { }
-        for i in self.__options:
-            self.__optionDisplays[i] = self.__font.render(i, True,
-                                                          self.__textColour)
+        # Options are only rendered when they are shown (see
+        # getOptionDisplay), so a list of thousands of files doesn't all need
+        # rendering up front
+
+        # Typing while the dropdown is expanded filters the options - these
+        # are the options being scrolled through (the first one is the
+        # current option, shown in the top rect)
+        self.__filterText = ""
+        self.__shownOptions = self.__options
+
+        # Lower case options, and the matches for each search, worked out the
+        # first time the options are filtered
+        self.__searchNames = None
+        self.__searches = {}
 
         # Using a list for rects as there only needs to be 6 (current option
         # + 5 others)
@@ -1421,7 +1957,8 @@ class Dropdown(pg.sprite.Sprite):
             center=(x - self.__inlineDisplayText.get_rect().w * 0.6,
                     y + 0.45 * self.__height))
 
-        self.__sideArrow = self.__arrowFont.render(">", True, self.__textColour)
+        self.__sideArrow = self.__parent.renderText(self.__arrowFont, ">",
+                                                    True, self.__textColour)
         self.__downArrow = pg.transform.rotate(self.__sideArrow, -90)
         self.__upArrow = pg.transform.rotate(self.__sideArrow, 90)
 
@@ -1438,6 +1975,11 @@ class Dropdown(pg.sprite.Sprite):
         self.__lower = 1
         self.__upper = 5
 
+        # The dropdown is drawn onto a surface for each state (collapsed, and
+        # expanded with each option hovered over), which are only drawn again
+        # when the options, selection or scroll position change
+        self.__stateSurfaces = {}
+
         index = 0
         inGroup = False
         for i in self.__parent.pgkGroup.sprites():
@@ -1466,17 +2008,15 @@ class Dropdown(pg.sprite.Sprite):
             self.__originalOptions = options.copy()
             self.__currentOption = options[0]
 
-            # Using a dict for rendered text objects  - easier to retrieve when
-            # needed than using indices in a list
-            self.__optionDisplays = { }
-            for i in self.__options:
-                self.__optionDisplays[i] = self.__font.render(i, True,
-                                                              self.__textColour)
+            self.__filterText = ""
+            self.__shownOptions = self.__options
+            self.__searchNames = None
+            self.__searches = {}
 
         if font is None:
             pass
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if bgColour is None:
             pass
@@ -1504,8 +2044,10 @@ class Dropdown(pg.sprite.Sprite):
             self.__container = container
             self.__container.addWidget(self)
 
-        self.__inlineDisplayText = self.__font.render(self.__inlineText, True,
-                                                      self.__textColour)
+        self.__inlineDisplayText = self.__parent.renderText(self.__font,
+                                                            self.__inlineText,
+                                                            True,
+                                                            self.__textColour)
 
         # Scales height based on size of text
         self.__height = self.__inlineDisplayText.get_rect().h * 1.25
@@ -1519,9 +2061,18 @@ class Dropdown(pg.sprite.Sprite):
 
         self.__rect = pg.Rect(x, y, self.__width, self.__height)
 
+        if self.__container is not None:
+            # The inline text was just lined up with the coordinates inside
+            # the container, not where they are on screen
+            self.place()
+
+        self.__stateSurfaces = {}
+        self.__parent.layoutChanged()
+
     def delete(self):
         pg.mouse.set_cursor(*pg.cursors.arrow)
         self.__parent.pgkGroup.remove(self)
+        self.__parent.closePopup(self)
 
         if self.__container:
             self.__container.removeWidget(self)
@@ -1529,58 +2080,17 @@ class Dropdown(pg.sprite.Sprite):
         del self
 
     def draw(self):
-        if self.__container and self.__coords != tuple(
-                self.__container.getCorrectedCoords(self.__coords)):
-            # Correct coordinates relative to container's topleft corner -
-            # only if container has moved since last frame in order to save
-            # performance
-            x, y = self.__container.getCorrectedCoords(self.__coords)
-            mult = 0
-            for rect in self.__rects:
-                rect.x = x
-                rect.y = y + self.__height * mult
-                mult += 1
-
-            inlineTextWidth = self.__inlineDisplayText.get_rect().w
-            self.__inlineTextRect.center = (x - inlineTextWidth * 0.6,
-                                            y + 0.45 * self.__height)
-
-            bottomRight = self.__rects[0].bottomright
-            self.__arrowRect = self.__upArrow.get_rect(bottomright=bottomRight)
-
-        pg.draw.rect(self.__screen, self.__bgColour, self.__rects[0])
-        self.__screen.blit(self.__optionDisplays[self.__currentOption],
-                           self.__rects[0])
-
-        self.__screen.blit(self.__inlineDisplayText, self.__inlineTextRect)
-
-        if self.__expanded:
-            num = 1
-            for i in self.__options[self.__lower:self.__upper]:
-                # Draws the other 5 rects - and displays the text for the 5
-                # shown options on top
-                if self.__rects[num].center == self.__hoverRect.center and \
-                        num != 0:
-                    pg.draw.rect(self.__screen, self.__hoverColour,
-                                 self.__rects[num])
-                else:
-                    pg.draw.rect(self.__screen, self.__bgColour,
-                                 self.__rects[num])
-                self.__screen.blit(self.__optionDisplays[i],
-                                   self.__rects[num])
-                num += 1
-
-            self.__screen.blit(self.__upArrow, self.__arrowRect)
-
-        else:
-            self.__screen.blit(self.__downArrow, self.__arrowRect)
+        surface, pos = self.getImage()
+        self.__screen.blit(surface, pos)
+        self.drawOverlay()
 
+    def drawOverlay(self):
         if self.__hovered:
             pg.mouse.set_visible(False)
             # Draws custom mouse image over mouse location
             self.__pointerRect = self.__parent.pgkPointerCursor.get_rect(
-                top=pg.mouse.get_pos()[1])
-            self.__pointerRect.x = pg.mouse.get_pos()[
+                top=self.__parent.pgkMousePos[1])
+            self.__pointerRect.x = self.__parent.pgkMousePos[
                                        0] - self.__pointerRect.w / 2
             self.__screen.blit(self.__parent.pgkPointerCursor,
                                self.__pointerRect)
@@ -1591,14 +2101,181 @@ class Dropdown(pg.sprite.Sprite):
     def getHeight(self):
         return self.__height
 
+    def getStateSurface(self, state):
+        # Returns the dropdown drawn in the given state, and where it goes
+        # relative to the dropdown's top rect
+        if state not in self.__stateSurfaces:
+            expanded, hoverIndex = state
+            shown = []
+            if expanded == "expanded":
+                shown = self.__shownOptions[self.__lower:self.__upper]
+
+            area = self.__rects[0].union(self.__inlineTextRect).union(
+                self.__arrowRect).unionall(self.__rects[1:len(shown) + 1])
+            surface = pg.Surface(area.size, SRCALPHA)
+
+            def local(rect):
+                return rect.move(-area.x, -area.y)
+
+            pg.draw.rect(surface, self.__bgColour, local(self.__rects[0]))
+            if self.__filterText:
+                # Shows what the user has typed in place of the current option
+                surface.blit(self.__parent.renderText(self.__font,
+                                                      self.__filterText, True,
+                                                      self.__textColour),
+                             local(self.__rects[0]))
+            else:
+                surface.blit(self.getOptionDisplay(self.__currentOption),
+                             local(self.__rects[0]))
+
+            surface.blit(self.__inlineDisplayText, local(self.__inlineTextRect))
+
+            num = 1
+            for i in shown:
+                # Draws the other 5 rects - and displays the text for the 5
+                # shown options on top
+                if num == hoverIndex:
+                    pg.draw.rect(surface, self.__hoverColour,
+                                 local(self.__rects[num]))
+                else:
+                    pg.draw.rect(surface, self.__bgColour,
+                                 local(self.__rects[num]))
+                surface.blit(self.getOptionDisplay(i), local(self.__rects[num]))
+                num += 1
+
+            if shown:
+                surface.blit(self.__upArrow, local(self.__arrowRect))
+            else:
+                surface.blit(self.__downArrow, local(self.__arrowRect))
+
+            self.__stateSurfaces[state] = (surface,
+                                           (area.x - self.__rects[0].x,
+                                            area.y - self.__rects[0].y))
+
+        return self.__stateSurfaces[state]
+
+    def getOptionDisplay(self, option):
+        # Rendered text for an option - the parent keeps the most recently
+        # used ones, so scrolling back and forth doesn't render them again
+        return self.__parent.renderText(self.__font, str(option), True,
+                                        self.__textColour)
+
+    def getHitRect(self):
+        # Once expanded, the options are drawn on top of everything, so
+        # aren't hidden by the container
+        if self.__expanded:
+            return self.__rects[0].unionall(self.__rects[1:])
+
+        return self.__parent.clipToContainer(self.__rects[0], self.__container)
+
+    def getImage(self):
+        # Returns the surface the dropdown currently looks like, and where it
+        # goes on screen
+        if self.__expanded:
+            # The highlighted option is the one last hovered over
+            state = ("expanded", self.__rects.index(self.__hoverRect))
+        else:
+            state = ("collapsed", 0)
+
+        surface, offset = self.getStateSurface(state)
+        return surface, (self.__rects[0].x + offset[0],
+                         self.__rects[0].y + offset[1])
+
+    def isExpanded(self):
+        return self.__expanded
+
+    def place(self):
+        # Correct coordinates relative to container's topleft corner - the
+        # container only calls this when it has moved, to save performance
+        x, y = self.__container.getCorrectedCoords(self.__coords)
+        mult = 0
+        for rect in self.__rects:
+            rect.x = x
+            rect.y = y + self.__height * mult
+            mult += 1
+
+        inlineTextWidth = self.__inlineDisplayText.get_rect().w
+        self.__inlineTextRect.center = (x - inlineTextWidth * 0.6,
+                                        y + 0.45 * self.__height)
+
+        bottomRight = self.__rects[0].bottomright
+        self.__arrowRect = self.__upArrow.get_rect(bottomright=bottomRight)
+
+    def reset(self):
+        # Called when the dropdown's container is hidden - it closes, so it
+        # isn't still expanded when it is shown again
+        self.setExpanded(False)
+        if self.__hovered:
+            pg.mouse.set_visible(True)
+            self.__hovered = False
+
+    def search(self, text):
+        # Returns the options containing text (ignoring case), with the ones
+        # that start with it first
+        if self.__searchNames is None:
+            self.__searchNames = [str(i).lower() for i in
+                                  self.__originalOptions]
+        text = text.lower()
+
+        # The matches for everything typed so far are kept, so typing another
+        # letter only needs to check the options that matched before it, and
+        # backspace doesn't need to search at all
+        if text not in self.__searches:
+            if text[:-1] in self.__searches:
+                candidates = self.__searches[text[:-1]]
+            else:
+                candidates = range(len(self.__searchNames))
+            self.__searches[text] = [i for i in candidates
+                                     if text in self.__searchNames[i]]
+
+        matches = self.__searches[text]
+        starts = [self.__originalOptions[i] for i in matches
+                  if self.__searchNames[i].startswith(text)]
+        contains = [self.__originalOptions[i] for i in matches
+                    if not self.__searchNames[i].startswith(text)]
+        return starts + contains
+
+    def setFilter(self, text):
+        # Only the options containing the text are listed while the dropdown
+        # is expanded
+        if text == self.__filterText:
+            return
+
+        self.__filterText = text
+        if text:
+            # The selected option is always shown first, so it's left out of
+            # the matches
+            self.__shownOptions = [self.__currentOption] + \
+                [i for i in self.search(text) if i != self.__currentOption]
+        else:
+            self.__shownOptions = self.__options
+            self.__searches = {}
+
+        self.__lower = 1
+        self.__upper = 5
+        self.__stateSurfaces = {}
+
+    def setExpanded(self, expanded):
+        if expanded != self.__expanded:
+            self.__expanded = expanded
+            if expanded:
+                self.__parent.openPopup(self)
+                # Typing filters the options while expanded
+                self.__parent.focus(self)
+            else:
+                self.__parent.closePopup(self)
+                self.__parent.unfocus(self)
+                self.setFilter("")
+
     def setSelected(self, selected):
         self.__currentOption = selected
+        self.__stateSurfaces = {}
 
     def handleEvent(self, event):
         if event.type == MOUSEBUTTONUP:
             if event.button == 1:
                 if self.__hovered and not self.__expanded:
-                    self.__expanded = True
+                    self.setExpanded(True)
                     return True
                 elif self.__hovered and self.__expanded:
                     # If user clicks on an option, then current option will
@@ -1606,12 +2283,12 @@ class Dropdown(pg.sprite.Sprite):
                     # rect that the user has clicked on
                     index = self.__rects.index(self.__hoverRect)
                     if index == 0:
-                        self.__expanded = False
+                        self.setExpanded(False)
                         return True
 
                     try:
-                        self.__currentOption = self.__options[self.__lower +
-                                                              index - 1]
+                        self.__currentOption = self.__shownOptions[
+                            self.__lower + index - 1]
                     except IndexError:
                         # If an index error is thrown, then there aren't
                         # enough options in the dropdown menu to reach the
@@ -1626,10 +2303,12 @@ class Dropdown(pg.sprite.Sprite):
                     self.__options = self.__originalOptions.copy()
                     self.__options.remove(self.__currentOption)
                     self.__options.insert(0, self.__currentOption)
-                    self.__expanded = False
+                    self.__shownOptions = self.__options
+                    self.__stateSurfaces = {}
+                    self.setExpanded(False)
                     return True
                 elif not self.__hovered:
-                    self.__expanded = False
+                    self.setExpanded(False)
 
         elif event.type == MOUSEBUTTONDOWN:
             if self.__expanded:
@@ -1638,34 +2317,49 @@ class Dropdown(pg.sprite.Sprite):
                     if self.__lower > 1:
                         self.__upper -= 1
                         self.__lower -= 1
+                        self.__stateSurfaces = {}
                     return True
                 elif event.button == 5:
                     # Scroll wheel down
-                    if self.__upper < len(self.__options):
+                    if self.__upper < len(self.__shownOptions):
                         self.__upper += 1
                         self.__lower += 1
+                        self.__stateSurfaces = {}
                     return True
 
+        elif event.type == KEYDOWN and self.__expanded:
+            # Only keys that change the filter are handled - anything else
+            # (escape, arrow keys...) is left for the program
+            if event.key == K_BACKSPACE:
+                if self.__filterText:
+                    self.setFilter(self.__filterText[:-1])
+                    return True
+            elif event.unicode and event.unicode.isprintable():
+                self.setFilter(self.__filterText + event.unicode)
+                return True
+            return False
+
     def update(self):
-        if self.__rects[0].collidepoint(pg.mouse.get_pos()) and not \
-                self.__hovered:
-            # Can only be hovered over if dropdown is not obstructed by
-            # container mask
-            if (self.__container and not self.__container.mouseMasked()) or \
-                    not self.__container:
-                self.__hovered = True
+        # Can only be hovered over if dropdown is not obstructed by container
+        # mask - the hit index leaves out the parts that are
+        underMouse = self.__parent.isUnderMouse(self)
 
         if self.__expanded:
             self.__hovered = False
-            for rect in self.__rects:
-                if rect.collidepoint(pg.mouse.get_pos()):
-                    self.__hovered = True
-                    self.__hoverRect = rect
+            if underMouse:
+                # Only need to find which option is hovered over if the mouse
+                # is somewhere on the dropdown
+                for rect in self.__rects:
+                    if rect.collidepoint(self.__parent.pgkMousePos):
+                        self.__hovered = True
+                        self.__hoverRect = rect
             if not self.__hovered:
                 pg.mouse.set_visible(True)
 
-        elif not self.__rects[0].collidepoint(pg.mouse.get_pos()) and \
-                self.__hovered and not self.__expanded:
+        elif underMouse and not self.__hovered:
+            self.__hovered = True
+
+        elif not underMouse and self.__hovered:
             # Sets mouse cursor back to default
             pg.mouse.set_visible(True)
             self.__hovered = False
@@ -1692,7 +2386,7 @@ class InputBox(pg.sprite.Sprite):
         self.__backspaceTimer = 1
         self.__backspaceFirstPress = False
         self.__backspaceDelay = 0.05
-        self.__previousFrame = time.time()
+        self.__previousFrame = self.__parent.pgkFrameTime
         self.__hovered = False
         self.__active = False
         self.__caps = False
@@ -1706,9 +2400,9 @@ class InputBox(pg.sprite.Sprite):
             raise Exception("InputBox coordinates must be integers")
 
         if not font:
-            self.__font = pg.font.SysFont("Helvetica", 30)
+            self.__font = self.__parent.getFont("Helvetica", 30)
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if not bgColour:
             self.__bgColour = (255, 255, 255)
@@ -1762,8 +2456,10 @@ class InputBox(pg.sprite.Sprite):
         else:
             self.__outputText = defaultEntry
 
-        self.__inlineDisplayText = self.__font.render(self.__inlineText, True,
-                                                      self.__textColour)
+        self.__inlineDisplayText = self.__parent.renderText(self.__font,
+                                                            self.__inlineText,
+                                                            True,
+                                                            self.__textColour)
 
         # Scales height based on size of text
         self.__height = self.__inlineDisplayText.get_rect().h * 1.25
@@ -1777,12 +2473,12 @@ class InputBox(pg.sprite.Sprite):
 
         self.__rect = pg.Rect(x, y, self.__width, self.__height)
 
-        if self.__parent.isLight(self.__bgColour):
-            self.__outputTextDisplay = self.__font.render(self.__outputText,
-                                                          True, (0, 0, 0))
-        else:
-            self.__outputTextDisplay = self.__font.render(self.__outputText,
-                                                          True, (255, 255, 255))
+        # The input box is drawn onto a surface once each with and without
+        # the flashing cursor, and only drawn again when the text changes
+        self.__stateSurfaces = {}
+
+        # Text that the state surfaces were last drawn with
+        self.__renderedText = self.__outputText
 
         if container is None:
             self.__container = None
@@ -1820,7 +2516,7 @@ class InputBox(pg.sprite.Sprite):
         if not font:
             pass
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if not bgColour:
             pass
@@ -1864,15 +2560,24 @@ class InputBox(pg.sprite.Sprite):
         else:
             self.__charLimit = charLimit
 
-        self.__inlineDisplayText = self.__font.render(self.__inlineText, True,
-                                                      self.__textColour)
+        self.__inlineDisplayText = self.__parent.renderText(self.__font,
+                                                            self.__inlineText,
+                                                            True,
+                                                            self.__textColour)
         self.__inlineTextRect = self.__inlineDisplayText.get_rect(
             center=(self.__rect.x - self.__inlineDisplayText.get_rect().w * 0.6,
                     self.__rect.y + 0.45 * self.__height))
 
+        # Font or colours may have changed, so output needs re-rendering
+        self.__stateSurfaces = {}
+
+        self.__parent.layoutChanged()
+
     def delete(self):
         pg.mouse.set_cursor(*pg.cursors.arrow)
         self.__parent.pgkGroup.remove(self)
+        self.__parent.unfocus(self)
+        self.__parent.layoutChanged()
 
         if self.__container:
             self.__container.removeWidget(self)
@@ -1880,27 +2585,18 @@ class InputBox(pg.sprite.Sprite):
         del self
 
     def draw(self):
-        if self.__container:
-            x, y = self.__container.getCorrectedCoords(self.__coords)
-            # Aligns text with the checkbox
-            self.__inlineTextRect = self.__inlineDisplayText.get_rect(
-                center=(x - self.__inlineDisplayText.get_rect().w * 0.6,
-                        y + 0.45 * self.__height))
-
-            self.__rect = pg.Rect(x, y, self.__width, self.__height)
-
-        pg.draw.rect(self.__screen, self.__bgColour, self.__rect)
+        surface, pos = self.getImage()
+        self.__screen.blit(surface, pos)
+        self.drawOverlay()
 
+    def drawOverlay(self):
         if self.__hovered:
             pg.mouse.set_visible(False)
             # Draws typing cursor on location of the mouse pointer
             typingRect = self.__parent.pgkTypingCursor.get_rect(
-                center=pg.mouse.get_pos())
+                center=self.__parent.pgkMousePos)
             self.__screen.blit(self.__parent.pgkTypingCursor, typingRect)
 
-        self.__screen.blit(self.__outputTextDisplay, self.__rect)
-        self.__screen.blit(self.__inlineDisplayText, self.__inlineTextRect)
-
     def get(self):
         try:
             if self.__outputText[-1] == "|":
@@ -1913,12 +2609,87 @@ class InputBox(pg.sprite.Sprite):
     def getHeight(self):
         return self.__height
 
+    def getHitRect(self):
+        return self.__parent.clipToContainer(self.__rect, self.__container)
+
+    def getImage(self):
+        # Returns the surface the input box currently looks like, and where it
+        # goes on screen
+
+        # The state surfaces only need drawing again if the text has changed
+        # (typing or backspace) since they were drawn - the flashing cursor
+        # just swaps between them
+        if self.__outputText != self.__renderedText:
+            self.__stateSurfaces = {}
+            self.__renderedText = self.__outputText
+
+        if self.__cursorText == "|":
+            surface, offset = self.getStateSurface("active")
+        else:
+            surface, offset = self.getStateSurface("normal")
+
+        return surface, (self.__rect.x + offset[0], self.__rect.y + offset[1])
+
     def getWidth(self):
         return self.__width
 
     def getPos(self):
         return (self.__rect.x, self.__rect.y)
 
+    def place(self):
+        # Moves the input box along with its container
+        x, y = self.__container.getCorrectedCoords(self.__coords)
+
+        # Aligns text with the input box
+        self.__inlineTextRect = self.__inlineDisplayText.get_rect(
+            center=(x - self.__inlineDisplayText.get_rect().w * 0.6,
+                    y + 0.45 * self.__height))
+
+        self.__rect = pg.Rect(x, y, self.__width, self.__height)
+
+    def reset(self):
+        # Called when the input box's container is hidden - it stops being
+        # typed in, so it isn't still active when it is shown again
+        if self.__hovered:
+            pg.mouse.set_visible(True)
+            self.__hovered = False
+
+        self.__active = False
+        self.__cursorText = ""
+        self.__parent.unfocus(self)
+
+    def getStateSurface(self, state):
+        # Returns the input box and its text drawn in the given state (active
+        # means the flashing cursor is showing), and where it goes relative
+        # to the input box's rect
+        if state not in self.__stateSurfaces:
+            if state == "active":
+                displayText = self.__outputText + "|"
+            else:
+                displayText = self.__outputText
+
+            if self.__parent.isLight(self.__bgColour):
+                outputTextDisplay = self.__parent.renderText(
+                    self.__font, displayText, True, (0, 0, 0))
+            else:
+                outputTextDisplay = self.__parent.renderText(
+                    self.__font, displayText, True, (255, 255, 255))
+
+            textRect = outputTextDisplay.get_rect(topleft=self.__rect.topleft)
+            area = self.__rect.union(self.__inlineTextRect).union(textRect)
+            surface = pg.Surface(area.size, SRCALPHA)
+
+            pg.draw.rect(surface, self.__bgColour,
+                         self.__rect.move(-area.x, -area.y))
+            surface.blit(outputTextDisplay, textRect.move(-area.x, -area.y))
+            surface.blit(self.__inlineDisplayText,
+                         self.__inlineTextRect.move(-area.x, -area.y))
+
+            self.__stateSurfaces[state] = (surface, (area.x - self.__rect.x,
+                                                     area.y - self.__rect.y))
+
+        return self.__stateSurfaces[state]
+
     def write(self, text):
         self.__outputText = text
 
@@ -1927,7 +2698,7 @@ class InputBox(pg.sprite.Sprite):
             # Backspace needs to be placed in the update loop as it uses an
             # updated method, which allows the user to hold it down to
             # delete long sections of text.
-            keyPressed = pg.key.get_pressed()  # Dict of pressed keys
+            keyPressed = self.__parent.pgkKeysPressed  # Dict of pressed keys
             if keyPressed[K_BACKSPACE] and self.__backspaceTimer >= \
                     self.__backspaceDelay:
                 try:
@@ -1960,36 +2731,24 @@ class InputBox(pg.sprite.Sprite):
         elif self.__timer > 1 and self.__cursorText != "|":
             self.__timer = 0
 
-        # OutputTextDisplay needs to be rendered on every update due to the
-        # fact that output can change
-        if self.__parent.isLight(self.__bgColour):
-            self.__outputTextDisplay = self.__font.render(self.__outputText +
-                                                          self.__cursorText,
-                                                          True, (0, 0, 0))
-        else:
-            self.__outputTextDisplay = self.__font.render(self.__outputText +
-                                                          self.__cursorText,
-                                                          True, (255, 255, 255))
-
-        if self.__rect.collidepoint(pg.mouse.get_pos()) and not self.__hovered:
-            # Can only be hovered over if checkbox is not obstructed by
-            # container mask
-            if (self.__container and not self.__container.mouseMasked()) or \
-                    not self.__container:
-                pg.mouse.set_visible(False)
-                self.__hovered = True
-
-        elif not self.__rect.collidepoint(
-                pg.mouse.get_pos()) and self.__hovered:
+        # Can only be hovered over if input box is not obstructed by
+        # container mask - the hit index leaves out the parts that are
+        underMouse = self.__parent.isUnderMouse(self)
+        if underMouse and not self.__hovered:
+            pg.mouse.set_visible(False)
+            self.__hovered = True
+
+        elif not underMouse and self.__hovered:
             pg.mouse.set_visible(True)
             self.__hovered = False
 
         if not self.__container:
             self.draw()
 
-        self.__timer += time.time() - self.__previousFrame
-        self.__backspaceTimer += time.time() - self.__previousFrame
-        self.__previousFrame = time.time()
+        frameTime = self.__parent.pgkFrameTime - self.__previousFrame
+        self.__timer += frameTime
+        self.__backspaceTimer += frameTime
+        self.__previousFrame = self.__parent.pgkFrameTime
 
     # noinspection SpellCheckingInspection
     def handleEvent(self, event):
@@ -1998,12 +2757,15 @@ class InputBox(pg.sprite.Sprite):
                 if self.__hovered and not self.__active and self.__canUse:
                     self.__active = True
                     self.__timer = 0
+                    # Keyboard events are now sent to this input box
+                    self.__parent.focus(self)
                     return True
                 elif not self.__hovered and self.__active:
                     # Sets cursorText to an empty string - shows that box is
                     # not active
                     self.__cursorText = ""
                     self.__active = False
+                    self.__parent.unfocus(self)
 
         # Will only check keydown events if checkbox is active
         if self.__active:
@@ -2057,9 +2819,9 @@ class Label(pg.sprite.Sprite):
         self.__screen = screen
 
         if not font:
-            self.__font = pg.font.SysFont("Helvetica", 30)
+            self.__font = self.__parent.getFont("Helvetica", 30)
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if not bgColour:
             self.__bgColour = None
@@ -2081,8 +2843,8 @@ class Label(pg.sprite.Sprite):
         # Create list of rendered text surface objects
         self.__displayText = []
         for text in self.__text:
-            self.__displayText.append(self.__font.render(text, True,
-                                                         self.__textColour))
+            self.__displayText.append(self.__parent.renderText(
+                self.__font, text, True, self.__textColour))
 
         if not width:
             self.__width = self.__displayText[0].get_rect().w * 1.25
@@ -2125,6 +2887,9 @@ class Label(pg.sprite.Sprite):
 
         self.__coords = self.__rect.topleft
 
+        # The label is drawn onto a surface when it is first needed
+        self.__surface = None
+
         if container is None:
             self.__container = None
         else:
@@ -2155,7 +2920,7 @@ class Label(pg.sprite.Sprite):
         if not font:
             pass
         else:
-            self.__font = pg.font.SysFont(font[0], font[1])
+            self.__font = self.__parent.getFont(font[0], font[1])
 
         if not bgColour:
             pass
@@ -2174,8 +2939,8 @@ class Label(pg.sprite.Sprite):
 
         self.__displayText = []
         for text in self.__text:
-            self.__displayText.append(self.__font.render(text, True,
-                                                         self.__textColour))
+            self.__displayText.append(self.__parent.renderText(
+                self.__font, text, True, self.__textColour))
 
         if not width:
             pass
@@ -2201,6 +2966,8 @@ class Label(pg.sprite.Sprite):
                                                     textGap * num)))
             num += 1
 
+        self.__surface = None
+
     def delete(self):
         pg.mouse.set_cursor(*pg.cursors.arrow)
         self.__parent.pgkGroup.remove(self)
@@ -2211,29 +2978,55 @@ class Label(pg.sprite.Sprite):
         del self
 
     def draw(self):
-        if self.__container:
-            x, y = self.__container.getCorrectedCoords(self.__coords)
-
-            # Aligns text with the container
-            self.__rect = pg.Rect(x, y, self.__width, self.__height)
-            self.__textRects = []
-            textGap = int(self.__displayText[0].get_rect().h * 1.25)
-            num = 0
-
-            for i in self.__displayText:
-                self.__textRects.append(i.get_rect(centerx=(self.__rect.left +
-                                                            self.__width / 2),
-                                                   top=(self.__rect.top +
-                                                        textGap * num)))
-                num += 1
+        surface, pos = self.getImage()
+        self.__screen.blit(surface, pos)
+
+    def drawOverlay(self):
+        pass
 
-        if self.__bgColour is not None:
-            pg.draw.rect(self.__screen, self.__bgColour, self.__rect)
+    def getImage(self):
+        # Returns the label drawn onto a surface, and where it goes on screen.
+        # The surface is kept until config is used
+        if self.__surface is None:
+            area = self.__rect.unionall(self.__textRects)
+            surface = pg.Surface(area.size, SRCALPHA)
 
-        index = 0
-        for i in self.__textRects:
-            self.__screen.blit(self.__displayText[index], i)
-            index += 1
+            if self.__bgColour is not None:
+                pg.draw.rect(surface, self.__bgColour,
+                             self.__rect.move(-area.x, -area.y))
+
+            index = 0
+            for i in self.__textRects:
+                surface.blit(self.__displayText[index],
+                             i.move(-area.x, -area.y))
+                index += 1
+
+            self.__surface = (surface, (area.x - self.__rect.x,
+                                        area.y - self.__rect.y))
+
+        surface, offset = self.__surface
+        return surface, (self.__rect.x + offset[0], self.__rect.y + offset[1])
+
+    def place(self):
+        x, y = self.__container.getCorrectedCoords(self.__coords)
+
+        # Aligns text with the container
+        self.__rect = pg.Rect(x, y, self.__width, self.__height)
+        self.__textRects = []
+        textGap = int(self.__displayText[0].get_rect().h * 1.25)
+        num = 0
+
+        for i in self.__displayText:
+            self.__textRects.append(i.get_rect(centerx=(self.__rect.left +
+                                                        self.__width / 2),
+                                               top=(self.__rect.top +
+                                                    textGap * num)))
+            num += 1
+
+    def reset(self):
+        # Labels can't be interacted with, so there is nothing to reset when
+        # their container is hidden
+        pass
 
     def update(self):
         pass
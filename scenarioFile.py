@@ -0,0 +1,414 @@
+"""Reading and writing saved scenarios.
+
+Scenarios used to be saved as text, with one python list per particle, which
+had to be evaluated line by line when loading - fine for a few hundred
+particles, but far too slow for big scenarios. They are now saved in a binary
+format instead:
+
+    header      "PSCN", format version, scale, number of particles and number
+                of materials
+    materials   the name of every material used, each one stored once
+    columns     one packed array per particle attribute (see COLUMNS), each
+                padded to 8 bytes
+
+Every particle attribute is one array, so a file can be memory mapped and each
+column read straight out of it without being parsed at all. ScenarioReader
+reads a scenario on a background thread, a chunk of particles at a time, so
+the program can keep running while a big one loads. Old text scenarios can
+still be loaded, and can be converted to the binary format with
+
+    python scenarioFile.py "Saved Scenarios/Random Velocities.txt"
+
+"""
+import ast
+import mmap
+import struct
+import sys
+import argparse
+import queue
+import signal
+import threading
+import multiprocessing
+from array import array
+from pathlib import Path
+
+MAGIC = b"PSCN"
+VERSION = 1
+SCENARIO_EXTENSION = ".scn"
+
+# Magic, version, scale, number of particles, number of materials
+HEADER = struct.Struct("<4sHdII")
+NAME_LENGTH = struct.Struct("<H")
+
+# Every column in the file, in order, with the array typecode it is stored
+# as. Positions are in pixels on screen when the scenario was saved, the same
+# as in the text format.
+COLUMNS = [("randomVelocity", "B"), ("line", "B"), ("coefficient", "d"),
+           ("material", "I"), ("radius", "d"), ("density", "d"),
+           ("mass", "d"), ("vol", "d"), ("vx", "d"), ("vy", "d"),
+           ("red", "B"), ("green", "B"), ("blue", "B"), ("x", "i"),
+           ("y", "i"), ("ax", "d"), ("ay", "d")]
+MATERIAL_COLUMN = 3
+
+# Text scenarios with at least this many particles are parsed by a pool of
+# worker processes - any fewer, and starting the pool would take longer than
+# just parsing them
+POOL_LINES = 20000
+
+
+def padding(size):
+    # Bytes needed to get size up to the next multiple of 8, so that every
+    # column starts on an 8 byte boundary
+    return -size % 8
+
+
+class Scenario(object):
+    # A scenario's scale, its material names, and a column of values for
+    # each attribute of its particles. Columns are arrays when the scenario
+    # is being built, or views of the file when it has been memory mapped.
+    def __init__(self, scale, materials=None, columns=None, file=None,
+                 fileMap=None):
+        self.scale = scale
+        if materials is None:
+            self.materials = []
+        else:
+            self.materials = materials
+
+        if columns is None:
+            self.columns = {name: array(code) for name, code in COLUMNS}
+        else:
+            self.columns = columns
+
+        self.__materialIds = {name: i for i, name in
+                              enumerate(self.materials)}
+        # The open file and its memory map, if the columns are read from one
+        self.__file = file
+        self.__map = fileMap
+
+    def __len__(self):
+        return len(self.columns["coefficient"])
+
+    def append(self, *values):
+        # Takes the same values, in the same order, as a line of a text
+        # scenario, so old files can be converted by passing each line in
+        self.appendRow(textRow(values))
+
+    def appendRow(self, row):
+        # row is in the order of COLUMNS, with the material's name instead of
+        # its id
+        material = row[MATERIAL_COLUMN]
+        if material not in self.__materialIds:
+            self.__materialIds[material] = len(self.materials)
+            self.materials.append(material)
+
+        for (name, code), value in zip(COLUMNS, row):
+            if name == "material":
+                value = self.__materialIds[material]
+            self.columns[name].append(value)
+
+    def rows(self, start=0, stop=None):
+        # The values of the particles from start up to stop, in the order of
+        # COLUMNS, with material names instead of ids
+        if stop is None:
+            stop = len(self)
+
+        columns = [self.columns[name][start:stop].tolist()
+                   for name, code in COLUMNS]
+        columns[MATERIAL_COLUMN] = [self.materials[i] for i in
+                                    columns[MATERIAL_COLUMN]]
+        return list(zip(*columns))
+
+    def close(self):
+        # Lets go of the memory mapped file, if there is one. The columns
+        # can't be used after this.
+        if self.__map is not None:
+            for column in self.columns.values():
+                column.release()
+            self.columns = {}
+            self.__map.close()
+            self.__file.close()
+            self.__map = None
+            self.__file = None
+
+
+class ScenarioReader(threading.Thread):
+    """Reads a scenario on a background thread, and hands its particles over
+    a chunk at a time (as lists of rows, like Scenario.rows), so that whatever
+    is adding them can keep drawing frames in between. Binary scenarios are
+    read straight out of the memory mapped file, a chunk at a time, as there
+    is nothing to parse. Every line of a text scenario has to be evaluated,
+    so the chunks of big ones are parsed in parallel by a pool of worker
+    processes.
+
+    """
+    def __init__(self, path, chunkSize=250, workers=None):
+        super().__init__(daemon=True)
+        self.__path = path
+        self.__chunkSize = chunkSize
+        self.__workers = workers
+
+        self.__chunks = queue.Queue()
+        self.__cancelled = threading.Event()
+        self.__finished = threading.Event()
+
+        # Known once the start of the file has been read
+        self.__scale = None
+        self.__total = None
+
+        # Any exception is kept, rather than lost with the thread, so that
+        # it can be shown by whatever is waiting for the particles
+        self.__error = None
+
+    def cancel(self):
+        # Stops reading as soon as the current chunk is done
+        self.__cancelled.set()
+
+    def getError(self):
+        return self.__error
+
+    def getScale(self):
+        return self.__scale
+
+    def getTotal(self):
+        return self.__total
+
+    def isCancelled(self):
+        return self.__cancelled.is_set()
+
+    def isFinished(self):
+        # True once every chunk has been read and taken
+        return self.__finished.is_set() and self.__chunks.empty()
+
+    def takeChunk(self):
+        # The next chunk of rows, or None if there isn't one ready yet
+        try:
+            return self.__chunks.get_nowait()
+        except queue.Empty:
+            return None
+
+    def run(self):
+        try:
+            if isBinaryScenario(self.__path):
+                self.readBinary()
+            else:
+                self.readText()
+        except Exception as e:
+            self.__error = e
+        finally:
+            self.__finished.set()
+
+    def readBinary(self):
+        scenario = readBinaryScenario(self.__path)
+        try:
+            self.__total = len(scenario)
+            self.__scale = scenario.scale
+            for start in range(0, len(scenario), self.__chunkSize):
+                if self.__cancelled.is_set():
+                    return
+                self.__chunks.put(scenario.rows(start,
+                                                start + self.__chunkSize))
+        finally:
+            scenario.close()
+
+    def readText(self):
+        scale, lines = readTextLines(self.__path)
+
+        chunks = [lines[i:i + self.__chunkSize]
+                  for i in range(0, len(lines), self.__chunkSize)]
+        self.__total = len(lines)
+        self.__scale = scale
+
+        if self.__total < POOL_LINES:
+            for chunk in chunks:
+                if self.__cancelled.is_set():
+                    return
+                self.__chunks.put(parseTextLines(chunk))
+            return
+
+        pool = multiprocessing.Pool(self.__workers, initializer=startWorker)
+        try:
+            # imap hands the chunks back in order, as soon as each one is
+            # ready
+            for rows in pool.imap(parseTextLines, chunks):
+                if self.__cancelled.is_set():
+                    return
+                self.__chunks.put(rows)
+        finally:
+            pool.terminate()
+
+
+def textRow(values):
+    # Turns the list from a line of a text scenario into a row, in the order
+    # of COLUMNS
+    randomVelocity, line, coefficient, material, radius, density, mass, \
+        vol, velocity, colour, pos, acceleration = values
+    return (int(bool(randomVelocity)), int(bool(line)), coefficient,
+            material, radius, density, mass, vol, velocity[0], velocity[1],
+            int(colour[0]), int(colour[1]), int(colour[2]), int(pos[0]),
+            int(pos[1]), acceleration[0], acceleration[1])
+
+
+def startWorker():
+    # The workers are forked from a program that has started pygame, and SDL
+    # catches SIGTERM to turn it into a quit event - which would stop the pool
+    # from ever being terminated if the load is cancelled
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def parseTextLines(lines):
+    # Runs in one of ScenarioReader's worker processes for big scenarios.
+    # ast.literal_eval evaluates each line as a python expression - in this
+    # case a list of the particle's values.
+    return [textRow(ast.literal_eval(line.rstrip("\n"))) for line in lines]
+
+
+def isBinaryScenario(path):
+    with open(str(path), "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def readScenario(path):
+    # Loads either kind of scenario, going by what's at the start of the file
+    if isBinaryScenario(path):
+        return readBinaryScenario(path)
+    else:
+        return readTextScenario(path)
+
+
+def readTextLines(path):
+    # The first line of a text scenario is the scale, and each line after
+    # that is a particle. Returns the scale, and the particles' lines.
+    with open(str(path), "r") as f:
+        lines = [line for line in f if line.strip()]
+
+    try:
+        scale = ast.literal_eval(lines[0].strip()) if lines else None
+    except (ValueError, SyntaxError):
+        scale = None
+    if isinstance(scale, bool) or not isinstance(scale, (int, float)):
+        raise ValueError("{0} is not a scenario file".format(path))
+
+    return scale, lines[1:]
+
+
+def readTextScenario(path):
+    scale, lines = readTextLines(path)
+    scenario = Scenario(scale)
+    for row in parseTextLines(lines):
+        scenario.appendRow(row)
+
+    return scenario
+
+
+def readBinaryScenario(path):
+    file = open(str(path), "rb")
+    try:
+        fileMap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files can't be mapped
+        file.close()
+        raise ValueError("{0} is not a scenario file".format(path))
+
+    data = memoryview(fileMap)
+    columns = {}
+    try:
+        magic, version, scale, count, materialCount = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("{0} is not a scenario file".format(path))
+        if version > VERSION:
+            raise ValueError("{0} was saved by a newer version (format {1})"
+                             .format(path, version))
+
+        offset = HEADER.size
+        materials = []
+        for i in range(materialCount):
+            length = NAME_LENGTH.unpack_from(data, offset)[0]
+            offset += NAME_LENGTH.size
+            materials.append(bytes(data[offset:offset + length])
+                             .decode("utf-8"))
+            offset += length
+        offset += padding(offset)
+
+        for name, code in COLUMNS:
+            size = array(code).itemsize * count
+            if offset + size > len(data):
+                raise ValueError("{0} is cut short".format(path))
+
+            if sys.byteorder == "little":
+                # No copying - the column is read straight from the file
+                columns[name] = data[offset:offset + size].cast(code)
+            else:
+                column = array(code, bytes(data[offset:offset + size]))
+                column.byteswap()
+                columns[name] = memoryview(column)
+
+            offset += size + padding(size)
+    except (ValueError, struct.error):
+        for column in columns.values():
+            column.release()
+        data.release()
+        fileMap.close()
+        file.close()
+        raise
+
+    data.release()
+    return Scenario(scale, materials, columns, file, fileMap)
+
+
+def writeScenario(path, scenario):
+    # Writes to a temporary file first, so an existing scenario isn't lost if
+    # saving fails part way through
+    path = Path(path)
+    tempPath = path.with_name(path.name + ".part")
+    with open(str(tempPath), "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, scenario.scale, len(scenario),
+                            len(scenario.materials)))
+        size = HEADER.size
+        for name in scenario.materials:
+            encoded = name.encode("utf-8")
+            f.write(NAME_LENGTH.pack(len(encoded)))
+            f.write(encoded)
+            size += NAME_LENGTH.size + len(encoded)
+        f.write(bytes(padding(size)))
+
+        for name, code in COLUMNS:
+            column = array(code, scenario.columns[name])
+            if sys.byteorder != "little":
+                column.byteswap()
+            column.tofile(f)
+            f.write(bytes(padding(column.itemsize * len(column))))
+
+    tempPath.replace(path)
+
+
+def convertScenario(path, newPath=None):
+    # Saves a text scenario in the binary format, next to the original
+    # (which is left alone). Returns where it was saved.
+    path = Path(path)
+    if newPath is None:
+        newPath = path.with_suffix(SCENARIO_EXTENSION)
+
+    scenario = readScenario(path)
+    try:
+        writeScenario(newPath, scenario)
+    finally:
+        scenario.close()
+
+    return newPath
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converts text scenarios to the binary format")
+    parser.add_argument("scenarios", nargs="+", metavar="SCENARIO",
+                        help="text scenario to convert")
+    options = parser.parse_args()
+
+    for scenario in options.scenarios:
+        newPath = convertScenario(scenario)
+        print("{0} -> {1}".format(scenario, newPath))
+
+
+if __name__ == "__main__":
+    main()
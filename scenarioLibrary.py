@@ -0,0 +1,413 @@
+"""An index of the saved scenarios, so that the load menu doesn't have to open
+every file to show what's in it.
+
+For each scenario it keeps the particle count, the materials used, the scale
+and a small pre-rendered thumbnail (compressed, as it's mostly empty
+background). These are cached in an index file in the scenarios folder, along
+with the modification time and size of the scenario they were read from, so
+only scenarios that have been added or changed since the last time are read
+again. They're read by a ScenarioIndexer on a background thread, so the load
+menu keeps running while a big scenario is read, and the scenario is listed by
+name until it's done. Scenarios saved by the program are added to the index
+straight from memory, without reading them back at all.
+
+It also keeps track of which "Custom Scenario N" numbers have been taken, so
+the next free one can be found without listing the folder.
+
+"""
+import os
+import json
+import zlib
+import queue
+import base64
+import threading
+from pathlib import Path
+
+import scenarioFile
+
+INDEX_NAME = ".library.json"
+INDEX_VERSION = 2
+
+# Scenarios with either of these extensions can be loaded
+SCENARIO_EXTENSIONS = [scenarioFile.SCENARIO_EXTENSION, ".txt"]
+
+# Thumbnails are RGBA, with a transparent background
+THUMBNAIL_SIZE = (128, 72)
+
+# Any more particles than this are skipped evenly when drawing a thumbnail -
+# they are only a few pixels across, so it doesn't look any different
+THUMBNAIL_PARTICLES = 20000
+
+CUSTOM_PREFIX = "custom scenario"
+
+SORT_ORDERS = ["name", "newest", "particles"]
+
+
+def customNumber(fileName):
+    # The N in "Custom Scenario N", or None for any other name
+    name, extension = os.path.splitext(fileName)
+    if extension in SCENARIO_EXTENSIONS and \
+            name.lower().startswith(CUSTOM_PREFIX):
+        try:
+            return int(name[len(CUSTOM_PREFIX):])
+        except ValueError:
+            pass
+
+    return None
+
+
+def renderThumbnail(scenario):
+    # Draws each particle as a square of its colour, with the particles
+    # fitted to the thumbnail. Returns the pixels as bytes.
+    width, height = THUMBNAIL_SIZE
+    pixels = bytearray(width * height * 4)
+    count = len(scenario)
+    if count == 0:
+        return bytes(pixels)
+
+    step = max(1, count // THUMBNAIL_PARTICLES)
+    columns = [scenario.columns[name][::step].tolist() for name in
+               ["x", "y", "radius", "red", "green", "blue"]]
+    scale = scenario.scale
+
+    # The area the particles take up, in pixels on screen when they were saved
+    left = min(x - r * scale for x, r in zip(columns[0], columns[2]))
+    right = max(x + r * scale for x, r in zip(columns[0], columns[2]))
+    top = min(y - r * scale for y, r in zip(columns[1], columns[2]))
+    bottom = max(y + r * scale for y, r in zip(columns[1], columns[2]))
+    # Leaves a gap of a couple of pixels around the edge
+    factor = min((width - 4) / max(right - left, 1),
+                 (height - 4) / max(bottom - top, 1))
+
+    # Centres the particles in the thumbnail
+    xOffset = (width - (right - left) * factor) / 2 - left * factor
+    yOffset = (height - (bottom - top) * factor) / 2 - top * factor
+
+    for x, y, radius, red, green, blue in zip(*columns):
+        size = max(1, int(radius * scale * factor * 2))
+        x = int(x * factor + xOffset - size / 2)
+        y = int(y * factor + yOffset - size / 2)
+        xStart, xEnd = max(0, x), min(width, x + size)
+        if xStart >= xEnd:
+            continue
+
+        row = bytes((red, green, blue, 255)) * (xEnd - xStart)
+        for rowY in range(max(0, y), min(height, y + size)):
+            start = (rowY * width + xStart) * 4
+            pixels[start:start + len(row)] = row
+
+    return bytes(pixels)
+
+
+class ScenarioInfo(object):
+    # What the index knows about one saved scenario
+    def __init__(self, name, modified, size, count, materials, scale,
+                 thumbnail):
+        self.name = name
+        self.modified = modified
+        self.size = size
+        self.count = count
+        self.materials = materials
+        self.scale = scale
+        self.thumbnail = thumbnail
+
+    def toJson(self):
+        # The thumbnail is mostly transparent, so compresses to a few hundred
+        # bytes rather than the 36KB it takes up raw
+        thumbnail = base64.b64encode(zlib.compress(self.thumbnail))
+        return {"modified": self.modified, "size": self.size,
+                "count": self.count, "materials": self.materials,
+                "scale": self.scale, "thumbnail": thumbnail.decode("ascii")}
+
+    @classmethod
+    def fromJson(cls, name, data):
+        return cls(name, data["modified"], data["size"], data["count"],
+                   data["materials"], data["scale"],
+                   zlib.decompress(base64.b64decode(data["thumbnail"])))
+
+    @classmethod
+    def fromScenario(cls, name, stat, scenario):
+        # Only the materials that are actually used are listed
+        used = set(scenario.columns["material"])
+        materials = [material for i, material in
+                     enumerate(scenario.materials) if i in used]
+        return cls(name, stat.st_mtime_ns, stat.st_size, len(scenario),
+                   materials, scenario.scale, renderThumbnail(scenario))
+
+
+class ScenarioIndexer(threading.Thread):
+    """Reads scenarios for the index on a background thread. Scenarios are
+    queued with add, and the info read from each one (or why it couldn't be
+    read) is handed back by takeResult. The thread keeps waiting for more
+    until the program closes.
+
+    """
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.__scenarios = queue.Queue()
+        self.__results = queue.Queue()
+
+    def add(self, name, path, stat):
+        self.__scenarios.put((name, path, stat))
+
+    def takeResult(self):
+        # (name, stat, info, error) for the next scenario that has been read,
+        # or None if there isn't one ready yet
+        try:
+            return self.__results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def run(self):
+        while True:
+            name, path, stat = self.__scenarios.get()
+            try:
+                scenario = scenarioFile.readScenario(path)
+                try:
+                    info = ScenarioInfo.fromScenario(name, stat, scenario)
+                finally:
+                    scenario.close()
+            except (OSError, ValueError, SyntaxError, IndexError) as e:
+                self.__results.put((name, stat, None, e))
+            else:
+                self.__results.put((name, stat, info, None))
+
+
+class ScenarioLibrary(object):
+    def __init__(self, folder):
+        self.__folder = Path(folder)
+        self.__indexPath = self.__folder / INDEX_NAME
+        self.__entries = {}
+
+        # Modification time and size of files that couldn't be read, so they
+        # aren't tried again until they change, and why they couldn't be
+        self.__unreadable = {}
+
+        # Why the index couldn't last be saved, or None if it was
+        self.__saveError = None
+
+        # Scenarios that are queued to be read by the indexer, and what their
+        # stat was when they were found
+        self.__pending = {}
+        self.__indexer = None
+
+        # How many scenarios have each "Custom Scenario N" number (there can
+        # be a .txt and a .scn with the same one), and the lowest number that
+        # hasn't been used - numbers below it are all taken
+        self.__customNumbers = {}
+        self.__nextNumber = 1
+
+        self.loadIndex()
+
+    def add(self, name, scenario=None):
+        """Adds a scenario in the folder to the index, or updates it if it's
+        already there. If the scenario has just been saved, passing it in
+        saves reading the file again.
+
+        """
+        stat = (self.__folder / name).stat()
+        if scenario is None:
+            scenario = scenarioFile.readScenario(self.__folder / name)
+            try:
+                info = ScenarioInfo.fromScenario(name, stat, scenario)
+            finally:
+                scenario.close()
+        else:
+            info = ScenarioInfo.fromScenario(name, stat, scenario)
+
+        # Anything the indexer reads from an older version of the file is
+        # ignored
+        self.__pending.pop(name, None)
+        self.setEntry(info)
+        self.saveIndex()
+        return info
+
+    def get(self, name):
+        # The info for a scenario, or None if it isn't in the index (or is
+        # still being read for the first time)
+        return self.__entries.get(name)
+
+    def getError(self, name):
+        # Why a scenario couldn't be read, or None if it could (or hasn't
+        # been yet)
+        unreadable = self.__unreadable.get(name)
+        if unreadable is None:
+            return None
+        return unreadable[2]
+
+    def getSaveError(self):
+        return self.__saveError
+
+    def isIndexing(self):
+        # True while there are scenarios still waiting to be read
+        return bool(self.__pending)
+
+    def loadIndex(self):
+        # A missing or broken index is just rebuilt by the next refresh
+        try:
+            with open(str(self.__indexPath), "r") as f:
+                data = json.load(f)
+            if data["version"] == INDEX_VERSION:
+                for name, entry in data["scenarios"].items():
+                    self.setEntry(ScenarioInfo.fromJson(name, entry))
+        except (OSError, ValueError, KeyError, TypeError, zlib.error):
+            self.__entries = {}
+            self.__customNumbers = {}
+            self.__nextNumber = 1
+
+    def names(self, sortBy="name"):
+        # Names of the scenarios in the folder, in the order chosen from
+        # SORT_ORDERS
+        # (name, modified, count) - scenarios that are still being read for
+        # the first time, or couldn't be read, don't have a count, so go last
+        # by particles
+        entries = [(info.name, info.modified, info.count)
+                   for info in self.__entries.values()]
+        entries += [(name, stat.st_mtime_ns, -1)
+                    for name, stat in self.__pending.items()
+                    if name not in self.__entries]
+        entries += [(name, unreadable[0], -1)
+                    for name, unreadable in self.__unreadable.items()
+                    if name not in self.__pending]
+        if sortBy == "newest":
+            entries.sort(key=lambda entry: entry[1], reverse=True)
+        elif sortBy == "particles":
+            entries.sort(key=lambda entry: entry[2], reverse=True)
+        else:
+            entries.sort(key=lambda entry: entry[0].lower())
+
+        return [entry[0] for entry in entries]
+
+    def nextCustomNumber(self):
+        # Only ever moves up past numbers that are taken, so finding the next
+        # free number doesn't depend on how many scenarios there are
+        while self.__nextNumber in self.__customNumbers:
+            self.__nextNumber += 1
+
+        return self.__nextNumber
+
+    def refresh(self):
+        """Brings the index up to date with the folder. Scenarios that haven't
+        changed since they were indexed (going by their modification time and
+        size) are only checked with a stat. New or changed ones are queued for
+        the indexer, and are added to the index by update once they've been
+        read.
+
+        """
+        changed = False
+        found = set()
+        for entry in os.scandir(str(self.__folder)):
+            if os.path.splitext(entry.name)[1] not in SCENARIO_EXTENSIONS or \
+                    not entry.is_file():
+                continue
+
+            found.add(entry.name)
+            stat = entry.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+            info = self.__entries.get(entry.name)
+            if info is not None and (info.modified, info.size) == key:
+                continue
+            unreadable = self.__unreadable.get(entry.name)
+            if unreadable is not None and unreadable[:2] == key:
+                continue
+            pending = self.__pending.get(entry.name)
+            if pending is not None and \
+                    (pending.st_mtime_ns, pending.st_size) == key:
+                continue
+
+            if self.__indexer is None:
+                self.__indexer = ScenarioIndexer()
+                self.__indexer.start()
+            self.__pending[entry.name] = stat
+            self.__indexer.add(entry.name, entry.path, stat)
+
+        for name in list(self.__entries):
+            if name not in found:
+                self.removeEntry(name)
+                changed = True
+        for name in list(self.__pending):
+            if name not in found:
+                del self.__pending[name]
+        for name in list(self.__unreadable):
+            if name not in found:
+                del self.__unreadable[name]
+
+        if changed:
+            self.saveIndex()
+
+    def removeEntry(self, name):
+        if self.__entries.pop(name, None) is not None:
+            number = customNumber(name)
+            if number is not None:
+                self.__customNumbers[number] -= 1
+                if self.__customNumbers[number] == 0:
+                    del self.__customNumbers[number]
+                    self.__nextNumber = min(self.__nextNumber, number)
+
+    def update(self):
+        """Adds the scenarios the indexer has finished reading to the index.
+        Called every frame while the load menu is open. Returns True if any
+        were added (or turned out not to be scenarios), so the names may have
+        changed.
+
+        """
+        if self.__indexer is None:
+            return False
+
+        changed = False
+        while True:
+            result = self.__indexer.takeResult()
+            if result is None:
+                break
+
+            name, stat, info, error = result
+            # Ignored if the file has changed again (so is queued to be read
+            # again), or has gone, since it was queued
+            if self.__pending.get(name) is not stat:
+                continue
+            del self.__pending[name]
+            changed = True
+
+            if error is not None:
+                # Still listed, so the load menu can say why it can't be
+                # loaded
+                self.__unreadable[name] = (stat.st_mtime_ns, stat.st_size,
+                                           str(error))
+                self.removeEntry(name)
+            else:
+                self.setEntry(info)
+
+        # Only saved once everything queued has been read, rather than
+        # after every scenario
+        if changed and not self.__pending:
+            self.saveIndex()
+
+        return changed
+
+    def saveIndex(self):
+        # Written to a temporary file first, like scenarios are
+        data = {"version": INDEX_VERSION,
+                "scenarios": {name: info.toJson() for name, info in
+                              self.__entries.items()}}
+        tempPath = self.__indexPath.with_name(INDEX_NAME + ".part")
+        try:
+            with open(str(tempPath), "w") as f:
+                json.dump(data, f)
+            tempPath.replace(self.__indexPath)
+        except OSError as e:
+            # The index is only a cache, so scenarios can still be saved and
+            # loaded without it - the load menu shows why it wasn't saved
+            self.__saveError = str(e)
+        else:
+            self.__saveError = None
+
+    def setEntry(self, info):
+        if info.name in self.__entries:
+            self.removeEntry(info.name)
+
+        self.__entries[info.name] = info
+        self.__unreadable.pop(info.name, None)
+        number = customNumber(info.name)
+        if number is not None:
+            self.__customNumbers[number] = \
+                self.__customNumbers.get(number, 0) + 1
@@ -0,0 +1,256 @@
+"""Autosave for setup.
+
+Everything done to the particles in setup (placing, editing, deleting and
+clearing them, loading scenarios and zooming) is appended to a journal file as
+it happens, one JSON list per line:
+
+    ["camera", scale, x, y]     the scale and where the camera is
+    ["add", id, row]            a particle was placed or loaded
+    ["edit", id, row]           a particle's properties were changed
+    ["remove", id]              a particle was deleted
+    ["clear"]                   every particle was deleted
+
+Rows are in the same order as scenarioFile.COLUMNS, except that x and y are
+the particle's position in the world (in metres), so particles come back
+exactly where they were rather than rounded to pixels.
+
+The file is written by a background thread, so setup never waits for the disk
+- the program only has to put each change on a queue. The thread keeps its
+own copy of the particles, and once the journal has many more lines than
+there are particles it is compacted into a snapshot (a camera line, then an
+add line for each particle). If the program crashes, or is closed part way
+through setting up, the particles are read back from the journal the next time
+it starts. The journal is deleted when setup finishes normally.
+
+"""
+import os
+import json
+import queue
+import threading
+from pathlib import Path
+
+# The journal is compacted once it has this many more lines than there are
+# particles
+COMPACT_LINES = 5000
+
+
+class SetupJournal(threading.Thread):
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.__path = Path(path)
+        self.__tempPath = self.__path.with_name(self.__path.name + ".part")
+
+        # Only used by the main thread - the id of each particle that is in
+        # the journal, and the last row and camera that were put in it, so
+        # that nothing is written if they haven't changed
+        self.__ids = {}
+        self.__nextId = 0
+        self.__lastEdit = (None, None)
+        self.__camera = None
+
+        self.__changes = queue.Queue()
+
+        # Only used by the writer thread - the particles as they are in the
+        # journal, and how many lines it has
+        self.__rows = {}
+        self.__savedCamera = None
+        self.__lines = 0
+        self.__file = None
+
+        # Why the journal couldn't last be written to, or None if it could -
+        # shown in setup, as losing the autosave shouldn't stop anyone setting
+        # up
+        self.__error = None
+
+        # Whatever was left from last time, read before the thread starts
+        self.__recovered = self.read()
+
+    def add(self, particle, row):
+        self.__ids[particle] = self.__nextId
+        self.__changes.put(["add", self.__nextId, row])
+        self.__nextId += 1
+
+    def clear(self):
+        self.__ids = {}
+        self.__lastEdit = (None, None)
+        self.__changes.put(["clear"])
+
+    def close(self):
+        # Writes everything that's waiting to be written, and stops the thread
+        self.__changes.put(None)
+        if self.is_alive():
+            self.join()
+
+    def discard(self):
+        # Setup finished normally, so there's nothing to recover
+        self.__ids = {}
+        self.__lastEdit = (None, None)
+        self.__camera = None
+        self.__changes.put(["discard"])
+
+    def edit(self, particle, row):
+        # Called every frame while a particle is being edited, so only
+        # changes are written
+        if particle not in self.__ids or self.__lastEdit == (particle, row):
+            return
+
+        self.__lastEdit = (particle, row)
+        self.__changes.put(["edit", self.__ids[particle], row])
+
+    def getError(self):
+        return self.__error
+
+    def remove(self, particle):
+        if particle in self.__ids:
+            self.__changes.put(["remove", self.__ids.pop(particle)])
+
+    def setCamera(self, scale, x, y):
+        camera = (scale, x, y)
+        if camera != self.__camera:
+            self.__camera = camera
+            self.__changes.put(["camera", scale, x, y])
+
+    def startSession(self, camera=None, particles=None):
+        """Starts a new setup session, with the camera and particles (a list
+        of (particle, row) pairs) that setup starts with. The writer thread
+        is started by the first session.
+
+        """
+        self.__ids = {}
+        self.__lastEdit = (None, None)
+        self.__camera = None
+        self.__changes.put(["discard"])
+
+        if camera is not None:
+            self.setCamera(*camera)
+        if particles is not None:
+            for particle, row in particles:
+                self.add(particle, row)
+
+        if not self.is_alive():
+            self.start()
+
+    def takeRecovered(self):
+        """The camera (or None) and the rows of the particles left in the
+        journal by the last run of the program, or None if there weren't any.
+        Only returns them once.
+
+        """
+        recovered = self.__recovered
+        self.__recovered = None
+        return recovered
+
+    def read(self):
+        # Replays the journal, to get back to how the particles were when the
+        # last line was written
+        try:
+            f = open(str(self.__path), "r")
+        except OSError:
+            return None
+
+        camera = None
+        rows = {}
+        with f:
+            for line in f:
+                try:
+                    camera = self.apply(json.loads(line), rows, camera)
+                except (ValueError, IndexError, TypeError):
+                    # The last line can be cut short by a crash
+                    break
+
+        if not rows:
+            return None
+        return camera, list(rows.values())
+
+    @staticmethod
+    def apply(change, rows, camera):
+        # Makes one change to rows (particle rows by id), and returns the
+        # camera after it
+        kind = change[0]
+        if kind == "camera":
+            camera = tuple(change[1:])
+        elif kind == "add" or kind == "edit":
+            rows[change[1]] = change[2]
+        elif kind == "remove":
+            rows.pop(change[1], None)
+        elif kind == "clear":
+            rows.clear()
+        return camera
+
+    def run(self):
+        while True:
+            changes = [self.__changes.get()]
+            # Everything that's waiting is written in one go
+            while True:
+                try:
+                    changes.append(self.__changes.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self.write(changes)
+            except (OSError, ValueError) as e:
+                self.__error = str(e)
+            else:
+                self.__error = None
+
+            if None in changes:
+                if self.__file is not None:
+                    self.__file.close()
+                    self.__file = None
+                return
+
+    def write(self, changes):
+        lines = []
+        for change in changes:
+            if change is None:
+                break
+
+            if change[0] == "discard":
+                self.__rows = {}
+                self.__savedCamera = None
+                self.__lines = 0
+                lines = []
+                if self.__file is not None:
+                    self.__file.close()
+                    self.__file = None
+                if self.__path.exists():
+                    self.__path.unlink()
+                continue
+
+            self.__savedCamera = self.apply(change, self.__rows,
+                                            self.__savedCamera)
+            lines.append(json.dumps(change))
+
+        if not lines:
+            return
+
+        self.__lines += len(lines)
+        if self.__lines > len(self.__rows) + COMPACT_LINES:
+            self.compact()
+            return
+
+        if self.__file is None:
+            self.__file = open(str(self.__path), "a")
+        self.__file.write("\n".join(lines) + "\n")
+        self.__file.flush()
+
+    def compact(self):
+        # Replaces the journal with just the current camera and particles.
+        # Written to a temporary file first, so there's always a journal to
+        # recover from.
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+        with open(str(self.__tempPath), "w") as f:
+            if self.__savedCamera is not None:
+                f.write(json.dumps(["camera"] + list(self.__savedCamera)) +
+                        "\n")
+            for id, row in self.__rows.items():
+                f.write(json.dumps(["add", id, row]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.__tempPath.replace(self.__path)
+        self.__lines = len(self.__rows) + 1